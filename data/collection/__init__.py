@@ -20,12 +20,37 @@ from .validator import (
     DataValidator
 )
 
+from .validation_engine import (
+    RuleOutcome,
+    ValidationEngine
+)
+
+from .online_validator import (
+    RollingStats,
+    OnlineValidator
+)
+
+from .validation_store import ValidationStore
+
 from .synchronizer import (
     TimeframeConfig,
     SyncStats,
     DataSynchronizer
 )
 
+from .reconcile import (
+    GapStats,
+    ReconcileStats
+)
+
+from .panel import (
+    FillPolicy,
+    PanelConfig,
+    Panel,
+    PanelBuilder,
+    build_panel
+)
+
 from .processor import (
     ProcessingStage,
     ProcessingStep,
@@ -33,6 +58,57 @@ from .processor import (
     DataProcessor
 )
 
+from .incremental import (
+    IndicatorState,
+    IncrementalEngine
+)
+
+from .parallel import ParallelProcessor
+
+from .planner import (
+    StepPlanner,
+    FeatureCache
+)
+
+from .buffers import ColumnBuffer
+
+from .feature_store import (
+    FeatureKey,
+    FeatureStoreStats,
+    FeatureStore
+)
+
+from .backends import (
+    IndicatorBackend,
+    get_backend,
+    available_backends,
+    check_parity
+)
+
+from .kernels import NUMBA_AVAILABLE
+
+from .metrics_job import (
+    MetricsConfig,
+    MetricsStats,
+    MetricsJob
+)
+
+from .rolling_metrics import (
+    RollingConfig,
+    RollingMetricsEngine
+)
+
+from .quantile_sketch import (
+    TDigest,
+    RiskSketches
+)
+
+from .correlation import (
+    RollingCovariance,
+    CorrelationConfig,
+    CorrelationEngine
+)
+
 __all__ = [
     # Downloader
     'DownloadConfig',
@@ -45,17 +121,55 @@ __all__ = [
     'ValidationStats',
     'ValidationSeverity',
     'DataValidator',
+    'RuleOutcome',
+    'ValidationEngine',
+    'RollingStats',
+    'OnlineValidator',
+    'ValidationStore',
     
     # Synchronizer
     'TimeframeConfig',
     'SyncStats',
     'DataSynchronizer',
+    'GapStats',
+    'ReconcileStats',
+    'FillPolicy',
+    'PanelConfig',
+    'Panel',
+    'PanelBuilder',
+    'build_panel',
     
     # Processor
     'ProcessingStage',
     'ProcessingStep',
     'ProcessingStats',
     'DataProcessor',
+    'IndicatorState',
+    'IncrementalEngine',
+    'ParallelProcessor',
+    'StepPlanner',
+    'FeatureCache',
+    'ColumnBuffer',
+    'FeatureKey',
+    'FeatureStoreStats',
+    'FeatureStore',
+    'IndicatorBackend',
+    'get_backend',
+    'available_backends',
+    'check_parity',
+    'NUMBA_AVAILABLE',
+    
+    # Metrics
+    'MetricsConfig',
+    'MetricsStats',
+    'MetricsJob',
+    'RollingConfig',
+    'RollingMetricsEngine',
+    'TDigest',
+    'RiskSketches',
+    'RollingCovariance',
+    'CorrelationConfig',
+    'CorrelationEngine',
     
     # Factory functions
     'create_downloader',
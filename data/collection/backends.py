@@ -0,0 +1,375 @@
+"""
+Indicator Backends
+----------------
+Backend intercambiabili per il calcolo degli indicatori del
+DataProcessor. TA-Lib è usato se installato; altrimenti il
+backend NumPy vettoriale fornisce gli stessi risultati senza
+dipendenze native.
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Tuple, Type
+
+import numpy as np
+
+from . import vectorized
+from . import kernels
+
+logger = logging.getLogger(__name__)
+
+class IndicatorBackend(ABC):
+    """
+    Interfaccia dei backend indicatori.
+    
+    Tutti i metodi lavorano su array 1D float64 e seguono la
+    semantica di talib (NaN iniziali fino al primo valore valido).
+    Dopo un NaN interno gli indicatori a finestra sono NaN solo sulle
+    finestre che lo contengono, quelli ricorsivi fino alla fine (l'OBV
+    lo tratta come prezzo invariato); talib coincide fino al primo NaN
+    interno. Le funzioni non ricorsive hanno un'implementazione NumPy
+    comune.
+    """
+    
+    name: str = "base"
+    
+    @classmethod
+    def available(cls) -> bool:
+        """Indica se il backend è utilizzabile."""
+        return True
+        
+    @abstractmethod
+    def sma(self, x: np.ndarray, period: int) -> np.ndarray:
+        """Media mobile semplice."""
+        pass
+        
+    @abstractmethod
+    def ema(self, x: np.ndarray, period: int) -> np.ndarray:
+        """Media mobile esponenziale."""
+        pass
+        
+    @abstractmethod
+    def rsi(self, x: np.ndarray, period: int) -> np.ndarray:
+        """RSI con medie di Wilder."""
+        pass
+        
+    @abstractmethod
+    def macd(
+        self,
+        x: np.ndarray,
+        fastperiod: int,
+        slowperiod: int,
+        signalperiod: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """MACD, signal e istogramma."""
+        pass
+        
+    @abstractmethod
+    def bbands(
+        self,
+        x: np.ndarray,
+        period: int,
+        nbdevup: float,
+        nbdevdn: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Bande di Bollinger (upper, middle, lower)."""
+        pass
+        
+    @abstractmethod
+    def obv(self, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+        """On Balance Volume."""
+        pass
+        
+    @abstractmethod
+    def atr(
+        self,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        period: int
+    ) -> np.ndarray:
+        """Average True Range."""
+        pass
+        
+    def rolling_std(self, x: np.ndarray, window: int) -> np.ndarray:
+        """Deviazione standard mobile campionaria (ddof=1)."""
+        return vectorized.rolling_std(_column(x), window).ravel()
+        
+    def pct_change(self, x: np.ndarray, periods: int = 1) -> np.ndarray:
+        """Variazione percentuale su 'periods' righe."""
+        return vectorized.pct_change(_column(x), periods).ravel()
+        
+    def candle_shape(
+        self,
+        open_: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        doji_ratio: float = 0.1
+    ) -> Dict[str, np.ndarray]:
+        """Feature di forma della candela (vectorized.CANDLE_SHAPE_COLUMNS)."""
+        return vectorized.candle_shape(
+            *(np.asarray(a, dtype=np.float64) for a in (open_, high, low, close)),
+            doji_ratio
+        )
+
+def _column(x: np.ndarray) -> np.ndarray:
+    """Vista (n × 1) float64 di un array 1D."""
+    return np.asarray(x, dtype=np.float64).reshape(-1, 1)
+
+def _series(x: np.ndarray) -> np.ndarray:
+    """Array 1D float64 contiguo (richiesto dai kernel numba)."""
+    return np.ascontiguousarray(x, dtype=np.float64)
+
+class NumpyBackend(IndicatorBackend):
+    """Backend NumPy vettoriale (nessuna dipendenza nativa)."""
+    
+    name = "numpy"
+    
+    def sma(self, x: np.ndarray, period: int) -> np.ndarray:
+        return vectorized.sma(_column(x), period).ravel()
+        
+    def ema(self, x: np.ndarray, period: int) -> np.ndarray:
+        return vectorized.ema(_column(x), period).ravel()
+        
+    def rsi(self, x: np.ndarray, period: int) -> np.ndarray:
+        return vectorized.rsi(_column(x), period).ravel()
+        
+    def macd(self, x, fastperiod, slowperiod, signalperiod):
+        result = vectorized.macd(_column(x), fastperiod, slowperiod, signalperiod)
+        return (
+            result['macd'].ravel(),
+            result['macd_signal'].ravel(),
+            result['macd_hist'].ravel()
+        )
+        
+    def bbands(self, x, period, nbdevup, nbdevdn):
+        column = _column(x)
+        middle = vectorized.sma(column, period).ravel()
+        std = np.sqrt(vectorized.rolling_var(column, period)).ravel()
+        return middle + nbdevup * std, middle, middle - nbdevdn * std
+        
+    def obv(self, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+        return vectorized.obv(_column(close), _column(volume)).ravel()
+        
+    def atr(self, high, low, close, period):
+        return vectorized.atr(
+            _column(high),
+            _column(low),
+            _column(close),
+            period
+        ).ravel()
+
+class TalibBackend(IndicatorBackend):
+    """Backend TA-Lib (libreria nativa)."""
+    
+    name = "talib"
+    
+    def __init__(self):
+        import talib
+        self._talib = talib
+        
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            import talib  # noqa: F401
+            return True
+        except ImportError:
+            return False
+            
+    def sma(self, x: np.ndarray, period: int) -> np.ndarray:
+        return self._talib.SMA(x, timeperiod=period)
+        
+    def ema(self, x: np.ndarray, period: int) -> np.ndarray:
+        return self._talib.EMA(x, timeperiod=period)
+        
+    def rsi(self, x: np.ndarray, period: int) -> np.ndarray:
+        return self._talib.RSI(x, timeperiod=period)
+        
+    def macd(self, x, fastperiod, slowperiod, signalperiod):
+        return self._talib.MACD(
+            x,
+            fastperiod=fastperiod,
+            slowperiod=slowperiod,
+            signalperiod=signalperiod
+        )
+        
+    def bbands(self, x, period, nbdevup, nbdevdn):
+        return self._talib.BBANDS(
+            x,
+            timeperiod=period,
+            nbdevup=nbdevup,
+            nbdevdn=nbdevdn
+        )
+        
+    def obv(self, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+        return self._talib.OBV(close, volume)
+        
+    def atr(self, high, low, close, period):
+        return self._talib.ATR(high, low, close, timeperiod=period)
+
+class NumbaBackend(NumpyBackend):
+    """
+    Backend con kernel numba per gli indicatori ricorsivi.
+    
+    EMA, RSI, MACD, OBV e ATR usano i kernel compilati; gli
+    indicatori a finestra restano sul backend NumPy.
+    """
+    
+    name = "numba"
+    
+    def __init__(self):
+        # Carica i kernel dalla cache su disco prima del primo utilizzo
+        kernels.warmup()
+        
+    @classmethod
+    def available(cls) -> bool:
+        return kernels.NUMBA_AVAILABLE
+        
+    def ema(self, x: np.ndarray, period: int) -> np.ndarray:
+        return kernels.ema(_series(x), period, 2.0 / (period + 1))
+        
+    def rsi(self, x: np.ndarray, period: int) -> np.ndarray:
+        return kernels.rsi(_series(x), period)
+        
+    def macd(self, x, fastperiod, slowperiod, signalperiod):
+        if slowperiod < fastperiod:
+            fastperiod, slowperiod = slowperiod, fastperiod
+        x = _series(x)
+        
+        # La EMA veloce parte dallo stesso indice della lenta (come talib)
+        fast_input = x.copy()
+        start = kernels.first_valid(x)
+        fast_input[start:start + slowperiod - fastperiod] = np.nan
+        
+        line = (
+            kernels.ema(fast_input, fastperiod, 2.0 / (fastperiod + 1))
+            - kernels.ema(x, slowperiod, 2.0 / (slowperiod + 1))
+        )
+        signal = kernels.ema(line, signalperiod, 2.0 / (signalperiod + 1))
+        line[np.isnan(signal)] = np.nan
+        return line, signal, line - signal
+        
+    def obv(self, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+        return kernels.obv(_series(close), _series(volume))
+        
+    def atr(self, high, low, close, period):
+        return kernels.atr(_series(high), _series(low), _series(close), period)
+        
+    def candle_shape(self, open_, high, low, close, doji_ratio=0.1):
+        out = kernels.candle_shape(
+            _series(open_),
+            _series(high),
+            _series(low),
+            _series(close),
+            doji_ratio
+        )
+        return {
+            column: out[j]
+            for j, column in enumerate(vectorized.CANDLE_SHAPE_COLUMNS)
+        }
+
+# Backend registrati, in ordine di preferenza per la selezione automatica
+BACKENDS: Dict[str, Type[IndicatorBackend]] = {
+    'talib': TalibBackend,
+    'numba': NumbaBackend,
+    'numpy': NumpyBackend
+}
+
+def get_backend(name: str = 'auto') -> IndicatorBackend:
+    """
+    Crea un backend indicatori.
+    
+    Args:
+        name: Nome del backend o 'auto' per il primo disponibile
+        
+    Returns:
+        Istanza del backend
+        
+    Raises:
+        ValueError: Se il backend non esiste o non è disponibile
+    """
+    if name == 'auto':
+        for backend_class in BACKENDS.values():
+            if backend_class.available():
+                logger.debug(f"Backend indicatori: {backend_class.name}")
+                return backend_class()
+        raise ValueError("Nessun backend indicatori disponibile")
+        
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Backend non valido: {name}")
+    if not backend_class.available():
+        raise ValueError(f"Backend {name} non disponibile")
+    return backend_class()
+
+def available_backends() -> List[str]:
+    """
+    Elenca i backend utilizzabili.
+    
+    Returns:
+        Nomi dei backend disponibili
+    """
+    return [name for name, cls in BACKENDS.items() if cls.available()]
+
+def check_parity(
+    candidate: str,
+    reference: str = 'talib',
+    size: int = 5000,
+    seed: int = 42,
+    tolerance: float = 1e-8
+) -> Dict[str, Any]:
+    """
+    Confronta due backend su una serie sintetica.
+    
+    Args:
+        candidate: Backend da verificare
+        reference: Backend di riferimento
+        size: Lunghezza della serie
+        seed: Seed del generatore
+        tolerance: Errore relativo massimo ammesso
+        
+    Returns:
+        Dizionario con errore massimo per indicatore e esito ('passed')
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size)))
+    close[:10] = np.nan
+    open_ = close * (1 + rng.normal(0, 0.002, size))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, size))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, size))
+    volume = rng.uniform(1, 100, size)
+    
+    a = get_backend(candidate)
+    b = get_backend(reference)
+    
+    cases = {
+        'sma': lambda k: k.sma(close, 20),
+        'ema': lambda k: k.ema(close, 20),
+        'rsi': lambda k: k.rsi(close, 14),
+        'macd': lambda k: k.macd(close, 12, 26, 9),
+        'bbands': lambda k: k.bbands(close, 20, 2, 2),
+        'obv': lambda k: k.obv(close, volume),
+        'atr': lambda k: k.atr(high, low, close, 14),
+        'candle_shape': lambda k: list(k.candle_shape(open_, high, low, close).values()),
+        'rolling_std': lambda k: k.rolling_std(close, 20),
+        'pct_change': lambda k: k.pct_change(close, 5)
+    }
+    
+    errors: Dict[str, float] = {}
+    for name, case in cases.items():
+        left = np.atleast_2d(case(a))
+        right = np.atleast_2d(case(b))
+        if not np.array_equal(np.isnan(left), np.isnan(right)):
+            errors[name] = float('inf')
+            continue
+        valid = ~np.isnan(right)
+        diff = np.abs(left[valid] - right[valid]) / np.maximum(1.0, np.abs(right[valid]))
+        errors[name] = float(diff.max()) if diff.size else 0.0
+        
+    return {
+        'candidate': candidate,
+        'reference': reference,
+        'errors': errors,
+        'passed': all(e <= tolerance for e in errors.values())
+    }
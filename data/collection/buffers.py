@@ -0,0 +1,176 @@
+"""
+Column Buffers
+------------
+Adattatore DataFrame basato su buffer di colonne preallocati.
+Usato dalla modalità in-place del DataProcessor: le colonne di
+input sono copiate una sola volta, gli step scrivono direttamente
+nei buffer e il DataFrame finale li avvolge senza copie.
+"""
+
+from typing import Dict, List, Optional, Iterable
+
+import numpy as np
+import pandas as pd
+
+class ColumnBuffer:
+    """Colonne numeriche preallocate con indice condiviso."""
+    
+    def __init__(
+        self,
+        index: pd.Index,
+        buffers: Dict[str, np.ndarray],
+        columns: List[str],
+        extra: Optional[pd.DataFrame] = None
+    ):
+        """
+        Inizializza il buffer.
+        
+        Args:
+            index: Indice delle righe
+            buffers: Buffer per colonna (lunghi almeno len(index))
+            columns: Colonne già valorizzate, in ordine
+            extra: Colonne non numeriche, filtrate insieme alle righe
+        """
+        self.index = index
+        self.buffers = buffers
+        self.extra = extra
+        self._columns = list(columns)
+        self._rows = len(index)
+        
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        reserve: Iterable[str] = (),
+        dtype: np.dtype = np.float64
+    ) -> 'ColumnBuffer':
+        """
+        Crea il buffer copiando le colonne numeriche di un DataFrame.
+        
+        Le colonne di input restano float64 (richiesto da talib);
+        le colonne riservate per gli output degli step usano 'dtype'.
+        
+        Args:
+            df: DataFrame di input
+            reserve: Colonne di output da preallocare
+            dtype: Tipo delle colonne di output
+            
+        Returns:
+            Buffer inizializzato
+        """
+        numeric = set(df.select_dtypes(include=[np.number]).columns)
+        buffers = {
+            column: np.array(df[column], dtype=np.float64)
+            for column in df.columns
+            if column in numeric
+        }
+        for column in reserve:
+            if column not in buffers:
+                buffers[column] = np.empty(len(df), dtype=dtype)
+                
+        other = [c for c in df.columns if c not in numeric]
+        extra = df[other] if other else None
+        return cls(df.index, buffers, list(df.columns), extra)
+        
+    @property
+    def columns(self) -> List[str]:
+        """Colonne valorizzate, nell'ordine di inserimento."""
+        return list(self._columns)
+        
+    def __len__(self) -> int:
+        return self._rows
+        
+    def array(self, column: str) -> np.ndarray:
+        """
+        Vista sul buffer di una colonna numerica.
+        
+        Args:
+            column: Nome colonna
+            
+        Returns:
+            Array modificabile in place
+        """
+        return self.buffers[column][:self._rows]
+        
+    def __getitem__(self, column: str) -> pd.Series:
+        if column not in self._columns:
+            raise KeyError(column)
+        if column not in self.buffers:
+            return self.extra[column]
+        return pd.Series(self.array(column), index=self.index, name=column, copy=False)
+        
+    def __setitem__(self, column: str, values) -> None:
+        """Scrive una colonna nel buffer, con cast al suo tipo."""
+        values = np.asarray(values)
+        if column not in self.buffers:
+            dtype = values.dtype if values.dtype.kind == 'f' else np.float64
+            self.buffers[column] = np.empty(self._rows, dtype=dtype)
+        np.copyto(self.array(column), values, casting='unsafe')
+        if column not in self._columns:
+            self._columns.append(column)
+            
+    def move_to_end(self, columns: Iterable[str]) -> None:
+        """
+        Sposta colonne valorizzate in fondo, nell'ordine dato.
+        
+        Args:
+            columns: Colonne da spostare (quelle assenti sono ignorate)
+        """
+        moved = [c for c in columns if c in self._columns]
+        self._columns = [c for c in self._columns if c not in moved] + moved
+        
+    def numeric_columns(self) -> List[str]:
+        """Colonne valorizzate con buffer numerico."""
+        return [c for c in self._columns if c in self.buffers]
+        
+    def compact(self, mask: np.ndarray) -> None:
+        """
+        Mantiene solo le righe selezionate, spostandole in testa ai buffer.
+        
+        Lavora una colonna alla volta: la memoria aggiuntiva è al più
+        quella di una colonna.
+        
+        Args:
+            mask: Maschera booleana delle righe da mantenere
+        """
+        kept = int(mask.sum())
+        for column in self.numeric_columns():
+            buffer = self.buffers[column]
+            buffer[:kept] = buffer[:self._rows][mask]
+        self.index = self.index[mask]
+        if self.extra is not None:
+            self.extra = self.extra[mask]
+        self._rows = kept
+        
+    def reorder(self, order: np.ndarray) -> None:
+        """
+        Riordina le righe secondo una permutazione.
+        
+        Args:
+            order: Permutazione delle righe
+        """
+        for column in self.numeric_columns():
+            buffer = self.buffers[column]
+            buffer[:self._rows] = buffer[:self._rows][order]
+        self.index = self.index[order]
+        if self.extra is not None:
+            self.extra = self.extra.iloc[order]
+            
+    def to_frame(self) -> pd.DataFrame:
+        """
+        DataFrame che avvolge i buffer senza copiarli.
+        
+        Returns:
+            DataFrame con le colonne valorizzate
+        """
+        data = {
+            column: self.array(column) if column in self.buffers
+            else self.extra[column].to_numpy()
+            for column in self._columns
+        }
+        return pd.DataFrame(data, index=self.index, copy=False)
+        
+    @property
+    def nbytes(self) -> int:
+        """Memoria occupata dai buffer."""
+        return sum(buffer.nbytes for buffer in self.buffers.values())
@@ -0,0 +1,440 @@
+"""
+Correlation Engine
+----------------
+Correlazioni e beta mobili sul pannello allineato dei rendimenti:
+serie complete rispetto a un benchmark (somme cumulative su tutto
+il pannello) e matrici tra tutte le coppie dell'universo, aggiornate
+a blocchi di righe con prodotti matriciali. Le matrici sono salvate
+in asset_correlations, una riga per coppia e finestra.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import AssetCorrelation
+from .panel import Panel
+from .resampler import timeframe_to_ms
+
+def panel_returns(panel: Panel, field: str = 'close') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rendimenti del pannello e maschera delle osservazioni.
+    
+    Un rendimento è valido se entrambe le candele sono state osservate
+    (i valori riempiti in avanti non contano come osservazioni).
+    
+    Args:
+        panel: Pannello allineato
+        field: Campo dei prezzi
+        
+    Returns:
+        (rendimenti con 0 dove non validi, maschera), matrici (tempo × simbolo)
+    """
+    prices = panel.field(field).astype(np.float64)
+    valid = np.zeros(panel.valid.shape, dtype=bool)
+    valid[1:] = panel.valid[1:] & panel.valid[:-1]
+    returns = np.zeros(prices.shape)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns[1:] = prices[1:] / prices[:-1] - 1
+    valid &= np.isfinite(returns)
+    returns[~valid] = 0.0
+    return returns, valid
+
+def align_returns(
+    timestamps: np.ndarray,
+    benchmark_timestamps: np.ndarray,
+    benchmark_close: np.ndarray
+) -> np.ndarray:
+    """
+    Rendimenti del benchmark sugli stessi intervalli di una serie.
+    
+    Args:
+        timestamps: Timestamp ordinati della serie
+        benchmark_timestamps: Timestamp ordinati del benchmark
+        benchmark_close: Chiusure del benchmark
+        
+    Returns:
+        Rendimenti (len(timestamps) - 1), NaN dove il benchmark non ha
+        entrambe le candele dell'intervallo
+    """
+    if len(benchmark_timestamps) == 0:
+        return np.full(max(len(timestamps) - 1, 0), np.nan)
+    index = np.minimum(
+        np.searchsorted(benchmark_timestamps, timestamps),
+        len(benchmark_timestamps) - 1
+    )
+    found = benchmark_timestamps[index] == timestamps
+    prices = np.where(found, benchmark_close[index], np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return prices[1:] / prices[:-1] - 1
+
+def _window_sums(x: np.ndarray, window: int) -> np.ndarray:
+    """Somme mobili lungo il tempo con somme cumulative."""
+    cumulative = np.cumsum(x, axis=0)
+    out = cumulative.copy()
+    out[window:] -= cumulative[:-window]
+    return out
+
+def benchmark_series(
+    returns: np.ndarray,
+    valid: np.ndarray,
+    benchmark: int,
+    window: int,
+    min_periods: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Correlazione e beta mobili di ogni simbolo rispetto al benchmark.
+    
+    Tutte le somme (osservazioni comuni, momenti, prodotti incrociati)
+    sono calcolate per l'intero pannello con somme cumulative: il costo
+    è O(tempo × simboli) per finestra.
+    
+    Args:
+        returns: Rendimenti (tempo × simbolo)
+        valid: Maschera dei rendimenti
+        benchmark: Indice del simbolo benchmark
+        window: Rendimenti per finestra
+        min_periods: Osservazioni comuni minime
+        
+    Returns:
+        (correlazioni, beta), matrici (tempo × simbolo) con NaN dove
+        le osservazioni comuni sono insufficienti
+    """
+    both = valid & valid[:, [benchmark]]
+    x = np.where(both, returns, 0.0)
+    y = np.where(both, returns[:, [benchmark]], 0.0)
+    
+    count = _window_sums(both.astype(np.float64), window)
+    sum_x = _window_sums(x, window)
+    sum_y = _window_sums(y, window)
+    sum_xx = _window_sums(x * x, window)
+    sum_yy = _window_sums(y * y, window)
+    sum_xy = _window_sums(x * y, window)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sum_xy / count - sum_x * sum_y / (count * count)
+        var_x = sum_xx / count - (sum_x / count) ** 2
+        var_y = sum_yy / count - (sum_y / count) ** 2
+        corr = cov / np.sqrt(np.maximum(var_x * var_y, 0.0))
+        beta = cov / var_y
+        
+    enough = count >= min_periods
+    return np.where(enough, corr, np.nan), np.where(enough, beta, np.nan)
+
+class RollingCovariance:
+    """
+    Somme per coppia sulle ultime window righe, aggiornate a blocchi.
+    
+    Per ogni coppia (i, j) sono mantenuti il numero di osservazioni
+    comuni e le somme di r_i, r_i², r_i·r_j su quelle osservazioni:
+    ogni blocco aggiunge i prodotti delle righe entranti e sottrae
+    quelli delle righe uscenti (O(righe × simboli²) con BLAS). Le
+    somme sono ricalcolate dal buffer ogni window righe per evitare
+    la deriva numerica.
+    """
+    
+    def __init__(self, symbols: int, window: int):
+        """
+        Inizializza lo stato.
+        
+        Args:
+            symbols: Numero di simboli
+            window: Righe per finestra
+        """
+        self.window = window
+        self.returns = np.zeros((0, symbols))
+        self.valid = np.zeros((0, symbols))
+        self.count = np.zeros((symbols, symbols))
+        self.sum = np.zeros((symbols, symbols))
+        self.sum_sq = np.zeros((symbols, symbols))
+        self.cross = np.zeros((symbols, symbols))
+        self._since_rebuild = 0
+        
+    def _accumulate(self, returns: np.ndarray, valid: np.ndarray, sign: float) -> None:
+        """Aggiunge (sign=1) o sottrae (sign=-1) i prodotti di un blocco."""
+        self.count += sign * (valid.T @ valid)
+        self.sum += sign * (returns.T @ valid)
+        self.sum_sq += sign * ((returns * returns).T @ valid)
+        self.cross += sign * (returns.T @ returns)
+        
+    def update(self, returns: np.ndarray, valid: np.ndarray) -> None:
+        """
+        Aggiunge un blocco di righe e scarta quelle uscite dalla finestra.
+        
+        Args:
+            returns: Rendimenti del blocco (righe × simboli), 0 dove non validi
+            valid: Maschera del blocco
+        """
+        valid = valid.astype(np.float64)
+        if len(returns) >= self.window:
+            self.returns = returns[-self.window:].copy()
+            self.valid = valid[-self.window:].copy()
+            self._rebuild()
+            return
+            
+        combined_returns = np.concatenate((self.returns, returns))
+        combined_valid = np.concatenate((self.valid, valid))
+        leaving = max(len(combined_returns) - self.window, 0)
+        self._accumulate(returns, valid, 1.0)
+        if leaving:
+            self._accumulate(combined_returns[:leaving], combined_valid[:leaving], -1.0)
+        self.returns = combined_returns[leaving:]
+        self.valid = combined_valid[leaving:]
+        
+        self._since_rebuild += len(returns)
+        if self._since_rebuild >= self.window:
+            self._rebuild()
+            
+    def _rebuild(self) -> None:
+        """Ricalcola le somme dal buffer."""
+        for matrix in (self.count, self.sum, self.sum_sq, self.cross):
+            matrix[:] = 0.0
+        self._accumulate(self.returns, self.valid, 1.0)
+        self._since_rebuild = 0
+        
+    def statistics(self, min_periods: int) -> Dict[str, np.ndarray]:
+        """
+        Correlazioni e beta della finestra corrente.
+        
+        beta[i, j] è il beta di i rispetto a j, calcolato sulle
+        osservazioni comuni alla coppia.
+        
+        Args:
+            min_periods: Osservazioni comuni minime
+            
+        Returns:
+            Matrici count, correlation, beta (simboli × simboli)
+        """
+        count = np.rint(self.count)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self.sum / count
+            variance = self.sum_sq / count - mean * mean
+            cov = self.cross / count - mean * mean.T
+            correlation = cov / np.sqrt(np.maximum(variance * variance.T, 0.0))
+            beta = cov / variance.T
+            
+        missing = count < min_periods
+        correlation[missing] = np.nan
+        beta[missing] = np.nan
+        return {'count': count, 'correlation': correlation, 'beta': beta}
+
+@dataclass
+class CorrelationConfig:
+    """Configurazione del motore delle correlazioni."""
+    windows: Tuple[str, ...] = ('30d', '90d')
+    benchmark: Optional[str] = 'BTC/USDT'
+    min_periods: int = 20
+    field: str = 'close'
+
+class CorrelationEngine:
+    """Correlazioni e beta mobili su un universo di simboli."""
+    
+    def __init__(
+        self,
+        symbols: List[str],
+        timeframe: str,
+        config: Optional[CorrelationConfig] = None
+    ):
+        """
+        Inizializza il motore.
+        
+        Args:
+            symbols: Simboli, nell'ordine dei pannelli
+            timeframe: Timeframe dei pannelli
+            config: Configurazione (default: CorrelationConfig())
+        """
+        self.logger = logging.getLogger(__name__)
+        self.symbols = list(symbols)
+        self.timeframe = timeframe
+        self.config = config or CorrelationConfig()
+        self.sizes = {
+            window: max(timeframe_to_ms(window) // timeframe_to_ms(timeframe), 2)
+            for window in self.config.windows
+        }
+        self.states = {
+            window: RollingCovariance(len(self.symbols), size)
+            for window, size in self.sizes.items()
+        }
+        self.end_time: Optional[datetime] = None
+        self._last_prices: Optional[np.ndarray] = None
+        self._last_valid: Optional[np.ndarray] = None
+        
+    def _returns(self, panel: Panel) -> Tuple[np.ndarray, np.ndarray]:
+        """Rendimenti del pannello, collegati all'ultima riga già vista."""
+        if panel.symbols != self.symbols:
+            raise ValueError("Il pannello non ha i simboli del motore")
+        returns, valid = panel_returns(panel, self.config.field)
+        if self._last_prices is not None and len(returns):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                first = panel.field(self.config.field)[0] / self._last_prices - 1
+            ok = panel.valid[0] & self._last_valid & np.isfinite(first)
+            returns[0] = np.where(ok, first, 0.0)
+            valid[0] = ok
+        return returns, valid
+        
+    def update(self, panel: Panel) -> None:
+        """
+        Aggiorna le matrici con le nuove righe di un pannello.
+        
+        Il primo pannello può contenere tutta la storia; i successivi
+        solo le righe nuove, sullo stesso clock e con gli stessi simboli.
+        
+        Args:
+            panel: Pannello delle nuove righe
+        """
+        if len(panel.times) == 0:
+            return
+        returns, valid = self._returns(panel)
+        for state in self.states.values():
+            state.update(returns, valid)
+        self._last_prices = panel.field(self.config.field)[-1].astype(np.float64)
+        self._last_valid = panel.valid[-1].copy()
+        self.end_time = panel.times[-1].to_pydatetime()
+        
+    def matrices(self, window: str) -> Dict[str, np.ndarray]:
+        """
+        Matrici correnti di una finestra.
+        
+        Args:
+            window: Finestra (es. 30d)
+            
+        Returns:
+            Matrici count, correlation, beta
+        """
+        return self.states[window].statistics(self.config.min_periods)
+        
+    def benchmark(self, panel: Panel, window: str) -> Dict[str, pd.DataFrame]:
+        """
+        Serie complete di correlazione e beta rispetto al benchmark.
+        
+        Args:
+            panel: Pannello (tempo × simbolo)
+            window: Finestra (es. 30d)
+            
+        Returns:
+            DataFrame correlation e beta (tempo × simbolo)
+        """
+        if self.config.benchmark not in panel.symbols:
+            raise ValueError(f"Benchmark non presente nel pannello: {self.config.benchmark}")
+        returns, valid = panel_returns(panel, self.config.field)
+        corr, beta = benchmark_series(
+            returns,
+            valid,
+            panel.symbols.index(self.config.benchmark),
+            self.sizes[window],
+            self.config.min_periods
+        )
+        return {
+            'correlation': pd.DataFrame(corr, index=panel.times, columns=panel.symbols),
+            'beta': pd.DataFrame(beta, index=panel.times, columns=panel.symbols)
+        }
+        
+    async def save(
+        self,
+        session: AsyncSession,
+        exchange_id: int,
+        symbol_ids: Dict[str, int]
+    ) -> int:
+        """
+        Salva le matrici correnti, una riga per coppia e finestra.
+        
+        Sono salvate solo le coppie con symbol_id < other_id: beta è il
+        beta del primo simbolo rispetto al secondo, beta_reverse il
+        contrario.
+        
+        Args:
+            session: Sessione database
+            exchange_id: ID exchange
+            symbol_ids: ID per simbolo
+            
+        Returns:
+            Righe salvate
+        """
+        ids = np.array([symbol_ids[s] for s in self.symbols])
+        now = datetime.utcnow()
+        rows: List[Dict[str, Any]] = []
+        for window in self.states:
+            stats = self.matrices(window)
+            first, second = np.nonzero(ids[:, None] < ids[None, :])
+            for i, j in zip(first.tolist(), second.tolist()):
+                if stats['count'][i, j] < self.config.min_periods:
+                    continue
+                rows.append({
+                    'exchange_id': exchange_id,
+                    'timeframe': self.timeframe,
+                    'window': window,
+                    'symbol_id': int(ids[i]),
+                    'other_id': int(ids[j]),
+                    'end_time': self.end_time,
+                    'observations': int(stats['count'][i, j]),
+                    'correlation': _finite(stats['correlation'][i, j]),
+                    'beta': _finite(stats['beta'][i, j]),
+                    'beta_reverse': _finite(stats['beta'][j, i]),
+                    'updated_at': now
+                })
+                
+        if rows:
+            stmt = sqlite_insert(AssetCorrelation)
+            key = ['exchange_id', 'timeframe', 'window', 'symbol_id', 'other_id']
+            stmt = stmt.on_conflict_do_update(
+                index_elements=key,
+                set_={name: stmt.excluded[name] for name in rows[0] if name not in key}
+            )
+            await session.execute(stmt, rows)
+            await session.commit()
+        return len(rows)
+
+async def get_correlation(
+    session: AsyncSession,
+    exchange_id: int,
+    timeframe: str,
+    symbol_id: int,
+    other_id: int,
+    window: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Correlazione e beta salvati per una coppia (idx_correlation_pair).
+    
+    Args:
+        session: Sessione database
+        exchange_id: ID exchange
+        timeframe: Timeframe
+        symbol_id: ID del simbolo
+        other_id: ID del simbolo di riferimento
+        window: Finestra (es. 30d)
+        
+    Returns:
+        Dizionario con correlation, beta (di symbol_id rispetto a
+        other_id), observations, end_time; None se assente
+    """
+    swapped = symbol_id > other_id
+    first, second = (other_id, symbol_id) if swapped else (symbol_id, other_id)
+    result = await session.execute(
+        select(AssetCorrelation).where(
+            AssetCorrelation.exchange_id == exchange_id,
+            AssetCorrelation.timeframe == timeframe,
+            AssetCorrelation.window == window,
+            AssetCorrelation.symbol_id == first,
+            AssetCorrelation.other_id == second
+        )
+    )
+    row = result.scalar_one_or_none()
+    if row is None:
+        return None
+    return {
+        'correlation': row.correlation,
+        'beta': row.beta_reverse if swapped else row.beta,
+        'observations': row.observations,
+        'end_time': row.end_time
+    }
+
+def _finite(value: float) -> Optional[float]:
+    """Valore float, None se non finito."""
+    return float(value) if np.isfinite(value) else None
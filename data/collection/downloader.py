@@ -24,15 +24,26 @@ from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from ..database.models import (
     Exchange, Symbol, MarketData,
-    PerformanceMetrics, RiskMetrics,
     initialize_database, get_session
 )
 from ..connectors import (
     BaseConnector,
     create_connector,
-    RetryWithCircuitBreaker
+    create_stream_connector,
+    StreamingConnector
 )
 from cli.config import get_config_loader
+from .resampler import (
+    StreamingResampler,
+    derivable_timeframes,
+    align_timestamp,
+    timeframe_to_ms,
+    bars_to_candles,
+    STORAGE_TIMEZONE,
+    STORAGE_OFFSET
+)
+from .online_validator import OnlineValidator
+from .metrics_job import MetricsJob
 
 def setup_event_loop():
     """Configura il loop di eventi appropriato per il sistema operativo."""
@@ -59,11 +70,12 @@ def convert_to_local_time(utc_timestamp: float) -> datetime:
     utc_dt = datetime.fromtimestamp(utc_timestamp / 1000, tz=pytz.UTC)
     
     # Converti in timezone locale (Europe/Rome)
-    local_tz = pytz.timezone('Europe/Rome')
+    local_tz = pytz.timezone(STORAGE_TIMEZONE)
     local_dt = utc_dt.astimezone(local_tz)
     
     # Aggiungi un'ora per correggere la differenza
-    local_dt = local_dt + timedelta(hours=1)
+    # (invertito da resampler.stored_to_utc_ms)
+    local_dt = local_dt + STORAGE_OFFSET.to_pytimedelta()
     
     return local_dt
 
@@ -80,6 +92,10 @@ class DownloadConfig:
     max_concurrent: int = 2
     batch_size: Optional[Dict[str, int]] = None
     progress_callback: Optional[Callable[[str, int, int], None]] = None
+    # Calcola i timeframe superiori dal più piccolo invece di scaricarli
+    derive_timeframes: bool = False
+    # Valida ogni candela con statistiche mobili per (simbolo, timeframe)
+    online_validation: bool = False
 
 class DownloadStats:
     """Statistiche download."""
@@ -127,29 +143,57 @@ class DataDownloader:
         self.stats = DownloadStats()
         self.connectors: Dict[str, BaseConnector] = {}
         self._exchange_map: Dict[int, str] = {}
+        self._completed_tasks = 0
+        self.online_validator = OnlineValidator()
         
         system_config = get_config_loader().config
         self.batch_sizes = system_config['system']['download']['batch_size']
         
     async def setup(self):
-        """Setup iniziale."""
-        try:
-            for exchange in self.config.exchanges:
-                self.logger.info(f"Creazione connettore per {exchange['id']}...")
-                connector = await create_connector(exchange['id'], exchange['config'])
-                self.connectors[exchange['id']] = connector
+        """
+        Setup iniziale.
+        
+        Gli exchange il cui setup fallisce sono esclusi da
+        self.connectors; l'errore è sollevato solo se falliscono tutti.
+        """
+        # Connettori creati in parallelo, uno per exchange
+        results = await asyncio.gather(
+            *[
+                self._setup_exchange(exchange)
+                for exchange in self.config.exchanges
+            ],
+            return_exceptions=True
+        )
+        
+        errors = []
+        for exchange, result in zip(self.config.exchanges, results):
+            if isinstance(result, Exception):
+                self.logger.error(
+                    f"Errore durante il setup di {exchange['id']}: {str(result)}"
+                )
+                errors.append(result)
                 
-            for exchange_id, connector in self.connectors.items():
-                self.logger.info(f"Verifica simboli su {exchange_id}...")
-                symbols = await connector.get_symbols()
-                unsupported = set(self.config.symbols) - set(symbols)
-                if unsupported:
-                    self.logger.warning(
-                        f"Simboli non supportati su {exchange_id}: {', '.join(unsupported)}"
-                    )
-        except Exception as e:
-            self.logger.error(f"Errore durante il setup: {str(e)}")
+        if errors and not self.connectors:
+            raise errors[0]
+            
+    async def _setup_exchange(self, exchange: Dict[str, Any]):
+        """Crea il connettore di un exchange e verifica i simboli."""
+        exchange_id = exchange['id']
+        self.logger.info(f"Creazione connettore per {exchange_id}...")
+        connector = await create_connector(exchange_id, exchange['config'])
+        
+        self.logger.info(f"Verifica simboli su {exchange_id}...")
+        try:
+            symbols = await connector.get_symbols()
+        except Exception:
+            await connector.close()
             raise
+        self.connectors[exchange_id] = connector
+        unsupported = set(self.config.symbols) - set(symbols)
+        if unsupported:
+            self.logger.warning(
+                f"Simboli non supportati su {exchange_id}: {', '.join(unsupported)}"
+            )
 
     async def _download_batch(
         self,
@@ -202,6 +246,16 @@ class DataDownloader:
             else:
                 invalid += 1
                 
+        if self.config.online_validation and valid_candles:
+            # Porta avanti lo stato usato poi dallo stream live
+            valid_candles, _ = self.online_validator.validate_batch(
+                f"{self._exchange_map[exchange_id]}:{symbol}",
+                timeframe,
+                sorted(valid_candles, key=lambda c: c[0])
+            )
+            invalid += valid - len(valid_candles)
+            valid = len(valid_candles)
+                
         return valid_candles, (valid, invalid, missing)
         
     def _is_valid_candle(self, candle: List[float]) -> bool:
@@ -316,12 +370,52 @@ class DataDownloader:
             await session.rollback()
             raise
 
+    def _plan_timeframes(self) -> Tuple[List[str], Dict[str, List[str]]]:
+        """
+        Separa i timeframe da scaricare da quelli derivabili localmente.
+        
+        Returns:
+            (timeframe da scaricare, timeframe derivati per timeframe base)
+        """
+        timeframes = list(self.config.timeframes)
+        if not self.config.derive_timeframes or len(timeframes) < 2:
+            return timeframes, {}
+            
+        base = min(timeframes, key=timeframe_to_ms)
+        derived = derivable_timeframes(base, timeframes)
+        fetched = [tf for tf in timeframes if tf not in derived]
+        return fetched, {base: derived} if derived else {}
+        
+    async def _save_derived(
+        self,
+        session: AsyncSession,
+        exchange_id: int,
+        symbol_id: int,
+        bars: Dict[str, List[List[float]]]
+    ):
+        """Salva le barre chiuse dei timeframe derivati."""
+        for timeframe, candles in bars.items():
+            if candles:
+                await self._save_market_data(
+                    session, exchange_id, symbol_id, timeframe, candles
+                )
+                self.stats.update(len(candles), len(candles), 0, 0)
+                
     async def _process_symbol_timeframe(self, exchange_obj: Exchange, connector: BaseConnector,
-                                      symbol: str, timeframe: str) -> Tuple[int, int, int, int]:
-        """Processa un singolo simbolo e timeframe."""
+                                      symbol: str, timeframe: str,
+                                      derived: Optional[List[str]] = None) -> Tuple[int, int, int, int]:
+        """
+        Processa un singolo simbolo e timeframe.
+        
+        Con 'derived' le barre dei timeframe superiori sono aggregate
+        dalle candele scaricate; l'inizio del download è allineato
+        alla barra del timeframe derivato più ampio.
+        """
         try:
             self.logger.info(f"Download {symbol} {timeframe}")
             
+            # Simbolo e ultima candela in una sessione breve: nessuna
+            # transazione resta aperta durante il download
             async with get_session() as session:
                 symbol_obj = await self._get_or_create_symbol(session, exchange_obj.id, symbol)
                 
@@ -334,60 +428,63 @@ class DataDownloader:
                 result = await session.execute(stmt)
                 last_date = result.scalar_one_or_none()
                 
-                start_date = self.config.start_date
-                if not start_date:
-                    if last_date and (datetime.utcnow() - last_date).days <= 7:
-                        start_date = last_date
-                    else:
-                        start_date = datetime.utcnow() - timedelta(days=365)
-                
-                end_date = self.config.end_date or datetime.utcnow()
-                
-                start_ts = int(start_date.timestamp() * 1000)
-                end_ts = int(end_date.timestamp() * 1000)
-                
-                batch_size = self.batch_sizes[timeframe]
-                
-                timeframe_ms = connector.parse_timeframe(timeframe)
-                total_candles = (end_ts - start_ts) // timeframe_ms
-                num_batches = (total_candles + batch_size - 1) // batch_size
-                
-                all_candles = []
-                for i in range(num_batches):
-                    batch_start = start_ts + (i * batch_size * timeframe_ms)
-                    batch_end = min(batch_start + (batch_size * timeframe_ms), end_ts)
-                    
-                    batch = await self._download_batch(
-                        connector,
-                        symbol,
-                        timeframe,
-                        batch_start,
-                        batch_end,
-                        batch_size
-                    )
-                    all_candles.extend(batch)
-                    
-                    if self.config.progress_callback:
-                        self.config.progress_callback(
-                            f"Download {symbol} {timeframe} batch {i+1}/{num_batches}",
-                            i+1,
-                            num_batches
-                        )
-                    
-                    await asyncio.sleep(0.5)
+            start_date = self.config.start_date
+            if not start_date:
+                if last_date and (datetime.utcnow() - last_date).days <= 7:
+                    start_date = last_date
+                else:
+                    start_date = datetime.utcnow() - timedelta(days=365)
+            
+            end_date = self.config.end_date or datetime.utcnow()
+            
+            start_ts = int(start_date.timestamp() * 1000)
+            end_ts = int(end_date.timestamp() * 1000)
+            if derived:
+                start_ts = min(align_timestamp(start_ts, tf) for tf in derived)
+            
+            batch_size = self.batch_sizes[timeframe]
+            
+            timeframe_ms = connector.parse_timeframe(timeframe)
+            total_candles = (end_ts - start_ts) // timeframe_ms
+            num_batches = (total_candles + batch_size - 1) // batch_size
+            
+            all_candles = []
+            for i in range(num_batches):
+                batch_start = start_ts + (i * batch_size * timeframe_ms)
+                batch_end = min(batch_start + (batch_size * timeframe_ms), end_ts)
                 
-                total = len(all_candles)
-                valid = invalid = missing = 0
+                batch = await self._download_batch(
+                    connector,
+                    symbol,
+                    timeframe,
+                    batch_start,
+                    batch_end,
+                    batch_size
+                )
+                all_candles.extend(batch)
                 
-                if self.config.validate_data:
-                    batch, stats = await self._validate_candles(
-                        all_candles, exchange_obj.id, symbol, timeframe
+                if self.config.progress_callback:
+                    self.config.progress_callback(
+                        f"Download {symbol} {timeframe} batch {i+1}/{num_batches}",
+                        i+1,
+                        num_batches
                     )
-                    valid, invalid, missing = stats
-                    all_candles = batch
-                else:
-                    valid = total
                 
+                await asyncio.sleep(0.5)
+            
+            total = len(all_candles)
+            valid = invalid = missing = 0
+            
+            if self.config.validate_data:
+                batch, stats = await self._validate_candles(
+                    all_candles, exchange_obj.id, symbol, timeframe
+                )
+                valid, invalid, missing = stats
+                all_candles = batch
+            else:
+                valid = total
+            
+            async with get_session() as session:
                 if all_candles:
                     await self._save_market_data(
                         session,
@@ -397,7 +494,18 @@ class DataDownloader:
                         all_candles
                     )
                 
-                return total, valid, invalid, missing
+                # Solo barre chiuse: quella in corso sarà derivata al prossimo download
+                if derived and all_candles:
+                    resampler = StreamingResampler(timeframe, derived)
+                    closed = resampler.push(all_candles)
+                    await self._save_derived(
+                        session,
+                        exchange_obj.id,
+                        symbol_obj.id,
+                        {tf: bars_to_candles(bars) for tf, bars in closed.items()}
+                    )
+                    
+            return total, valid, invalid, missing
             
         except Exception as e:
             self.logger.error(f"Errore download {symbol} {timeframe}: {str(e)}")
@@ -409,46 +517,39 @@ class DataDownloader:
             self.logger.info("Inizializzazione download...")
             await self.setup()
             
-            total_tasks = len(self.config.symbols) * len(self.config.timeframes)
-            completed_tasks = 0
+            total_tasks = (
+                len(self.connectors) *
+                len(self.config.symbols) *
+                len(self.config.timeframes)
+            )
+            self._completed_tasks = 0
             
             if self.config.progress_callback:
                 self.config.progress_callback(
                     "Inizializzazione download...",
-                    completed_tasks,
+                    self._completed_tasks,
                     total_tasks
                 )
             
-            for exchange in self.config.exchanges:
-                exchange_id = exchange['id']
-                
-                async with get_session() as session:
-                    exchange_obj = await self._get_or_create_exchange(session, exchange_id)
-                    self._exchange_map[exchange_obj.id] = exchange_id
+            # Gli exchange sono scaricati in parallelo: la durata totale
+            # è limitata dall'exchange più lento, non dalla somma
+            exchanges = [
+                exchange for exchange in self.config.exchanges
+                if exchange['id'] in self.connectors
+            ]
+            results = await asyncio.gather(
+                *[
+                    self._download_exchange(exchange, total_tasks)
+                    for exchange in exchanges
+                ],
+                return_exceptions=True
+            )
                 
-                for symbol in self.config.symbols:
-                    for timeframe in self.config.timeframes:
-                        try:
-                            result = await self._process_symbol_timeframe(
-                                exchange_obj,
-                                self.connectors[exchange_id],
-                                symbol,
-                                timeframe
-                            )
-                            
-                            self.stats.update(*result)
-                            completed_tasks += 1
-                            
-                            if self.config.progress_callback:
-                                self.config.progress_callback(
-                                    "Download in corso...",
-                                    completed_tasks,
-                                    total_tasks
-                                )
-                                
-                        except Exception as e:
-                            self.logger.error(f"Errore durante il download di {symbol} {timeframe}: {str(e)}")
-                            continue
+            for exchange, result in zip(exchanges, results):
+                if isinstance(result, Exception):
+                    self.logger.error(
+                        f"Errore durante il download da {exchange['id']}: {str(result)}"
+                    )
             
             if self.config.update_metrics:
                 self.logger.info("Aggiornamento metriche...")
@@ -466,59 +567,169 @@ class DataDownloader:
             for connector in self.connectors.values():
                 await connector.close()
                 
-    async def _update_metrics(self, session: AsyncSession):
-        """Aggiorna metriche di performance e rischio."""
-        try:
-            stmt = select(MarketData).order_by(
-                MarketData.exchange_id,
-                MarketData.symbol_id,
-                MarketData.timeframe,
-                MarketData.timestamp
-            )
-            result = await session.execute(stmt)
-            market_data = result.scalars().all()
+    async def _download_exchange(self, exchange: Dict[str, Any], total_tasks: int):
+        """Scarica tutti i simboli e timeframe di un exchange."""
+        exchange_id = exchange['id']
             
-            groups: Dict[Tuple[int, int, str], List[MarketData]] = {}
-            for data in market_data:
-                key = (data.exchange_id, data.symbol_id, data.timeframe)
-                if key not in groups:
-                    groups[key] = []
-                groups[key].append(data)
+        async with get_session() as session:
+            exchange_obj = await self._get_or_create_exchange(session, exchange_id)
+            self._exchange_map[exchange_obj.id] = exchange_id
             
-            for (exchange_id, symbol_id, timeframe), data in groups.items():
-                if len(data) < 2:
+        fetched, derived = self._plan_timeframes()
+        
+        for symbol in self.config.symbols:
+            for timeframe in fetched:
+                try:
+                    result = await self._process_symbol_timeframe(
+                        exchange_obj,
+                        self.connectors[exchange_id],
+                        symbol,
+                        timeframe,
+                        derived.get(timeframe)
+                    )
+                    
+                    self.stats.update(*result)
+                    self._completed_tasks += 1 + len(derived.get(timeframe, []))
+                    
+                    if self.config.progress_callback:
+                        self.config.progress_callback(
+                            "Download in corso...",
+                            self._completed_tasks,
+                            total_tasks
+                        )
+                        
+                except Exception as e:
+                    self.logger.error(
+                        f"Errore durante il download di {symbol} {timeframe} "
+                        f"su {exchange_id}: {str(e)}"
+                    )
                     continue
                     
-                prices = [d.close for d in data]
-                volumes = [d.volume for d in data]
-                returns = [
-                    (data[i].close - data[i-1].close) / data[i-1].close
-                    for i in range(1, len(data))
-                ]
+    async def stream_live(self, stop_event: Optional[asyncio.Event] = None):
+        """
+        Acquisisce candele live via WebSocket fino a stop_event.
                 
-                market_returns = returns
+        Ogni candela chiusa viene validata e salvata appena ricevuta;
+        i gap dovuti a disconnessioni sono recuperati dal connettore
+        tramite REST. Gli exchange senza supporto streaming sono
+        ignorati.
                 
-                perf = PerformanceMetrics(
-                    exchange_id=exchange_id,
-                    symbol_id=symbol_id,
-                    timeframe=timeframe,
-                    start_time=data[0].timestamp,
-                    end_time=data[-1].timestamp
+        Args:
+            stop_event: Evento di arresto (default: esecuzione indefinita)
+        """
+        stop_event = stop_event or asyncio.Event()
+        ids: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        streams = []
+        fetched, derived = self._plan_timeframes()
+        
+        try:
+            for exchange in self.config.exchanges:
+                exchange_id = exchange['id']
+                if exchange_id not in StreamingConnector.SUPPORTED_EXCHANGES:
+                    self.logger.warning(
+                        f"Streaming non supportato per {exchange_id}, exchange ignorato"
+                    )
+                    continue
+                    
+                async with get_session() as session:
+                    exchange_obj = await self._get_or_create_exchange(session, exchange_id)
+                    self._exchange_map[exchange_obj.id] = exchange_id
+                    for symbol in self.config.symbols:
+                        symbol_obj = await self._get_or_create_symbol(
+                            session, exchange_obj.id, symbol
+                        )
+                        ids[(exchange_id, symbol)] = (exchange_obj.id, symbol_obj.id)
+                        
+                config = dict(exchange['config'])
+                config.setdefault('symbols', self.config.symbols)
+                config.setdefault('timeframes', fetched)
+                
+                connector = await create_stream_connector(
+                    exchange_id,
+                    config,
+                    candle_sink=self._make_candle_sink(exchange_id, ids, derived)
                 )
-                perf.calculate_metrics(prices, volumes)
-                session.add(perf)
+                self.connectors[exchange_id] = connector
+                streams.append(connector)
+                await connector.start()
+                
+            if not streams:
+                self.logger.error("Nessun exchange configurato supporta lo streaming")
+                return
+                
+            await stop_event.wait()
+            
+        finally:
+            for connector in streams:
+                await connector.close()
+                
+    def _make_candle_sink(
+        self,
+        exchange_id: str,
+        ids: Dict[Tuple[str, str], Tuple[int, int]],
+        derived: Optional[Dict[str, List[str]]] = None
+    ):
+        """
+        Crea la callback che valida e salva le candele live.
+        
+        Le candele dei timeframe base in 'derived' alimentano un
+        resampler per simbolo; le barre superiori sono salvate alla
+        loro chiusura.
+        """
+        resamplers: Dict[Tuple[str, str], StreamingResampler] = {}
+        
+        async def sink(symbol: str, timeframe: str, candle: List[float]):
+            self.stats.update(1, 0, 0, 0)
+            if self.config.validate_data and not self._is_valid_candle(candle):
+                self.stats.update(0, 0, 1, 0)
+                return
                 
-                risk = RiskMetrics(
-                    exchange_id=exchange_id,
-                    symbol_id=symbol_id,
-                    timeframe=timeframe,
-                    start_time=data[0].timestamp,
-                    end_time=data[-1].timestamp
+            if self.config.online_validation:
+                accepted, failures = self.online_validator.validate(
+                    f"{exchange_id}:{symbol}", timeframe, candle
                 )
-                risk.calculate_metrics(returns, market_returns, volumes[1:])
-                session.add(risk)
+                for failure in failures:
+                    self.logger.warning(
+                        f"{symbol} {timeframe} {failure.rule.name}: {failure.details}"
+                    )
+                if not accepted:
+                    self.stats.update(0, 0, 1, 0)
+                    return
             
-            await session.commit()
+            db_exchange_id, db_symbol_id = ids[(exchange_id, symbol)]
+            async with get_session() as session:
+                await self._save_market_data(
+                    session,
+                    db_exchange_id,
+                    db_symbol_id,
+                    timeframe,
+                    [candle]
+                )
+                
+                if derived and timeframe in derived:
+                    key = (symbol, timeframe)
+                    if key not in resamplers:
+                        resamplers[key] = StreamingResampler(
+                            timeframe,
+                            derived[timeframe],
+                            skip_partial_start=True
+                        )
+                    await self._save_derived(
+                        session,
+                        db_exchange_id,
+                        db_symbol_id,
+                        resamplers[key].update(candle)
+                    )
+            self.stats.update(0, 1, 0, 0)
+            
+        return sink
+        
+    async def _update_metrics(self, session: AsyncSession):
+        """Aggiorna metriche di performance e rischio dei gruppi modificati."""
+        try:
+            job = MetricsJob()
+            await job.ensure_schema(session)
+            await job.run(session)
                 
         except SQLAlchemyError as e:
             self.logger.error(f"Errore aggiornamento metriche: {str(e)}")
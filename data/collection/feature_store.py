@@ -0,0 +1,430 @@
+"""
+Feature Store
+-----------
+Archivio persistente degli indicatori calcolati dal DataProcessor.
+Ogni feature è salvata in colonne NumPy a segmenti (append
+incrementale) per (exchange, simbolo, timeframe, feature,
+params_hash, versione codice). Un segmento è invalidato quando
+cambiano le candele da cui è stato calcolato.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .planner import params_fingerprint
+
+# Colonne delle candele usate per l'impronta dei segmenti
+CANDLE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+@dataclass(frozen=True)
+class FeatureKey:
+    """Chiave di una feature nello store."""
+    exchange: str
+    symbol: str
+    timeframe: str
+    feature: str
+    params_hash: str
+    version: int = 1
+    
+    @property
+    def path(self) -> Path:
+        """Percorso relativo della feature."""
+        return Path(
+            self.exchange,
+            self.symbol.replace('/', ''),
+            self.timeframe,
+            f"{self.feature}-{self.params_hash}-v{self.version}"
+        )
+
+class FeatureStoreStats:
+    """Statistiche feature store."""
+    
+    def __init__(self):
+        self.appended_rows = 0
+        self.loaded_rows = 0
+        self.invalidated_segments = 0
+        self.hits = 0
+        self.misses = 0
+        
+    @property
+    def hit_rate(self) -> float:
+        """Calcola tasso di riuso."""
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+def to_nanoseconds(index: pd.Index) -> np.ndarray:
+    """Converte un indice temporale in int64 (ns UTC, senza timezone)."""
+    return np.asarray(index.values).astype('datetime64[ns]').view(np.int64)
+
+def timezone_name(index: pd.Index) -> Optional[str]:
+    """Timezone di un indice temporale (None se senza timezone)."""
+    tz = getattr(index, 'tz', None)
+    return None if tz is None else str(tz)
+
+def from_nanoseconds(values: np.ndarray, tz: Optional[str] = None) -> pd.DatetimeIndex:
+    """
+    Ricostruisce un indice temporale da int64 (ns UTC).
+    
+    Args:
+        values: Timestamp in nanosecondi
+        tz: Timezone dell'indice originale (None = senza timezone)
+        
+    Returns:
+        Indice temporale nella timezone originale
+    """
+    index = pd.DatetimeIndex(np.asarray(values, dtype=np.int64).view('datetime64[ns]'))
+    if tz is not None:
+        index = index.tz_localize('UTC').tz_convert(tz)
+    return index
+
+def candles_fingerprint(candles: pd.DataFrame) -> str:
+    """
+    Impronta di un intervallo di candele.
+    
+    Args:
+        candles: Candele (indice temporale, colonne OHLCV)
+        
+    Returns:
+        Digest esadecimale
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(to_nanoseconds(candles.index).tobytes())
+    for column in CANDLE_COLUMNS:
+        if column in candles.columns:
+            digest.update(candles[column].to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+class FeatureStore:
+    """Archivio colonnare delle feature calcolate."""
+    
+    MANIFEST = 'manifest.json'
+    
+    def __init__(self, root: str = 'data/features'):
+        """
+        Inizializza lo store.
+        
+        Args:
+            root: Directory radice
+        """
+        self.root = Path(root)
+        self.logger = logging.getLogger(__name__)
+        self.stats = FeatureStoreStats()
+        
+    def key_for(
+        self,
+        exchange: str,
+        symbol: str,
+        timeframe: str,
+        step: Any
+    ) -> FeatureKey:
+        """
+        Costruisce la chiave di uno step di processing.
+        
+        Args:
+            exchange: Nome exchange
+            symbol: Simbolo trading
+            timeframe: Timeframe
+            step: ProcessingStep
+            
+        Returns:
+            Chiave della feature
+        """
+        return FeatureKey(
+            exchange,
+            symbol,
+            timeframe,
+            step.name,
+            params_fingerprint(step.params),
+            step.version
+        )
+        
+    def read_manifest(self, key: FeatureKey) -> Dict[str, Any]:
+        """
+        Legge il manifest di una feature.
+        
+        Args:
+            key: Chiave della feature
+            
+        Returns:
+            Manifest (vuoto se la feature non esiste)
+        """
+        path = self.root / key.path / self.MANIFEST
+        if not path.exists():
+            return {'columns': [], 'segments': []}
+        with open(path) as f:
+            return json.load(f)
+            
+    def _write_manifest(self, key: FeatureKey, manifest: Dict[str, Any]) -> None:
+        """Scrive il manifest in modo atomico."""
+        directory = self.root / key.path
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = directory / f"{self.MANIFEST}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, directory / self.MANIFEST)
+        
+    def last_timestamp(self, key: FeatureKey) -> Optional[pd.Timestamp]:
+        """
+        Ultimo timestamp salvato.
+        
+        Args:
+            key: Chiave della feature
+            
+        Returns:
+            Timestamp o None se la feature è vuota
+        """
+        manifest = self.read_manifest(key)
+        if not manifest['segments']:
+            return None
+        return from_nanoseconds([manifest['segments'][-1]['end']], manifest.get('tz'))[0]
+        
+    def append(
+        self,
+        key: FeatureKey,
+        features: pd.DataFrame,
+        candles: pd.DataFrame
+    ) -> int:
+        """
+        Aggiunge le righe successive all'ultimo timestamp salvato.
+        
+        I timestamp sono salvati in UTC; la timezone dell'indice è
+        registrata nel manifest e ripristinata in lettura.
+        
+        Args:
+            key: Chiave della feature
+            features: Colonne della feature (indice temporale)
+            candles: Candele da cui sono state calcolate
+            
+        Returns:
+            Numero di righe aggiunte
+        """
+        manifest = self.read_manifest(key)
+        timestamps = to_nanoseconds(features.index)
+        
+        if manifest['segments']:
+            if list(features.columns) != manifest['columns']:
+                raise ValueError(
+                    f"Colonne di {key.feature} diverse dal manifest: "
+                    f"{list(features.columns)} != {manifest['columns']}"
+                )
+            if timezone_name(features.index) != manifest.get('tz'):
+                raise ValueError(
+                    f"Timezone di {key.feature} diversa dal manifest: "
+                    f"{timezone_name(features.index)} != {manifest.get('tz')}"
+                )
+            mask = timestamps > manifest['segments'][-1]['end']
+            features = features[mask]
+            timestamps = timestamps[mask]
+        else:
+            manifest['columns'] = list(features.columns)
+            manifest['tz'] = timezone_name(features.index)
+            manifest['history_start'] = (
+                int(to_nanoseconds(candles.index[:1])[0]) if len(candles) else None
+            )
+            
+        if len(features) == 0:
+            return 0
+            
+        start, end = int(timestamps[0]), int(timestamps[-1])
+        name = f"seg_{len(manifest['segments']):05d}.npz"
+        directory = self.root / key.path
+        directory.mkdir(parents=True, exist_ok=True)
+        
+        np.savez(
+            directory / name,
+            timestamp=timestamps,
+            **{
+                f"c{i}": features[column].to_numpy()
+                for i, column in enumerate(manifest['columns'])
+            }
+        )
+        
+        manifest['segments'].append({
+            'file': name,
+            'start': start,
+            'end': end,
+            'rows': len(features),
+            'candles_hash': candles_fingerprint(
+                self._candle_range(candles, start, end)
+            )
+        })
+        self._write_manifest(key, manifest)
+        
+        self.stats.appended_rows += len(features)
+        return len(features)
+        
+    def load(
+        self,
+        key: FeatureKey,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None
+    ) -> pd.DataFrame:
+        """
+        Carica una feature.
+        
+        Sono letti solo i segmenti che intersecano [start, end].
+        
+        Args:
+            key: Chiave della feature
+            start: Timestamp iniziale
+            end: Timestamp finale
+            
+        Returns:
+            DataFrame della feature (vuoto se assente), indicizzato
+            nella timezone delle candele salvate
+        """
+        manifest = self.read_manifest(key)
+        columns = manifest['columns']
+        start_ns = to_nanoseconds(pd.DatetimeIndex([start]))[0] if start is not None else None
+        end_ns = to_nanoseconds(pd.DatetimeIndex([end]))[0] if end is not None else None
+        
+        frames = []
+        for segment in manifest['segments']:
+            if start_ns is not None and segment['end'] < start_ns:
+                continue
+            if end_ns is not None and segment['start'] > end_ns:
+                continue
+            with np.load(self.root / key.path / segment['file']) as data:
+                frame = pd.DataFrame(
+                    {column: data[f"c{i}"] for i, column in enumerate(columns)},
+                    index=data['timestamp']
+                )
+            frames.append(frame)
+            
+        if not frames:
+            return pd.DataFrame(columns=columns, dtype=float)
+            
+        df = pd.concat(frames)
+        # Filtro sui ns UTC: start/end possono avere o no la timezone
+        if start_ns is not None:
+            df = df[df.index >= start_ns]
+        if end_ns is not None:
+            df = df[df.index <= end_ns]
+        df.index = from_nanoseconds(df.index.to_numpy(), manifest.get('tz'))
+        
+        self.stats.loaded_rows += len(df)
+        return df
+        
+    def validate(
+        self,
+        key: FeatureKey,
+        candles: pd.DataFrame,
+        hash_cache: Optional[Dict[Tuple[int, int], str]] = None
+    ) -> Optional[pd.Timestamp]:
+        """
+        Verifica i segmenti rispetto alle candele correnti.
+        
+        Gli indicatori dipendono dallo storico: dal primo segmento le
+        cui candele sono cambiate in poi, tutti i segmenti sono rimossi.
+        Se cambia la prima candela dello storico o la timezone delle
+        candele la feature è rimossa.
+        
+        Args:
+            key: Chiave della feature
+            candles: Candele correnti
+            hash_cache: Impronte già calcolate per (start, end)
+            
+        Returns:
+            Ultimo timestamp valido o None
+        """
+        manifest = self.read_manifest(key)
+        segments = manifest['segments']
+        if hash_cache is None:
+            hash_cache = {}
+            
+        # Storico esteso o ridotto all'inizio: tutti i valori cambiano
+        first = int(to_nanoseconds(candles.index[:1])[0]) if len(candles) else None
+        if segments and (
+            manifest.get('history_start') != first
+            or manifest.get('tz') != timezone_name(candles.index)
+        ):
+            segments_to_check = []
+        else:
+            segments_to_check = segments
+            
+        valid = 0
+        for segment in segments_to_check:
+            bounds = (segment['start'], segment['end'])
+            if bounds not in hash_cache:
+                hash_cache[bounds] = candles_fingerprint(
+                    self._candle_range(candles, *bounds)
+                )
+            if hash_cache[bounds] != segment['candles_hash']:
+                break
+            valid += 1
+            
+        if valid < len(segments):
+            for segment in segments[valid:]:
+                (self.root / key.path / segment['file']).unlink(missing_ok=True)
+            self.stats.invalidated_segments += len(segments) - valid
+            self.logger.info(
+                f"Invalidati {len(segments) - valid} segmenti di "
+                f"{key.symbol} {key.timeframe} {key.feature}"
+            )
+            manifest['segments'] = segments[:valid]
+            self._write_manifest(key, manifest)
+            
+        if valid == 0:
+            return None
+        return from_nanoseconds([segments[valid - 1]['end']], manifest.get('tz'))[0]
+        
+    def invalidate(self, key: FeatureKey) -> None:
+        """
+        Rimuove una feature.
+        
+        Args:
+            key: Chiave della feature
+        """
+        shutil.rmtree(self.root / key.path, ignore_errors=True)
+        
+    def prune(self, keys: List[FeatureKey]) -> int:
+        """
+        Rimuove le versioni obsolete (parametri o codice diversi).
+        
+        Args:
+            keys: Chiavi correnti da mantenere
+            
+        Returns:
+            Numero di directory rimosse
+        """
+        removed = 0
+        current = {key.path for key in keys}
+        parents = {key.path.parent for key in keys}
+        for parent in parents:
+            directory = self.root / parent
+            if not directory.exists():
+                continue
+            for entry in directory.iterdir():
+                relative = entry.relative_to(self.root)
+                feature = entry.name.split('-')[0]
+                if (
+                    entry.is_dir()
+                    and relative not in current
+                    and any(k.feature == feature and k.path.parent == parent for k in keys)
+                ):
+                    shutil.rmtree(entry, ignore_errors=True)
+                    removed += 1
+        return removed
+        
+    def _candle_range(
+        self,
+        candles: pd.DataFrame,
+        start: int,
+        end: int
+    ) -> pd.DataFrame:
+        """Candele con timestamp in [start, end] (ns)."""
+        timestamps = to_nanoseconds(candles.index)
+        lo = np.searchsorted(timestamps, start, side='left')
+        hi = np.searchsorted(timestamps, end, side='right')
+        return candles.iloc[lo:hi]
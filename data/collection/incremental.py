@@ -0,0 +1,498 @@
+"""
+Incremental Indicators
+--------------------
+Calcolo incrementale degli indicatori del DataProcessor.
+Mantiene lo stato di ogni indicatore (somme mobili, EMA, medie
+di Wilder, accumulatore OBV) per (simbolo, timeframe): aggiungere
+N candele costa O(N) invece di ricalcolare l'intero storico.
+"""
+
+import math
+import logging
+from typing import Dict, List, Any, Optional, Tuple, Callable
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+
+class RollingWindow:
+    """Finestra mobile con somma e somma dei quadrati."""
+    
+    def __init__(self, size: int):
+        self.size = size
+        self.values: deque = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        
+    def push(self, value: float) -> None:
+        """Aggiunge un valore, rimuovendo il più vecchio se pieno."""
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+        if len(self.values) > self.size:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+            
+    @property
+    def full(self) -> bool:
+        """Indica se la finestra è completa."""
+        return len(self.values) == self.size
+        
+    @property
+    def mean(self) -> float:
+        """Media della finestra."""
+        return self.total / len(self.values)
+        
+    def variance(self, ddof: int = 0) -> float:
+        """Varianza della finestra."""
+        n = len(self.values)
+        mean = self.total / n
+        var = (self.total_sq - n * mean * mean) / (n - ddof)
+        return max(var, 0.0)
+
+class SMAState:
+    """Media mobile semplice (semantica talib.SMA)."""
+    
+    def __init__(self, period: int):
+        self.window = RollingWindow(period)
+        
+    def update(self, value: float) -> float:
+        self.window.push(value)
+        return self.window.mean if self.window.full else NAN
+
+class EMAState:
+    """
+    Media mobile esponenziale (semantica talib.EMA).
+    
+    Il primo valore è la media semplice dei primi 'period' campioni.
+    Con skip > 0 i primi 'skip' campioni sono ignorati, come fa
+    talib.MACD per allineare la EMA veloce alla lenta.
+    """
+    
+    def __init__(self, period: int, skip: int = 0):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.skip = skip
+        self.seed: List[float] = []
+        self.value: Optional[float] = None
+        
+    def update(self, value: float) -> float:
+        if self.value is not None:
+            self.value += self.alpha * (value - self.value)
+            return self.value
+            
+        if self.skip > 0:
+            self.skip -= 1
+            return NAN
+            
+        self.seed.append(value)
+        if len(self.seed) < self.period:
+            return NAN
+            
+        self.value = sum(self.seed) / self.period
+        self.seed = []
+        return self.value
+
+class RSIState:
+    """RSI con medie di Wilder (semantica talib.RSI)."""
+    
+    def __init__(self, period: int):
+        self.period = period
+        self.prev: Optional[float] = None
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        
+    def update(self, value: float) -> float:
+        if self.prev is None:
+            self.prev = value
+            return NAN
+            
+        change = value - self.prev
+        self.prev = value
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        self.count += 1
+        
+        if self.count <= self.period:
+            # Fase di seed: media semplice dei primi 'period' cambi
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            if self.count < self.period:
+                return NAN
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+            
+        total = self.avg_gain + self.avg_loss
+        return 100.0 * self.avg_gain / total if total != 0 else 0.0
+
+class MACDState:
+    """MACD, signal e istogramma (semantica talib.MACD)."""
+    
+    def __init__(self, fastperiod: int, slowperiod: int, signalperiod: int):
+        if slowperiod < fastperiod:
+            fastperiod, slowperiod = slowperiod, fastperiod
+        self.fast = EMAState(fastperiod, skip=slowperiod - fastperiod)
+        self.slow = EMAState(slowperiod)
+        self.signal = EMAState(signalperiod)
+        
+    def update(self, value: float) -> Tuple[float, float, float]:
+        fast = self.fast.update(value)
+        slow = self.slow.update(value)
+        if math.isnan(slow):
+            return NAN, NAN, NAN
+            
+        macd = fast - slow
+        signal = self.signal.update(macd)
+        if math.isnan(signal):
+            # talib allinea le tre uscite al primo valore di signal
+            return NAN, NAN, NAN
+        return macd, signal, macd - signal
+
+class BollingerState:
+    """Bande di Bollinger su SMA (semantica talib.BBANDS)."""
+    
+    def __init__(self, period: int, stdev: float):
+        self.window = RollingWindow(period)
+        self.stdev = stdev
+        
+    def update(self, value: float) -> Tuple[float, float, float]:
+        self.window.push(value)
+        if not self.window.full:
+            return NAN, NAN, NAN
+            
+        middle = self.window.mean
+        band = self.stdev * math.sqrt(self.window.variance())
+        return middle + band, middle, middle - band
+
+class OBVState:
+    """On Balance Volume (semantica talib.OBV)."""
+    
+    def __init__(self):
+        self.prev: Optional[float] = None
+        self.value = 0.0
+        
+    def update(self, close: float, volume: float) -> float:
+        if self.prev is None:
+            self.value = volume
+        elif close > self.prev:
+            self.value += volume
+        elif close < self.prev:
+            self.value -= volume
+        self.prev = close
+        return self.value
+
+class VolatilityState:
+    """Deviazione standard mobile dei rendimenti (ddof=1, come pandas)."""
+    
+    def __init__(self, window: int):
+        self.window = RollingWindow(window)
+        self.prev: Optional[float] = None
+        
+    def update(self, value: float) -> float:
+        prev, self.prev = self.prev, value
+        if prev is None:
+            return NAN
+            
+        self.window.push(value / prev - 1.0)
+        if not self.window.full:
+            return NAN
+        return math.sqrt(self.window.variance(ddof=1))
+
+class IncrementalIndicator:
+    """
+    Indicatore incrementale associato a uno step del DataProcessor.
+    
+    Args:
+        columns: Colonne prodotte
+        update: Funzione (close, volume) -> valori delle colonne
+    """
+    
+    def __init__(
+        self,
+        columns: List[str],
+        update: Callable[[float, float], Tuple[float, ...]]
+    ):
+        self.columns = columns
+        self.update = update
+
+def _sma(periods: List[int], **kwargs: Any) -> IncrementalIndicator:
+    states = [SMAState(p) for p in periods]
+    return IncrementalIndicator(
+        [f'sma_{p}' for p in periods],
+        lambda close, volume: tuple(s.update(close) for s in states)
+    )
+
+def _ema(periods: List[int], **kwargs: Any) -> IncrementalIndicator:
+    states = [EMAState(p) for p in periods]
+    return IncrementalIndicator(
+        [f'ema_{p}' for p in periods],
+        lambda close, volume: tuple(s.update(close) for s in states)
+    )
+
+def _rsi(period: int, **kwargs: Any) -> IncrementalIndicator:
+    state = RSIState(period)
+    return IncrementalIndicator(
+        ['rsi'],
+        lambda close, volume: (state.update(close),)
+    )
+
+def _macd(
+    fastperiod: int,
+    slowperiod: int,
+    signalperiod: int,
+    **kwargs: Any
+) -> IncrementalIndicator:
+    state = MACDState(fastperiod, slowperiod, signalperiod)
+    return IncrementalIndicator(
+        ['macd', 'macd_signal', 'macd_hist'],
+        lambda close, volume: state.update(close)
+    )
+
+def _bollinger(period: int, stdev: float, **kwargs: Any) -> IncrementalIndicator:
+    state = BollingerState(period, stdev)
+    return IncrementalIndicator(
+        ['bb_upper', 'bb_middle', 'bb_lower'],
+        lambda close, volume: state.update(close)
+    )
+
+def _volume_sma(periods: List[int], **kwargs: Any) -> IncrementalIndicator:
+    states = [SMAState(p) for p in periods]
+    return IncrementalIndicator(
+        [f'volume_sma_{p}' for p in periods],
+        lambda close, volume: tuple(s.update(volume) for s in states)
+    )
+
+def _obv(**kwargs: Any) -> IncrementalIndicator:
+    state = OBVState()
+    return IncrementalIndicator(
+        ['obv'],
+        lambda close, volume: (state.update(close, volume),)
+    )
+
+def _returns(**kwargs: Any) -> IncrementalIndicator:
+    prev = [None]
+    
+    def update(close: float, volume: float) -> Tuple[float]:
+        value = NAN if prev[0] is None else close / prev[0] - 1.0
+        prev[0] = close
+        return (value,)
+        
+    return IncrementalIndicator(['returns'], update)
+
+def _log_returns(**kwargs: Any) -> IncrementalIndicator:
+    prev = [None]
+    
+    def update(close: float, volume: float) -> Tuple[float]:
+        value = NAN if prev[0] is None else math.log(close) - math.log(prev[0])
+        prev[0] = close
+        return (value,)
+        
+    return IncrementalIndicator(['log_returns'], update)
+
+def _volatility(window: int, **kwargs: Any) -> IncrementalIndicator:
+    state = VolatilityState(window)
+    return IncrementalIndicator(
+        ['volatility'],
+        lambda close, volume: (state.update(close),)
+    )
+
+def _momentum(periods: List[int], **kwargs: Any) -> IncrementalIndicator:
+    history: deque = deque(maxlen=max(periods) + 1)
+    
+    def update(close: float, volume: float) -> Tuple[float, ...]:
+        history.append(close)
+        n = len(history)
+        return tuple(
+            close / history[n - 1 - p] - 1.0 if n > p else NAN
+            for p in periods
+        )
+        
+    return IncrementalIndicator([f'momentum_{p}' for p in periods], update)
+
+# Step del DataProcessor che supportano il calcolo incrementale
+INCREMENTAL_INDICATORS: Dict[str, Callable[..., IncrementalIndicator]] = {
+    'sma': _sma,
+    'ema': _ema,
+    'rsi': _rsi,
+    'macd': _macd,
+    'bollinger': _bollinger,
+    'volume_sma': _volume_sma,
+    'obv': _obv,
+    'returns': _returns,
+    'log_returns': _log_returns,
+    'volatility': _volatility,
+    'momentum': _momentum
+}
+
+class IndicatorState:
+    """Stato incrementale degli indicatori di una serie."""
+    
+    def __init__(self, indicators: List[IncrementalIndicator]):
+        self.indicators = indicators
+        self.columns = [c for ind in indicators for c in ind.columns]
+        self.last_index: Any = None
+        self.last_close: Optional[float] = None
+        self.candles = 0
+        
+    def update_candle(
+        self,
+        index: Any,
+        close: float,
+        volume: float
+    ) -> Optional[Dict[str, float]]:
+        """
+        Aggiorna lo stato con una singola candela.
+        
+        Percorso per gli aggiornamenti live: non crea DataFrame.
+        
+        Args:
+            index: Timestamp della candela
+            close: Prezzo di chiusura
+            volume: Volume
+            
+        Returns:
+            Valori degli indicatori, None se la candela è già elaborata
+        """
+        if self.last_index is not None and index <= self.last_index:
+            return None
+            
+        row = self._step(close, volume)
+        self.last_index = index
+        self.candles += 1
+        return dict(zip(self.columns, row))
+        
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Aggiorna lo stato con nuove candele.
+        
+        Le righe con indice non successivo all'ultimo già elaborato
+        sono scartate. Close mancanti sono riempiti in avanti e
+        volumi mancanti con 0, come nel preprocessing batch.
+        
+        Args:
+            df: Nuove candele
+            
+        Returns:
+            Nuove candele con le colonne indicatore
+        """
+        if not df.index.is_monotonic_increasing or not df.index.is_unique:
+            df = df[~df.index.duplicated(keep='last')].sort_index()
+        if self.last_index is not None and len(df) and df.index[0] <= self.last_index:
+            df = df[df.index > self.last_index]
+        if df.empty:
+            return df.reindex(columns=list(df.columns) + self.columns)
+            
+        closes = df['close'].to_numpy(dtype=float)
+        volumes = df['volume'].to_numpy(dtype=float)
+        out = np.empty((len(df), len(self.columns)))
+        
+        for i in range(len(df)):
+            out[i] = self._step(closes[i], volumes[i])
+            
+        self.last_index = df.index[-1]
+        self.candles += len(df)
+        
+        indicators = pd.DataFrame(out, index=df.index, columns=self.columns)
+        return pd.concat([df, indicators], axis=1)
+        
+    def _step(self, close: float, volume: float) -> List[float]:
+        """Aggiorna tutti gli indicatori con una candela."""
+        if close != close:
+            if self.last_close is None:
+                return [NAN] * len(self.columns)
+            close = self.last_close
+        if volume != volume:
+            volume = 0.0
+            
+        row: List[float] = []
+        for indicator in self.indicators:
+            row.extend(indicator.update(close, volume))
+        self.last_close = close
+        return row
+
+class IncrementalEngine:
+    """Gestore degli stati incrementali per (simbolo, timeframe)."""
+    
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.states: Dict[Tuple[str, str], IndicatorState] = {}
+        
+    def update(
+        self,
+        key: Tuple[str, str],
+        df: pd.DataFrame,
+        steps: List[Tuple[str, Dict[str, Any]]]
+    ) -> pd.DataFrame:
+        """
+        Aggiorna gli indicatori di una serie.
+        
+        Args:
+            key: (simbolo, timeframe)
+            df: Nuove candele
+            steps: Coppie (nome step, parametri) da calcolare
+            
+        Returns:
+            Nuove candele con le colonne indicatore
+        """
+        return self._get_state(key, steps).update(df)
+        
+    def update_candle(
+        self,
+        key: Tuple[str, str],
+        index: Any,
+        close: float,
+        volume: float,
+        steps: List[Tuple[str, Dict[str, Any]]]
+    ) -> Optional[Dict[str, float]]:
+        """
+        Aggiorna gli indicatori di una serie con una candela.
+        
+        Args:
+            key: (simbolo, timeframe)
+            index: Timestamp della candela
+            close: Prezzo di chiusura
+            volume: Volume
+            steps: Coppie (nome step, parametri) da calcolare
+            
+        Returns:
+            Valori degli indicatori, None se la candela è già elaborata
+        """
+        return self._get_state(key, steps).update_candle(index, close, volume)
+        
+    def _get_state(
+        self,
+        key: Tuple[str, str],
+        steps: List[Tuple[str, Dict[str, Any]]]
+    ) -> IndicatorState:
+        """Recupera o crea lo stato di una serie."""
+        state = self.states.get(key)
+        if state is None:
+            indicators = []
+            for name, params in steps:
+                factory = INCREMENTAL_INDICATORS.get(name)
+                if factory is None:
+                    self.logger.warning(
+                        f"Step {name} non supporta il calcolo incrementale"
+                    )
+                    continue
+                indicators.append(factory(**params))
+            state = IndicatorState(indicators)
+            self.states[key] = state
+        return state
+        
+    def reset(self, key: Optional[Tuple[str, str]] = None) -> None:
+        """
+        Elimina lo stato di una serie o di tutte.
+        
+        Args:
+            key: (simbolo, timeframe) da resettare
+        """
+        if key is None:
+            self.states.clear()
+        else:
+            self.states.pop(key, None)
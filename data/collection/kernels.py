@@ -0,0 +1,466 @@
+"""
+Numba Kernels
+-----------
+Kernel compilati con numba per gli indicatori ricorsivi (EMA, RSI,
+OBV, ATR) e per gli estremi e i quantili mobili, che NumPy non
+vettorizza senza passate aggiuntive.
+La compilazione è salvata su disco (cache=True): dopo la prima
+esecuzione i kernel sono caricati dalla cache senza warmup JIT.
+Se numba non è installato il modulo resta importabile ma
+NUMBA_AVAILABLE è False.
+"""
+
+import logging
+import time
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """Sostituto senza compilazione quando numba non è installato."""
+        def decorator(function):
+            return function
+        return decorator
+
+logger = logging.getLogger(__name__)
+
+# Opzioni comuni: cache su disco, GIL rilasciato per l'uso da thread
+_jit = njit(cache=True, nogil=True)
+
+@_jit
+def first_valid(x: np.ndarray) -> int:
+    """Indice del primo valore non NaN (len(x) se assente)."""
+    for i in range(x.shape[0]):
+        if not np.isnan(x[i]):
+            return i
+    return x.shape[0]
+
+@_jit
+def ema(x: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    """
+    Media mobile esponenziale con seed SMA (talib.EMA).
+    
+    Args:
+        x: Serie, con eventuali NaN solo iniziali
+        period: Periodo del seed
+        alpha: Fattore di smoothing
+        
+    Returns:
+        Serie della EMA
+    """
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    start = first_valid(x)
+    seed_row = start + period - 1
+    if seed_row >= n:
+        return out
+        
+    total = 0.0
+    for i in range(start, seed_row + 1):
+        total += x[i]
+    value = total / period
+    out[seed_row] = value
+    
+    for i in range(seed_row + 1, n):
+        value = (x[i] - value) * alpha + value
+        out[i] = value
+    return out
+
+@_jit
+def rsi(x: np.ndarray, period: int) -> np.ndarray:
+    """
+    RSI con medie di Wilder (talib.RSI).
+    
+    Dopo un NaN interno l'RSI resta NaN: talib prosegue con medie non
+    valide.
+    
+    Args:
+        x: Serie dei prezzi
+        period: Periodo
+        
+    Returns:
+        Serie dell'RSI
+    """
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    start = first_valid(x)
+    if start + period >= n:
+        return out
+        
+    gain = 0.0
+    loss = 0.0
+    for i in range(start + 1, start + period + 1):
+        delta = x[i] - x[i - 1]
+        if delta > 0:
+            gain += delta
+        else:
+            loss -= delta
+    gain /= period
+    loss /= period
+    out[start + period] = 100.0 * gain / (gain + loss) if gain + loss != 0 else 0.0
+    
+    for i in range(start + period + 1, n):
+        delta = x[i] - x[i - 1]
+        if np.isnan(delta):
+            # Un NaN interno invalida le medie fino alla fine (come il backend NumPy)
+            break
+        gain = (gain * (period - 1) + (delta if delta > 0 else 0.0)) / period
+        loss = (loss * (period - 1) + (-delta if delta < 0 else 0.0)) / period
+        out[i] = 100.0 * gain / (gain + loss) if gain + loss != 0 else 0.0
+    return out
+
+@_jit
+def obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """
+    On Balance Volume (talib.OBV).
+    
+    Args:
+        close: Prezzi di chiusura
+        volume: Volumi
+        
+    Returns:
+        Serie dell'OBV
+    """
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    start = max(first_valid(close), first_valid(volume))
+    if start >= n:
+        return out
+        
+    value = volume[start]
+    previous = close[start]
+    out[start] = value
+    for i in range(start + 1, n):
+        if close[i] > previous:
+            value += volume[i]
+        elif close[i] < previous:
+            value -= volume[i]
+        previous = close[i]
+        out[i] = value
+    return out
+
+@_jit
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """
+    True Range rispetto alla chiusura precedente (talib.TRANGE).
+    
+    Args:
+        high: Massimi
+        low: Minimi
+        close: Chiusure
+        
+    Returns:
+        Serie del True Range (NaN sulla prima riga)
+    """
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    for i in range(1, n):
+        previous = close[i - 1]
+        if np.isnan(previous):
+            continue
+        out[i] = max(
+            high[i] - low[i],
+            abs(high[i] - previous),
+            abs(low[i] - previous)
+        )
+    return out
+
+@_jit
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    """
+    Average True Range con medie di Wilder (talib.ATR).
+    
+    Args:
+        high: Massimi
+        low: Minimi
+        close: Chiusure
+        period: Periodo
+        
+    Returns:
+        Serie dell'ATR
+    """
+    return ema(true_range(high, low, close), period, 1.0 / period)
+
+@_jit
+def candle_shape(
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    doji_ratio: float
+) -> np.ndarray:
+    """
+    Feature di forma della candela in un'unica passata.
+    
+    Args:
+        open_: Aperture
+        high: Massimi
+        low: Minimi
+        close: Chiusure
+        doji_ratio: Corpo massimo di un doji rispetto al range
+        
+    Returns:
+        Matrice (7 × n) nell'ordine di vectorized.CANDLE_SHAPE_COLUMNS
+    """
+    n = close.shape[0]
+    out = np.empty((7, n))
+    for i in range(n):
+        body = close[i] - open_[i]
+        span = high[i] - low[i]
+        if np.isnan(body) or np.isnan(span):
+            out[:, i] = np.nan
+            continue
+        size = abs(body)
+        out[0, i] = max(span, abs(high[i] - close[i]), abs(low[i] - close[i]))
+        out[1, i] = size
+        out[2, i] = high[i] - max(open_[i], close[i])
+        out[3, i] = min(open_[i], close[i]) - low[i]
+        out[4, i] = 1.0 if body > 0 else 0.0
+        out[5, i] = 1.0 if body < 0 else 0.0
+        out[6, i] = 1.0 if size <= doji_ratio * span else 0.0
+    return out
+
+@_jit
+def rolling_extreme(x: np.ndarray, window: int, maximum: bool) -> np.ndarray:
+    """
+    Massimo (o minimo) mobile con deque monotona, O(n).
+    
+    Args:
+        x: Serie senza NaN
+        window: Lunghezza finestra
+        maximum: True per il massimo, False per il minimo
+        
+    Returns:
+        Serie degli estremi (NaN prima della finestra completa)
+    """
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    queue = np.empty(n, dtype=np.int64)
+    head = 0
+    tail = 0
+    for i in range(n):
+        value = x[i]
+        if maximum:
+            while tail > head and x[queue[tail - 1]] <= value:
+                tail -= 1
+        else:
+            while tail > head and x[queue[tail - 1]] >= value:
+                tail -= 1
+        queue[tail] = i
+        tail += 1
+        if queue[head] <= i - window:
+            head += 1
+        if i >= window - 1:
+            out[i] = x[queue[head]]
+    return out
+
+@_jit
+def _fenwick_add(tree: np.ndarray, position: int, value: float) -> None:
+    """Aggiunge value alla posizione (da 0) di un albero di Fenwick."""
+    position += 1
+    while position < tree.shape[0]:
+        tree[position] += value
+        position += position & -position
+
+@_jit
+def _fenwick_prefix(tree: np.ndarray, stop: int) -> float:
+    """Somma delle posizioni [0, stop) di un albero di Fenwick."""
+    total = 0.0
+    while stop > 0:
+        total += tree[stop]
+        stop &= stop - 1
+    return total
+
+@_jit
+def _fenwick_select(counts: np.ndarray, k: int, step: int) -> int:
+    """
+    Posizione del k-esimo elemento presente (da 0).
+    
+    Args:
+        counts: Albero di Fenwick dei conteggi
+        k: Rango cercato
+        step: Massima potenza di 2 non superiore alle posizioni
+        
+    Returns:
+        Posizione dell'elemento
+    """
+    position = 0
+    while step > 0:
+        following = position + step
+        if following < counts.shape[0] and counts[following] <= k:
+            position = following
+            k -= int(counts[following])
+        step >>= 1
+    return position
+
+@_jit
+def rolling_quantiles(
+    x: np.ndarray,
+    window: int,
+    probs: np.ndarray
+) -> tuple:
+    """
+    Quantili mobili e media delle code, O(n log window).
+    
+    La serie è divisa in blocchi di window valori: le finestre che
+    terminano in un blocco usano solo i valori dei 2 × window indici
+    precedenti, ordinati una volta per blocco. Due alberi di Fenwick
+    sui ranghi di questi valori (conteggi e somme) danno in
+    O(log window) l'elemento di rango k e somma e numero dei valori
+    fino a una soglia. I quantili usano l'interpolazione lineare di
+    np.percentile; la coda è la media dei valori minori o uguali al
+    quantile.
+    
+    Args:
+        x: Serie senza NaN
+        window: Lunghezza finestra
+        probs: Probabilità dei quantili (0-1)
+        
+    Returns:
+        (quantili, medie delle code), matrici (len(probs) × n)
+    """
+    n = x.shape[0]
+    m = probs.shape[0]
+    quantiles = np.full((m, n), np.nan)
+    tails = np.full((m, n), np.nan)
+    counts = np.zeros(2 * window + 1)
+    sums = np.zeros(2 * window + 1)
+    step = 1
+    while step * 2 <= 2 * window:
+        step *= 2
+        
+    for block in range(0, n, window):
+        # Valori delle finestre che terminano nel blocco, con i ranghi
+        first = max(block - window + 1, 0)
+        stop = min(block + window, n)
+        order = np.argsort(x[first:stop])
+        values = x[first:stop][order]
+        ranks = np.empty(stop - first, dtype=np.int64)
+        ranks[order] = np.arange(stop - first)
+        
+        counts[:] = 0.0
+        sums[:] = 0.0
+        for j in range(first, block):
+            _fenwick_add(counts, ranks[j - first], 1.0)
+            _fenwick_add(sums, ranks[j - first], x[j])
+            
+        for i in range(block, stop):
+            _fenwick_add(counts, ranks[i - first], 1.0)
+            _fenwick_add(sums, ranks[i - first], x[i])
+            if i - window >= first:
+                _fenwick_add(counts, ranks[i - window - first], -1.0)
+                _fenwick_add(sums, ranks[i - window - first], -x[i - window])
+            if i < window - 1:
+                continue
+                
+            for p in range(m):
+                position = probs[p] * (window - 1)
+                lo = int(position)
+                hi = min(lo + 1, window - 1)
+                low_value = values[_fenwick_select(counts, lo, step)]
+                high_value = values[_fenwick_select(counts, hi, step)]
+                quantile = low_value + (high_value - low_value) * (position - lo)
+                quantiles[p, i] = quantile
+                
+                # Valori fino al quantile: prefisso dei ranghi
+                limit = np.searchsorted(values, quantile, side='right')
+                k = _fenwick_prefix(counts, limit)
+                if k > 0:
+                    tails[p, i] = _fenwick_prefix(sums, limit) / k
+    return quantiles, tails
+
+@_jit
+def rolling_max_drawdown(prices: np.ndarray, window: int) -> np.ndarray:
+    """
+    Massimo drawdown all'interno di ogni finestra, O(n).
+    
+    Il drawdown massimo di un intervallo, min p[j] / max(p[i..j]) - 1,
+    si compone da due sotto-intervalli consecutivi A, B come
+    min(dd(A), dd(B), min(B) / max(A)). La serie è divisa in blocchi
+    di window valori: per ogni indice si calcolano il riepilogo
+    (massimo, minimo, drawdown) dall'inizio del blocco e fino alla fine
+    del blocco, e ogni finestra unisce il suffisso di un blocco con il
+    prefisso del successivo.
+    
+    Args:
+        prices: Prezzi positivi senza NaN
+        window: Lunghezza finestra (prezzi)
+        
+    Returns:
+        Massimo drawdown (<= 0, NaN prima della finestra completa)
+    """
+    n = prices.shape[0]
+    out = np.full(n, np.nan)
+    if window < 1 or window > n:
+        return out
+        
+    prefix_max = np.empty(n)
+    prefix_min = np.empty(n)
+    prefix_dd = np.empty(n)
+    suffix_max = np.empty(n)
+    suffix_min = np.empty(n)
+    suffix_dd = np.empty(n)
+    for start in range(0, n, window):
+        stop = min(start + window, n)
+        high = -np.inf
+        low = np.inf
+        ratio = 1.0
+        for i in range(start, stop):
+            high = max(high, prices[i])
+            low = min(low, prices[i])
+            ratio = min(ratio, prices[i] / high)
+            prefix_max[i] = high
+            prefix_min[i] = low
+            prefix_dd[i] = ratio
+        high = -np.inf
+        low = np.inf
+        ratio = 1.0
+        for i in range(stop - 1, start - 1, -1):
+            high = max(high, prices[i])
+            low = min(low, prices[i])
+            ratio = min(ratio, low / prices[i])
+            suffix_max[i] = high
+            suffix_min[i] = low
+            suffix_dd[i] = ratio
+            
+    for i in range(window - 1, n):
+        first = i - window + 1
+        if first % window == 0:
+            ratio = prefix_dd[i]
+        else:
+            ratio = min(
+                suffix_dd[first],
+                prefix_dd[i],
+                prefix_min[i] / suffix_max[first]
+            )
+        out[i] = ratio - 1.0
+    return out
+
+def warmup() -> float:
+    """
+    Compila (o carica dalla cache su disco) tutti i kernel.
+    
+    Returns:
+        Secondi impiegati
+    """
+    if not NUMBA_AVAILABLE:
+        return 0.0
+        
+    started = time.perf_counter()
+    x = np.linspace(1.0, 2.0, 64)
+    ema(x, 10, 2.0 / 11)
+    rsi(x, 14)
+    obv(x, x)
+    atr(x, x, x, 14)
+    candle_shape(x, x, x, x, 0.1)
+    rolling_extreme(x, 8, True)
+    rolling_quantiles(x, 8, np.array([0.05, 0.95]))
+    rolling_max_drawdown(x, 8)
+    elapsed = time.perf_counter() - started
+    logger.debug(f"Kernel numba pronti in {elapsed:.3f}s")
+    return elapsed
@@ -0,0 +1,393 @@
+"""
+Metrics Job
+---------
+Ricalcolo delle metriche di performance e rischio per gruppo
+(exchange, simbolo, timeframe). Le serie sono lette da SQL come
+array, le metriche sono calcolate con NumPy in parallelo sui gruppi
+e salvate con upsert, una riga per finestra. Sono ricalcolati solo i
+gruppi i cui dati (o quelli del benchmark) sono cambiati dall'ultima
+esecuzione.
+"""
+
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, func, cast, text, Float, Integer
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import MarketData, Symbol, PerformanceMetrics, RiskMetrics
+from .resampler import timeframe_to_ms
+from .correlation import align_returns
+
+GroupKey = Tuple[int, int, str]
+
+# Colonne di identificazione delle righe delle metriche
+METRICS_KEY = ['exchange_id', 'symbol_id', 'timeframe', 'window']
+
+def metric_columns(model: Any) -> List[str]:
+    """Colonne numeriche delle metriche di un modello."""
+    return [
+        column.name for column in model.__table__.columns
+        if isinstance(column.type, Float)
+    ]
+
+def compute_metrics(
+    close: np.ndarray,
+    volume: np.ndarray,
+    market_returns: Optional[np.ndarray] = None,
+    annualization: int = 252
+) -> Tuple[Dict[str, Optional[float]], Dict[str, Optional[float]]]:
+    """
+    Calcola le metriche di performance e rischio di una serie.
+    
+    Args:
+        close: Prezzi di chiusura
+        volume: Volumi
+        market_returns: Rendimenti del benchmark allineati ai rendimenti
+            della serie (NaN se mancanti), None se non disponibili
+        annualization: Periodi per anno per l'alpha
+        
+    Returns:
+        (metriche di performance, metriche di rischio) per colonna
+    """
+    returns = np.diff(close) / close[:-1]
+    
+    with np.errstate(all='ignore'):
+        perf = PerformanceMetrics()
+        perf.calculate_metrics(close, volume)
+        risk = RiskMetrics()
+        risk.calculate_metrics(returns, market_returns, volume[1:])
+        
+        # Beta e alpha rispetto al benchmark sulle osservazioni comuni
+        if market_returns is not None:
+            common = np.isfinite(market_returns)
+            if common.sum() > 2:
+                x = returns[common]
+                y = market_returns[common]
+                variance = y.var()
+                if variance > 0:
+                    perf.beta = np.mean((x - x.mean()) * (y - y.mean())) / variance
+                    perf.alpha = (x.mean() - perf.beta * y.mean()) * annualization
+                    
+    return _finite_values(perf), _finite_values(risk)
+
+def _finite_values(metrics: Any) -> Dict[str, Optional[float]]:
+    """Valori delle metriche, None per valori non finiti."""
+    values = {}
+    for name in metric_columns(type(metrics)):
+        value = getattr(metrics, name)
+        values[name] = (
+            float(value)
+            if value is not None and np.isfinite(value)
+            else None
+        )
+    return values
+
+@dataclass
+class MetricsConfig:
+    """Configurazione del job delle metriche."""
+    # Finestre di calcolo: 'all' = intera serie, altrimenti durata (es. 30d)
+    windows: Tuple[str, ...] = ('all', '30d', '90d')
+    min_candles: int = 3
+    max_threads: int = 4
+    # Gruppi caricati e calcolati per ogni blocco
+    batch_groups: int = 16
+    # Simbolo benchmark per beta e correlazione (None = non calcolati)
+    benchmark: Optional[str] = 'BTC/USDT'
+
+@dataclass
+class MetricsStats:
+    """Statistiche del job delle metriche."""
+    groups: int = 0
+    changed_groups: int = 0
+    updated_rows: int = 0
+    duration: float = 0.0
+
+class MetricsJob:
+    """Ricalcolo incrementale delle metriche per gruppo."""
+    
+    def __init__(self, config: Optional[MetricsConfig] = None):
+        """
+        Inizializza il job.
+        
+        Args:
+            config: Configurazione (default: MetricsConfig())
+        """
+        self.logger = logging.getLogger(__name__)
+        self.config = config or MetricsConfig()
+        
+    async def ensure_schema(self, session: AsyncSession) -> None:
+        """
+        Aggiunge colonne e indici delle finestre alle tabelle esistenti.
+        
+        Args:
+            session: Sessione database
+        """
+        for model in (PerformanceMetrics, RiskMetrics):
+            table = model.__tablename__
+            result = await session.execute(text(f"PRAGMA table_info({table})"))
+            existing = {row[1] for row in result}
+            if not existing:
+                continue
+            for column in ('window', 'data_hash'):
+                if column not in existing:
+                    size = 10 if column == 'window' else 32
+                    await session.execute(text(
+                        f'ALTER TABLE {table} ADD COLUMN "{column}" VARCHAR({size})'
+                    ))
+            for index in model.__table__.indexes:
+                if index.unique:
+                    columns = ", ".join(f'"{c.name}"' for c in index.columns)
+                    await session.execute(text(
+                        f"CREATE UNIQUE INDEX IF NOT EXISTS {index.name} "
+                        f"ON {table} ({columns})"
+                    ))
+        await session.commit()
+        
+    async def run(self, session: AsyncSession) -> MetricsStats:
+        """
+        Ricalcola le metriche dei gruppi modificati.
+        
+        Args:
+            session: Sessione database
+            
+        Returns:
+            Statistiche dell'esecuzione
+        """
+        started = datetime.utcnow()
+        stats = MetricsStats()
+        
+        signatures = await self._signatures(session)
+        stored = await self._stored_hashes(session)
+        stats.groups = len(signatures)
+        
+        # Le metriche dipendono anche dal benchmark: la sua impronta
+        # entra in quella di ogni gruppo dello stesso exchange e timeframe
+        benchmarks = await self._benchmark_keys(session, signatures)
+        for key, bench in benchmarks.items():
+            signature, count = signatures[key]
+            combined = hashlib.blake2b(
+                (signature + signatures[bench][0]).encode(), digest_size=16
+            )
+            signatures[key] = (combined.hexdigest(), count)
+            
+        changed = [
+            key for key, (signature, count) in signatures.items()
+            if count >= self.config.min_candles and any(
+                stored.get((model.__tablename__, key, window)) != signature
+                for model in (PerformanceMetrics, RiskMetrics)
+                for window in self.config.windows
+            )
+        ]
+        stats.changed_groups = len(changed)
+        
+        bench_series: Dict[GroupKey, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.config.max_threads) as executor:
+            for i in range(0, len(changed), self.config.batch_groups):
+                batch = changed[i:i + self.config.batch_groups]
+                series = [await self._load(session, key) for key in batch]
+                for key in batch:
+                    bench = benchmarks.get(key)
+                    if bench is not None and bench not in bench_series:
+                        bench_series[bench] = await self._load(session, bench)
+                results = await asyncio.gather(*[
+                    loop.run_in_executor(
+                        executor, self._compute, key, signatures[key][0],
+                        *arrays, bench_series.get(benchmarks.get(key))
+                    )
+                    for key, arrays in zip(batch, series)
+                ])
+                
+                perf_rows = [row for perf, _ in results for row in perf]
+                risk_rows = [row for _, risk in results for row in risk]
+                await self._upsert(session, PerformanceMetrics, perf_rows)
+                await self._upsert(session, RiskMetrics, risk_rows)
+                stats.updated_rows += len(perf_rows) + len(risk_rows)
+                
+        await session.commit()
+        stats.duration = (datetime.utcnow() - started).total_seconds()
+        self.logger.info(
+            f"Metriche aggiornate: {stats.changed_groups}/{stats.groups} gruppi, "
+            f"{stats.updated_rows} righe in {stats.duration:.2f}s"
+        )
+        return stats
+        
+    async def _signatures(self, session: AsyncSession) -> Dict[GroupKey, Tuple[str, int]]:
+        """
+        Impronta e numero di candele di ogni gruppo, in una sola query.
+        
+        Returns:
+            (impronta, numero candele) per gruppo
+        """
+        stmt = select(
+            MarketData.exchange_id,
+            MarketData.symbol_id,
+            MarketData.timeframe,
+            func.count(),
+            func.min(MarketData.timestamp),
+            func.max(MarketData.timestamp),
+            func.total(MarketData.close),
+            func.total(MarketData.volume)
+        ).group_by(
+            MarketData.exchange_id,
+            MarketData.symbol_id,
+            MarketData.timeframe
+        )
+        
+        signatures = {}
+        for row in await session.execute(stmt):
+            digest = hashlib.blake2b(repr(tuple(row[3:])).encode(), digest_size=16)
+            signatures[tuple(row[:3])] = (digest.hexdigest(), row[3])
+        return signatures
+        
+    async def _benchmark_keys(
+        self,
+        session: AsyncSession,
+        signatures: Dict[GroupKey, Tuple[str, int]]
+    ) -> Dict[GroupKey, GroupKey]:
+        """
+        Gruppo del benchmark per ogni gruppo con un benchmark disponibile.
+        
+        Returns:
+            Gruppo benchmark (stesso exchange e timeframe) per gruppo
+        """
+        if not self.config.benchmark:
+            return {}
+        result = await session.execute(
+            select(Symbol.exchange_id, Symbol.id).where(
+                Symbol.name == self.config.benchmark
+            )
+        )
+        bench_ids = dict(result.all())
+        
+        benchmarks = {}
+        for key in signatures:
+            exchange_id, _, timeframe = key
+            bench = (exchange_id, bench_ids.get(exchange_id), timeframe)
+            if bench in signatures:
+                benchmarks[key] = bench
+        return benchmarks
+        
+    async def _stored_hashes(
+        self,
+        session: AsyncSession
+    ) -> Dict[Tuple[str, GroupKey, str], Optional[str]]:
+        """Impronte salvate per (tabella, gruppo, finestra)."""
+        stored = {}
+        for model in (PerformanceMetrics, RiskMetrics):
+            stmt = select(
+                model.exchange_id,
+                model.symbol_id,
+                model.timeframe,
+                model.window,
+                model.data_hash
+            ).where(model.window.in_(self.config.windows))
+            for row in await session.execute(stmt):
+                stored[(model.__tablename__, tuple(row[:3]), row[3])] = row[4]
+        return stored
+        
+    async def _load(
+        self,
+        session: AsyncSession,
+        key: GroupKey
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Carica la serie di un gruppo come array.
+        
+        Returns:
+            (timestamp in secondi, chiusure, volumi)
+        """
+        exchange_id, symbol_id, timeframe = key
+        stmt = select(
+            cast(func.strftime('%s', MarketData.timestamp), Integer),
+            MarketData.close,
+            MarketData.volume
+        ).where(
+            MarketData.exchange_id == exchange_id,
+            MarketData.symbol_id == symbol_id,
+            MarketData.timeframe == timeframe
+        ).order_by(MarketData.timestamp)
+        
+        result = await session.execute(stmt)
+        data = np.array(result.all(), dtype=np.float64).reshape(-1, 3)
+        return data[:, 0].astype(np.int64), data[:, 1], data[:, 2]
+        
+    def _compute(
+        self,
+        key: GroupKey,
+        signature: str,
+        timestamps: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+        benchmark: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Calcola le righe delle metriche di un gruppo per ogni finestra.
+        
+        Returns:
+            (righe performance, righe rischio)
+        """
+        exchange_id, symbol_id, timeframe = key
+        now = datetime.utcnow()
+        epoch = datetime(1970, 1, 1)
+        market = (
+            align_returns(timestamps, benchmark[0], benchmark[1])
+            if benchmark is not None else None
+        )
+        
+        perf_rows, risk_rows = [], []
+        for window in self.config.windows:
+            # Inizio scelto per tempo (buchi nei dati non allungano la
+            # finestra), con almeno min_candles candele
+            start = 0
+            if window != 'all':
+                window_seconds = timeframe_to_ms(window) // 1000
+                start = int(np.searchsorted(timestamps, timestamps[-1] - window_seconds))
+                start = max(min(start, len(close) - self.config.min_candles), 0)
+            perf, risk = compute_metrics(
+                close[start:],
+                volume[start:],
+                market[start:] if market is not None else None
+            )
+            
+            common = {
+                'exchange_id': exchange_id,
+                'symbol_id': symbol_id,
+                'timeframe': timeframe,
+                'window': window,
+                'start_time': epoch + timedelta(seconds=int(timestamps[start])),
+                'end_time': epoch + timedelta(seconds=int(timestamps[-1])),
+                'data_hash': signature,
+                'updated_at': now
+            }
+            perf_rows.append({**common, **perf})
+            risk_rows.append({**common, **risk})
+        return perf_rows, risk_rows
+        
+    async def _upsert(
+        self,
+        session: AsyncSession,
+        model: Any,
+        rows: List[Dict[str, Any]]
+    ) -> None:
+        """Inserisce o aggiorna le righe per (gruppo, finestra)."""
+        if not rows:
+            return
+        stmt = sqlite_insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=METRICS_KEY,
+            set_={
+                name: stmt.excluded[name]
+                for name in rows[0]
+                if name not in METRICS_KEY
+            }
+        )
+        await session.execute(stmt, rows)
@@ -0,0 +1,514 @@
+"""
+Online Validator
+--------------
+Validazione incrementale delle candele live. Per ogni coppia
+(simbolo, timeframe) mantiene media e varianza mobili (Welford su
+finestra) e quantili mobili, così ogni nuova candela è validata in
+tempo costante con la stessa configurazione di regole del
+DataValidator.
+"""
+
+import math
+import logging
+from bisect import bisect_left, insort
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from .validator import (
+    ValidationRule,
+    ValidationResult,
+    ValidationStats,
+    ValidationSeverity,
+    DataValidator
+)
+
+# Finestra della media mobile per gli spike di volume (come il batch)
+VOLUME_WINDOW = 20
+
+class RollingStats:
+    """
+    Media, varianza e quantili su una finestra mobile.
+    
+    Media e M2 sono aggiornati con Welford (sostituzione del valore
+    più vecchio) e ricalcolati da zero ogni 'window' aggiornamenti per
+    limitare la deriva numerica. I quantili usano la finestra
+    ordinata: il costo per valore dipende dalla finestra, non dalla
+    lunghezza della storia.
+    """
+    
+    def __init__(self, window: int):
+        """
+        Inizializza le statistiche.
+        
+        Args:
+            window: Numero di valori nella finestra
+        """
+        self.window = window
+        self.values: deque = deque()
+        self.ordered: List[float] = []
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._updates = 0
+        # Ultimo push (valore, valore uscito dalla finestra) per pop()
+        self._last: Optional[Tuple[float, Optional[float]]] = None
+        
+    @property
+    def count(self) -> int:
+        """Valori nella finestra."""
+        return len(self.values)
+        
+    @property
+    def std(self) -> float:
+        """Deviazione standard di popolazione (come stats.zscore)."""
+        if not self.values:
+            return float('nan')
+        return math.sqrt(max(self.m2, 0.0) / len(self.values))
+        
+    def push(self, x: float) -> None:
+        """
+        Aggiunge un valore, rimuovendo il più vecchio a finestra piena.
+        
+        Args:
+            x: Valore (i non finiti sono ignorati)
+        """
+        self._last = None
+        if not math.isfinite(x):
+            return
+            
+        old = None
+        if len(self.values) < self.window:
+            self.values.append(x)
+            n = len(self.values)
+            delta = x - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.values.popleft()
+            self.values.append(x)
+            del self.ordered[bisect_left(self.ordered, old)]
+            delta = x - old
+            previous = self.mean
+            self.mean += delta / self.window
+            self.m2 += delta * (x - self.mean + old - previous)
+        insort(self.ordered, x)
+        self._last = (x, old)
+        
+        self._updates += 1
+        if self._updates >= self.window:
+            self._recompute()
+            
+    def pop(self) -> None:
+        """
+        Annulla l'ultimo push, ripristinando il valore uscito dalla
+        finestra. Media e M2 sono ricalcolati dalla finestra.
+        """
+        if self._last is None:
+            return
+        x, old = self._last
+        self._last = None
+        self.values.pop()
+        del self.ordered[bisect_left(self.ordered, x)]
+        if old is not None:
+            self.values.appendleft(old)
+            insort(self.ordered, old)
+        self._recompute()
+        
+    def _recompute(self) -> None:
+        """Ricalcola media e M2 dalla finestra."""
+        n = len(self.values)
+        self._updates = 0
+        if n == 0:
+            self.mean = self.m2 = 0.0
+            return
+        self.mean = sum(self.values) / n
+        self.m2 = sum((v - self.mean) ** 2 for v in self.values)
+        
+    def zscore(self, x: float) -> Optional[float]:
+        """
+        Z-score assoluto di un valore rispetto alla finestra.
+        
+        Args:
+            x: Valore
+            
+        Returns:
+            Z-score o None se la deviazione standard è nulla
+        """
+        std = self.std
+        if not std > 0:
+            return None
+        return abs(x - self.mean) / std
+        
+    def quantile(self, q: float) -> float:
+        """
+        Quantile della finestra (interpolazione lineare, come np.quantile).
+        
+        Args:
+            q: Quantile in [0, 1]
+            
+        Returns:
+            Valore del quantile (NaN se la finestra è vuota)
+        """
+        n = len(self.ordered)
+        if n == 0:
+            return float('nan')
+        position = q * (n - 1)
+        low = int(position)
+        high = min(low + 1, n - 1)
+        return self.ordered[low] + (self.ordered[high] - self.ordered[low]) * (position - low)
+
+class SeriesState:
+    """Stato di validazione di una serie (simbolo, timeframe)."""
+    
+    def __init__(self, window: int):
+        """
+        Inizializza lo stato.
+        
+        Args:
+            window: Finestra delle statistiche mobili
+        """
+        self.count = 0
+        self.first_timestamp: Optional[float] = None
+        self.last_timestamp: Optional[float] = None
+        self.last_close: Optional[float] = None
+        self.returns = RollingStats(window)
+        self.closes = RollingStats(window)
+        self.volumes = RollingStats(window)
+        self.recent_volumes: deque = deque(maxlen=VOLUME_WINDOW)
+        self.recent_volume_sum = 0.0
+        # Stato precedente all'ultima candela, per rollback()
+        self._undo: Optional[Tuple[Any, ...]] = None
+        self.last_candle: Optional[List[float]] = None
+        self.last_return: Optional[float] = None
+        
+    def update(self, candle: List[float], log_return: Optional[float]) -> None:
+        """Registra una candela accettata."""
+        timestamp, close, volume = candle[0], candle[4], candle[5]
+        evicted = (
+            self.recent_volumes[0]
+            if len(self.recent_volumes) == VOLUME_WINDOW else None
+        )
+        self._undo = (
+            self.first_timestamp, self.last_timestamp, self.last_close,
+            self.last_candle, self.last_return, evicted, self.recent_volume_sum
+        )
+        self.last_candle = candle
+        self.last_return = log_return
+        
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+        self.last_close = close
+        self.count += 1
+        
+        if log_return is not None:
+            self.returns.push(log_return)
+        self.closes.push(close)
+        self.volumes.push(volume)
+        
+        if len(self.recent_volumes) == VOLUME_WINDOW:
+            self.recent_volume_sum -= self.recent_volumes[0]
+        self.recent_volumes.append(volume)
+        self.recent_volume_sum += volume
+        
+    def rollback(self) -> bool:
+        """
+        Rimuove l'ultima candela registrata (es. candela ancora aperta
+        sostituita dalla versione chiusa con lo stesso timestamp).
+        
+        Returns:
+            True se la candela è stata rimossa
+        """
+        if self._undo is None:
+            return False
+        (self.first_timestamp, self.last_timestamp, self.last_close,
+         candle, log_return, evicted, self.recent_volume_sum) = self._undo
+        self._undo = None
+        self.count -= 1
+        
+        if self.last_return is not None:
+            self.returns.pop()
+        self.closes.pop()
+        self.volumes.pop()
+        self.recent_volumes.pop()
+        if evicted is not None:
+            self.recent_volumes.appendleft(evicted)
+        self.last_candle, self.last_return = candle, log_return
+        return True
+
+class OnlineValidator:
+    """
+    Validatore incrementale per candele in arrivo una alla volta.
+    
+    Le regole statistiche confrontano la candela con le statistiche
+    mobili delle candele precedenti (non con l'intera serie). Le
+    candele con violazioni critiche non aggiornano lo stato.
+    """
+    
+    def __init__(
+        self,
+        rules: Optional[List[ValidationRule]] = None,
+        window: int = 500,
+        min_periods: int = 30
+    ):
+        """
+        Inizializza il validatore.
+        
+        Args:
+            rules: Regole di validazione (default: quelle del DataValidator)
+            window: Finestra delle statistiche mobili
+            min_periods: Valori minimi prima di applicare le regole statistiche
+        """
+        self.logger = logging.getLogger(__name__)
+        self.stats = ValidationStats()
+        self.window = window
+        self.min_periods = min_periods
+        self._validator = DataValidator()
+        self.rules = rules if rules is not None else self._validator.rules
+        self.states: Dict[Tuple[str, str], SeriesState] = {}
+        
+    def state(self, symbol: str, timeframe: str) -> SeriesState:
+        """
+        Stato di una serie (creato al primo utilizzo).
+        
+        Args:
+            symbol: Simbolo
+            timeframe: Timeframe
+            
+        Returns:
+            Stato della serie
+        """
+        key = (symbol, timeframe)
+        if key not in self.states:
+            self.states[key] = SeriesState(self.window)
+        return self.states[key]
+        
+    def reset(self, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> None:
+        """
+        Azzera lo stato di una serie o di tutte.
+        
+        Args:
+            symbol: Simbolo (None per tutte le serie)
+            timeframe: Timeframe
+        """
+        if symbol is None:
+            self.states.clear()
+        else:
+            self.states.pop((symbol, timeframe), None)
+            
+    def validate(
+        self,
+        symbol: str,
+        timeframe: str,
+        candle: List[float]
+    ) -> Tuple[bool, List[ValidationResult]]:
+        """
+        Valida una candela e aggiorna lo stato della serie.
+        
+        Sono scartate solo le candele con violazioni critiche della
+        candela stessa (prezzi, volumi, consistenza, timestamp futuro o
+        non crescente). Gap temporali e variazioni eccessive rispetto
+        alla candela precedente sono segnalati ma aggiornano lo stato,
+        altrimenti la serie resterebbe bloccata sull'ultima candela.
+        
+        Una candela con lo stesso timestamp dell'ultima la sostituisce
+        (es. candela aperta seguita da quella chiusa): l'ultima candela
+        è rimossa dallo stato e la nuova è validata al suo posto. Se la
+        nuova è scartata, lo stato torna alla candela precedente.
+        
+        Args:
+            symbol: Simbolo
+            timeframe: Timeframe
+            candle: Candela [timestamp ms, open, high, low, close, volume]
+            
+        Returns:
+            (candela accettata, risultati delle regole fallite)
+        """
+        state = self.state(symbol, timeframe)
+        period = self._validator._parse_timeframe(timeframe)
+        timestamp, open_, high, low, close, volume = (float(v) for v in candle[:6])
+        
+        replaced = None
+        if state.last_timestamp == timestamp:
+            replaced = (state.last_candle, state.last_return)
+            if not state.rollback():
+                replaced = None
+                
+        log_return = None
+        change = None
+        if state.last_close is not None and state.last_close > 0 and close > 0:
+            change = abs(close / state.last_close - 1)
+            log_return = math.log(close / state.last_close)
+            
+        failures = []
+        rejected = False
+        for rule in self.rules:
+            if not rule.enabled:
+                continue
+            failure = self._check(
+                rule, state, period, timestamp,
+                (open_, high, low, close, volume), change, log_return
+            )
+            self.stats.update(
+                failure is None,
+                ValidationSeverity(rule.severity)
+            )
+            if failure is not None:
+                result, intrinsic = failure
+                failures.append(result)
+                rejected |= intrinsic and rule.severity == 'critical'
+                
+        if not rejected:
+            state.update([timestamp, open_, high, low, close, volume], log_return)
+        elif replaced is not None:
+            state.update(*replaced)
+        return not rejected, failures
+        
+    def validate_batch(
+        self,
+        symbol: str,
+        timeframe: str,
+        candles: List[List[float]]
+    ) -> Tuple[List[List[float]], List[List[ValidationResult]]]:
+        """
+        Valida candele in sequenza mantenendo lo stato.
+        
+        Le candele precedenti all'ultima già vista per la serie (es.
+        batch sovrapposto a uno stream o a un download precedente) non
+        sono rivalidate né applicate allo stato e sono restituite come
+        accettate; quella con lo stesso timestamp la sostituisce.
+        
+        Args:
+            symbol: Simbolo
+            timeframe: Timeframe
+            candles: Candele in ordine temporale
+            
+        Returns:
+            (candele senza violazioni critiche, fallimenti per candela)
+        """
+        state = self.state(symbol, timeframe)
+        accepted = []
+        failures = []
+        for candle in candles:
+            if state.last_timestamp is not None and candle[0] < state.last_timestamp:
+                accepted.append(candle)
+                failures.append([])
+                continue
+            valid, result = self.validate(symbol, timeframe, candle)
+            failures.append(result)
+            if valid:
+                accepted.append(candle)
+        return accepted, failures
+        
+    def _check(
+        self,
+        rule: ValidationRule,
+        state: SeriesState,
+        period: int,
+        timestamp: float,
+        prices: Tuple[float, float, float, float, float],
+        change: Optional[float],
+        log_return: Optional[float]
+    ) -> Optional[Tuple[ValidationResult, bool]]:
+        """
+        Applica una regola a una candela.
+        
+        Returns:
+            (risultato, violazione intrinseca della candela) se la
+            regola fallisce, altrimenti None
+        """
+        open_, high, low, close, volume = prices
+        params = rule.parameters or {}
+        name = rule.name
+        
+        if name == "timestamp_sequence":
+            if state.last_timestamp is None:
+                return None
+            gap = timestamp - state.last_timestamp
+            if gap <= 0:
+                return ValidationResult(rule, False, "Timestamp non crescente", gap), True
+            if gap > period * params["max_gap"]:
+                return ValidationResult(rule, False, "Gap trovato", gap), False
+                
+        elif name == "timestamp_future":
+            if timestamp > datetime.utcnow().timestamp() * 1000:
+                return ValidationResult(rule, False, "Timestamp futuro", timestamp), True
+                
+        elif name == "price_range":
+            min_price = params["min_price"]
+            if min(open_, high, low, close) < min_price:
+                return ValidationResult(rule, False, "Prezzo invalido", close), True
+            if change is not None and change > params["max_change"]:
+                return ValidationResult(rule, False, "Variazione eccessiva", change), False
+                
+        elif name == "price_consistency":
+            if low > open_ or low > close or high < open_ or high < close or high < low:
+                return ValidationResult(rule, False, "Candela inconsistente"), True
+                
+        elif name == "volume_range":
+            if volume < params["min_volume"]:
+                return ValidationResult(rule, False, "Volume invalido", volume), True
+                
+        elif name == "volume_spikes":
+            if len(state.recent_volumes) >= VOLUME_WINDOW - 1:
+                # Media mobile comprensiva della candela corrente, come nel batch
+                total = state.recent_volume_sum + volume
+                if len(state.recent_volumes) == VOLUME_WINDOW:
+                    total -= state.recent_volumes[0]
+                ma = total / VOLUME_WINDOW
+                if ma > 0 and volume > ma * params["threshold"]:
+                    return ValidationResult(rule, False, "Volume spike", volume / ma), False
+                    
+        elif name == "price_gaps":
+            if change is not None and change > params["threshold"]:
+                return ValidationResult(rule, False, "Gap prezzo", change), False
+                
+        elif name == "price_volatility":
+            if log_return is not None and state.returns.count >= self.min_periods:
+                z = state.returns.zscore(log_return)
+                if z is not None and z > params["threshold"]:
+                    return ValidationResult(rule, False, "Alta volatilità", z), False
+                    
+        elif name == "data_density":
+            if state.first_timestamp is not None and state.count >= self.min_periods:
+                expected = (timestamp - state.first_timestamp) / period + 1
+                density = (state.count + 1) / expected
+                if density < params["min_density"]:
+                    return ValidationResult(rule, False, "Densità dati insufficiente", density), False
+                    
+        elif name == "outliers":
+            if state.closes.count >= self.min_periods:
+                outliers = {}
+                for key, series, value in (
+                    ('price', state.closes, close),
+                    ('volume', state.volumes, volume)
+                ):
+                    if self._is_outlier(series, value, params):
+                        outliers[key] = value
+                if outliers:
+                    return ValidationResult(
+                        rule, False,
+                        "Outlier " + ", ".join(outliers),
+                        outliers
+                    ), False
+                    
+        return None
+        
+    def _is_outlier(
+        self,
+        series: RollingStats,
+        value: float,
+        params: Dict[str, Any]
+    ) -> bool:
+        """
+        Verifica un outlier con z-score mobile o con quantili mobili.
+        
+        Con parameters['method'] == 'quantile' il valore è un outlier
+        se esce da [quantile(lower), quantile(upper)] (default 0.001, 0.999).
+        """
+        if params.get("method", "zscore") == "quantile":
+            lower = series.quantile(params.get("lower", 0.001))
+            upper = series.quantile(params.get("upper", 0.999))
+            return value < lower or value > upper
+        z = series.zscore(value)
+        return z is not None and z > params["threshold"]
@@ -0,0 +1,440 @@
+"""
+Panel Builder
+-----------
+Costruzione di pannelli multi-simbolo allineati su un unico clock.
+Il pannello è un array contiguo (tempo × simbolo × campo) con una
+maschera di validità (tempo × simbolo): i calcoli cross-sezionali
+diventano singole operazioni NumPy. Per universi grandi i buffer
+sono file .npy mappati in memoria.
+"""
+
+import json
+import logging
+from enum import Enum
+from pathlib import Path
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import MarketData
+from .reconcile import timestamps_int64, sorted_unique
+from .resampler import stored_to_utc_ms, utc_ms_to_stored
+from .synchronizer import DataSynchronizer
+
+OHLCV_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+class FillPolicy(Enum):
+    """Politiche di riempimento delle celle senza candela."""
+    NONE = "none"
+    FORWARD = "forward"
+    ZERO = "zero"
+
+@dataclass
+class PanelConfig:
+    """Configurazione pannello."""
+    timeframe: str = "1h"
+    fields: List[str] = field(default_factory=lambda: list(OHLCV_FIELDS))
+    fill: Dict[str, FillPolicy] = field(default_factory=lambda: {
+        'open': FillPolicy.FORWARD,
+        'high': FillPolicy.FORWARD,
+        'low': FillPolicy.FORWARD,
+        'close': FillPolicy.FORWARD,
+        'volume': FillPolicy.ZERO
+    })
+    fill_limit: Optional[int] = None  # Celle consecutive riempibili (None = nessun limite)
+    dtype: str = "float64"
+    mmap_dir: Optional[str] = None
+    mmap_threshold: int = 512 * 1024 * 1024  # Byte oltre i quali serve mmap_dir
+    chunk_rows: int = 50000  # Righe per query nel caricamento dal database
+    fill_block: int = 256  # Simboli per blocco nel riempimento
+
+class Panel:
+    """Pannello allineato (tempo × simbolo × campo)."""
+    
+    VALUES = 'values.npy'
+    VALID = 'valid.npy'
+    META = 'panel.json'
+    
+    def __init__(
+        self,
+        times: pd.DatetimeIndex,
+        symbols: List[str],
+        fields: List[str],
+        values: np.ndarray,
+        valid: np.ndarray
+    ):
+        """
+        Inizializza il pannello.
+        
+        Args:
+            times: Clock condiviso (UTC, senza timezone)
+            symbols: Simboli, nell'ordine del secondo asse
+            fields: Campi, nell'ordine del terzo asse
+            values: Array (tempo × simbolo × campo)
+            valid: Maschera (tempo × simbolo) delle candele osservate
+        """
+        self.times = times
+        self.symbols = list(symbols)
+        self.fields = list(fields)
+        self.values = values
+        self.valid = valid
+        self._symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self._field_index = {f: i for i, f in enumerate(self.fields)}
+        
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        """Dimensioni (tempo, simbolo, campo)."""
+        return self.values.shape
+        
+    def field(self, name: str) -> np.ndarray:
+        """
+        Vista (tempo × simbolo) di un campo.
+        
+        Args:
+            name: Nome campo
+            
+        Returns:
+            Vista senza copia
+        """
+        return self.values[:, :, self._field_index[name]]
+        
+    def symbol(self, name: str) -> np.ndarray:
+        """
+        Vista (tempo × campo) di un simbolo.
+        
+        Args:
+            name: Simbolo
+            
+        Returns:
+            Vista senza copia
+        """
+        return self.values[:, self._symbol_index[name], :]
+        
+    def frame(self, name: str) -> pd.DataFrame:
+        """
+        DataFrame (tempo × simbolo) di un campo.
+        
+        Args:
+            name: Nome campo
+            
+        Returns:
+            DataFrame indicizzato per tempo
+        """
+        return pd.DataFrame(self.field(name), index=self.times, columns=self.symbols)
+        
+    def coverage(self) -> Dict[str, float]:
+        """
+        Frazione di candele osservate per simbolo.
+        
+        Returns:
+            Copertura per simbolo
+        """
+        if len(self.times) == 0:
+            return {s: 0.0 for s in self.symbols}
+        ratios = self.valid.mean(axis=0)
+        return dict(zip(self.symbols, ratios.tolist()))
+        
+    @classmethod
+    def open(cls, directory: str, mode: str = 'r') -> 'Panel':
+        """
+        Riapre un pannello mappato in memoria.
+        
+        Args:
+            directory: Directory del pannello
+            mode: Modalità di mmap ('r' o 'r+')
+            
+        Returns:
+            Pannello con buffer mappati
+        """
+        path = Path(directory)
+        with open(path / cls.META) as f:
+            meta = json.load(f)
+        times = pd.DatetimeIndex(
+            np.arange(meta['start'], meta['end'] + 1, meta['step']).view('datetime64[ns]')
+        )
+        return cls(
+            times,
+            meta['symbols'],
+            meta['fields'],
+            np.load(path / cls.VALUES, mmap_mode=mode),
+            np.load(path / cls.VALID, mmap_mode=mode)
+        )
+
+class PanelBuilder:
+    """
+    Costruttore di pannelli su un clock comune.
+    
+    Il clock è la griglia del timeframe tra start ed end; le candele
+    di ogni simbolo sono scritte direttamente nelle righe del clock,
+    anche in più passate (caricamento incrementale).
+    """
+    
+    def __init__(
+        self,
+        symbols: List[str],
+        start: datetime,
+        end: datetime,
+        config: Optional[PanelConfig] = None,
+        synchronizer: Optional[DataSynchronizer] = None
+    ):
+        """
+        Inizializza il costruttore e alloca i buffer.
+        
+        Args:
+            symbols: Universo di simboli
+            start: Inizio periodo (allineato in basso alla griglia)
+            end: Fine periodo
+            config: Configurazione pannello
+            synchronizer: Sincronizzatore con le configurazioni timeframe
+            
+        Raises:
+            ValueError: Se il timeframe non è supportato o il pannello
+                supera la soglia senza mmap_dir
+        """
+        self.logger = logging.getLogger(__name__)
+        self.config = config or PanelConfig()
+        self.synchronizer = synchronizer or DataSynchronizer()
+        
+        timeframe = self.synchronizer.timeframes.get(self.config.timeframe)
+        if timeframe is None:
+            raise ValueError(f"Timeframe non supportato: {self.config.timeframe}")
+        self.step = int(np.timedelta64(timeframe.minutes, 'm').astype('timedelta64[ns]').view(np.int64))
+        
+        self.start = self._to_ns(start) // self.step * self.step
+        self.end = self._to_ns(end)
+        self.rows = max((self.end - self.start) // self.step + 1, 0)
+        self.times = pd.DatetimeIndex(
+            (self.start + self.step * np.arange(self.rows)).view('datetime64[ns]')
+        )
+        self.symbols = list(symbols)
+        self.fields = list(self.config.fields)
+        self._symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        
+        self.values, self.valid = self._allocate()
+        
+    def _to_ns(self, value: datetime) -> int:
+        """Timestamp in ns UTC senza timezone."""
+        value = pd.Timestamp(value)
+        if value.tz is not None:
+            value = value.tz_convert('UTC').tz_localize(None)
+        return int(value.as_unit('ns').value)
+        
+    def _allocate(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Alloca valori (NaN) e maschera, in RAM o su file mappati.
+        
+        Returns:
+            (valori, maschera di validità)
+        """
+        shape = (self.rows, len(self.symbols), len(self.fields))
+        nbytes = int(np.prod(shape)) * np.dtype(self.config.dtype).itemsize
+        
+        if self.config.mmap_dir is None:
+            if nbytes > self.config.mmap_threshold:
+                raise ValueError(
+                    f"Pannello di {nbytes / 1e6:.0f} MB oltre la soglia: "
+                    "specificare mmap_dir"
+                )
+            values = np.full(shape, np.nan, dtype=self.config.dtype)
+            valid = np.zeros(shape[:2], dtype=bool)
+            return values, valid
+            
+        directory = Path(self.config.mmap_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        values = np.lib.format.open_memmap(
+            directory / Panel.VALUES, mode='w+', dtype=self.config.dtype, shape=shape
+        )
+        values[:] = np.nan
+        valid = np.lib.format.open_memmap(
+            directory / Panel.VALID, mode='w+', dtype=bool, shape=shape[:2]
+        )
+        with open(directory / Panel.META, 'w') as f:
+            json.dump({
+                'start': self.start,
+                'end': self.start + (self.rows - 1) * self.step,
+                'step': self.step,
+                'symbols': self.symbols,
+                'fields': self.fields,
+                'timeframe': self.config.timeframe
+            }, f, indent=2)
+        self.logger.debug(f"Pannello mappato in {directory} ({nbytes / 1e6:.0f} MB)")
+        return values, valid
+        
+    def add(self, symbol: str, df: pd.DataFrame) -> int:
+        """
+        Scrive le candele di un simbolo nel pannello.
+        
+        Può essere chiamato più volte per lo stesso simbolo con
+        porzioni diverse del periodo; le candele fuori periodo o non
+        allineate alla griglia sono ignorate.
+        
+        Args:
+            symbol: Simbolo
+            df: DataFrame con colonna timestamp e i campi del pannello
+            
+        Returns:
+            Numero di candele scritte
+        """
+        timestamps = df['timestamp']
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps)
+        if timestamps.dt.tz is not None:
+            timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+        ns, _ = timestamps_int64(timestamps.astype('datetime64[ns]'))
+        return self._write(
+            symbol,
+            ns,
+            df[self.fields].to_numpy(dtype=self.config.dtype)
+        )
+        
+    def _write(self, symbol: str, ns: np.ndarray, values: np.ndarray) -> int:
+        """
+        Scrive righe già convertite in ns nelle posizioni del clock.
+        
+        Args:
+            symbol: Simbolo
+            ns: Timestamp in ns
+            values: Matrice (righe × campi)
+            
+        Returns:
+            Numero di righe scritte
+        """
+        keep, _ = sorted_unique(ns)
+        if keep is not None:
+            ns, values = ns[keep], values[keep]
+            
+        offset = ns - self.start
+        on_clock = (offset >= 0) & (offset % self.step == 0) & (ns <= self.end)
+        rows = offset[on_clock] // self.step
+        
+        column = self._symbol_index[symbol]
+        self.values[rows, column, :] = values[on_clock]
+        self.valid[rows, column] = True
+        return len(rows)
+        
+    async def load(
+        self,
+        session: AsyncSession,
+        exchange_id: int,
+        symbol_ids: Dict[str, int]
+    ) -> int:
+        """
+        Carica le candele dal database a blocchi di chunk_rows righe.
+        
+        Ogni blocco è scritto subito nel pannello: la memoria usata
+        oltre ai buffer è quella di un blocco. I timestamp di
+        market_data (orario di convert_to_local_time) sono convertiti
+        in UTC, come il clock del pannello.
+        
+        Args:
+            session: Sessione database
+            exchange_id: ID exchange
+            symbol_ids: ID simbolo per simbolo del pannello
+            
+        Returns:
+            Numero di candele caricate
+        """
+        columns = [getattr(MarketData, name) for name in self.fields]
+        # Il filtro lavora sull'orario salvato, non su UTC
+        start = utc_ms_to_stored(self.start // 1_000_000)
+        end = utc_ms_to_stored(self.end // 1_000_000)
+        total = 0
+        
+        for symbol, symbol_id in symbol_ids.items():
+            last = None
+            while True:
+                stmt = select(MarketData.timestamp, *columns).where(
+                    MarketData.exchange_id == exchange_id,
+                    MarketData.symbol_id == symbol_id,
+                    MarketData.timeframe == self.config.timeframe,
+                    MarketData.timestamp.between(start, end)
+                )
+                if last is not None:
+                    stmt = stmt.where(MarketData.timestamp > last)
+                stmt = stmt.order_by(MarketData.timestamp).limit(self.config.chunk_rows)
+                
+                rows = (await session.execute(stmt)).all()
+                if not rows:
+                    break
+                    
+                ns = stored_to_utc_ms(row[0] for row in rows) * 1_000_000
+                values = np.array([row[1:] for row in rows], dtype=self.config.dtype)
+                total += self._write(symbol, ns, values)
+                
+                last = rows[-1][0]
+                if len(rows) < self.config.chunk_rows:
+                    break
+                    
+        self.logger.info(f"Caricate {total} candele per {len(symbol_ids)} simboli")
+        return total
+        
+    def build(self) -> Panel:
+        """
+        Applica le politiche di riempimento e restituisce il pannello.
+        
+        Returns:
+            Pannello con valori riempiti e maschera delle candele osservate
+        """
+        for j, name in enumerate(self.fields):
+            policy = self.config.fill.get(name, FillPolicy.NONE)
+            if policy is FillPolicy.NONE:
+                continue
+            for first in range(0, len(self.symbols), self.config.fill_block):
+                block = self.values[:, first:first + self.config.fill_block, j]
+                if policy is FillPolicy.FORWARD:
+                    block[:] = forward_fill(block, self.config.fill_limit)
+                elif policy is FillPolicy.ZERO:
+                    block[np.isnan(block)] = 0
+                    
+        if isinstance(self.values, np.memmap):
+            self.values.flush()
+            self.valid.flush()
+        return Panel(self.times, self.symbols, self.fields, self.values, self.valid)
+
+def forward_fill(values: np.ndarray, limit: Optional[int] = None) -> np.ndarray:
+    """
+    Forward fill vettoriale lungo l'asse del tempo.
+    
+    Args:
+        values: Matrice (tempo × colonne)
+        limit: Numero massimo di celle consecutive riempite
+        
+    Returns:
+        Matrice riempita (le celle prima della prima osservazione
+        restano NaN)
+    """
+    rows = np.arange(values.shape[0])[:, None]
+    source = np.where(np.isnan(values), 0, rows)
+    np.maximum.accumulate(source, axis=0, out=source)
+    filled = np.take_along_axis(values, source, axis=0)
+    if limit is not None:
+        filled[rows - source > limit] = np.nan
+    return filled
+
+def build_panel(
+    data: Dict[str, pd.DataFrame],
+    start: datetime,
+    end: datetime,
+    config: Optional[PanelConfig] = None
+) -> Panel:
+    """
+    Costruisce un pannello da DataFrame già in memoria.
+    
+    Args:
+        data: DataFrame per simbolo (colonna timestamp e campi)
+        start: Inizio periodo
+        end: Fine periodo
+        config: Configurazione pannello
+        
+    Returns:
+        Pannello allineato
+    """
+    builder = PanelBuilder(list(data), start, end, config)
+    for symbol, df in data.items():
+        builder.add(symbol, df)
+    return builder.build()
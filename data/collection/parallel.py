@@ -0,0 +1,256 @@
+"""
+Parallel Processing
+-----------------
+Generazione feature in parallelo su più processi.
+Ogni unità di lavoro (simbolo, timeframe) viene passata ai worker
+tramite memoria condivisa invece di DataFrame serializzati; anche
+i risultati tornano al processo principale in memoria condivisa.
+"""
+
+import os
+import logging
+from typing import Dict, List, Any, Optional, Tuple, Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .processor import DataProcessor, ProcessingStage
+
+# Chiave di un'unità di lavoro: (simbolo, timeframe)
+UnitKey = Tuple[str, str]
+
+# Descrittore di un blocco condiviso:
+# (nome, righe, colonne numeriche, dtype indice)
+BlockInfo = Tuple[str, int, List[str], Any]
+
+# Processore del worker, creato una volta per processo
+_worker_processor: Optional[DataProcessor] = None
+
+def _write_block(df: pd.DataFrame) -> Tuple[shared_memory.SharedMemory, BlockInfo]:
+    """
+    Copia indice e colonne numeriche in un blocco di memoria condivisa.
+    
+    Layout: indice int64 (n) seguito dalle colonne float64 (n × k)
+    in ordine per colonna. Sono supportati indici interi e temporali;
+    le colonne non numeriche non sono trasferite.
+    
+    Args:
+        df: DataFrame da copiare
+        
+    Returns:
+        Blocco condiviso e relativo descrittore
+    """
+    columns = list(df.select_dtypes(include=[np.number]).columns)
+    n = len(df)
+    index_dtype = df.index.dtype
+    
+    shm = shared_memory.SharedMemory(
+        create=True,
+        size=max(8 * n * (len(columns) + 1), 1)
+    )
+    index = np.ndarray((n,), dtype=np.int64, buffer=shm.buf)
+    index[:] = df.index.asi8 if hasattr(df.index, 'asi8') else df.index.to_numpy(np.int64)
+    values = np.ndarray(
+        (n, len(columns)),
+        dtype=np.float64,
+        buffer=shm.buf,
+        offset=8 * n,
+        order='F'
+    )
+    for j, column in enumerate(columns):
+        values[:, j] = df[column].to_numpy(dtype=np.float64)
+        
+    return shm, (shm.name, n, columns, index_dtype)
+
+def _read_block(shm: shared_memory.SharedMemory, info: BlockInfo) -> pd.DataFrame:
+    """
+    Ricostruisce un DataFrame da un blocco condiviso.
+    
+    I dati sono copiati: il blocco può essere chiuso subito dopo.
+    
+    Args:
+        shm: Blocco condiviso aperto
+        info: Descrittore del blocco
+        
+    Returns:
+        DataFrame ricostruito
+    """
+    _, n, columns, index_dtype = info
+    index = np.ndarray((n,), dtype=np.int64, buffer=shm.buf).copy()
+    values = np.ndarray(
+        (n, len(columns)),
+        dtype=np.float64,
+        buffer=shm.buf,
+        offset=8 * n,
+        order='F'
+    ).copy()
+    if isinstance(index_dtype, pd.DatetimeTZDtype):
+        restored = pd.DatetimeIndex(index.view(f'datetime64[{index_dtype.unit}]'))
+        restored = restored.tz_localize('UTC').tz_convert(index_dtype.tz)
+    elif np.issubdtype(index_dtype, np.datetime64):
+        restored = pd.DatetimeIndex(index.view(index_dtype))
+    else:
+        restored = pd.Index(index.astype(index_dtype))
+    return pd.DataFrame(values, index=restored, columns=columns)
+
+def _init_worker(
+    step_specs: List[Tuple[str, bool, Optional[Dict[str, Any]]]],
+    backend: str = 'auto'
+) -> None:
+    """
+    Inizializza il processore del worker.
+    
+    Args:
+        step_specs: (nome, abilitato, parametri) degli step
+        backend: Backend indicatori del processore di riferimento
+    """
+    global _worker_processor
+    _worker_processor = DataProcessor(backend=backend)
+    specs = {name: (enabled, params) for name, enabled, params in step_specs}
+    for step in _worker_processor.steps:
+        if step.name in specs:
+            step.enabled, step.params = specs[step.name]
+        else:
+            step.enabled = False
+
+def _process_unit(
+    info: BlockInfo,
+    stages: Optional[List[ProcessingStage]]
+) -> Tuple[Optional[BlockInfo], Dict[str, int]]:
+    """
+    Processa un'unità di lavoro nel worker.
+    
+    Args:
+        info: Descrittore del blocco di input
+        stages: Stage da eseguire
+        
+    Returns:
+        Descrittore del blocco di output e statistiche step
+    """
+    processor = _worker_processor
+    before = processor.stats.step_counts()
+    
+    shm = shared_memory.SharedMemory(name=info[0])
+    try:
+        df = _read_block(shm, info)
+    finally:
+        shm.close()
+        
+    result = processor.process_data(df, stages)
+    
+    out_shm, out_info = _write_block(result)
+    out_shm.close()
+    
+    stats = {
+        key: value - before[key]
+        for key, value in processor.stats.step_counts().items()
+    }
+    return out_info, stats
+
+class ParallelProcessor:
+    """Esecutore parallelo del DataProcessor su (simbolo, timeframe)."""
+    
+    def __init__(
+        self,
+        processor: Optional[DataProcessor] = None,
+        max_workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None
+    ):
+        """
+        Inizializza l'esecutore.
+        
+        I worker ricreano il DataProcessor con gli stessi step
+        (nome, abilitazione, parametri); step personalizzati non
+        presenti nel processore standard non sono eseguiti.
+        
+        Args:
+            processor: Processore di riferimento (step e statistiche)
+            max_workers: Numero di processi (default: CPU disponibili)
+            progress_callback: Callback (messaggio, completati, totale)
+        """
+        self.processor = processor or DataProcessor()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.progress_callback = progress_callback
+        self.logger = logging.getLogger(__name__)
+        
+    @property
+    def stats(self):
+        """Statistiche del processore di riferimento."""
+        return self.processor.stats
+        
+    def process(
+        self,
+        frames: Dict[UnitKey, pd.DataFrame],
+        stages: Optional[List[ProcessingStage]] = None
+    ) -> Dict[UnitKey, pd.DataFrame]:
+        """
+        Processa le unità di lavoro in parallelo.
+        
+        Args:
+            frames: DataFrame per (simbolo, timeframe)
+            stages: Stage da eseguire
+            
+        Returns:
+            DataFrame processati per (simbolo, timeframe)
+        """
+        step_specs = [
+            (step.name, step.enabled, step.params)
+            for step in self.processor.steps
+        ]
+        self.stats.start_units(len(frames))
+        
+        results: Dict[UnitKey, pd.DataFrame] = {}
+        inputs: Dict[UnitKey, shared_memory.SharedMemory] = {}
+        
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(step_specs, self.processor.backend.name)
+            ) as executor:
+                futures = {}
+                for key, df in frames.items():
+                    shm, info = _write_block(df)
+                    inputs[key] = shm
+                    futures[executor.submit(_process_unit, info, stages)] = key
+                    
+                for future in as_completed(futures):
+                    key = futures[future]
+                    self._release(inputs.pop(key))
+                    
+                    try:
+                        out_info, stats = future.result()
+                        out_shm = shared_memory.SharedMemory(name=out_info[0])
+                        try:
+                            results[key] = _read_block(out_shm, out_info)
+                        finally:
+                            self._release(out_shm)
+                        self.stats.merge(stats)
+                        self.stats.unit_completed(True)
+                    except Exception as e:
+                        self.logger.error(
+                            f"Errore processing {key[0]} {key[1]}: {str(e)}"
+                        )
+                        self.stats.unit_completed(False)
+                        
+                    if self.progress_callback:
+                        self.progress_callback(
+                            f"Processing {key[0]} {key[1]}",
+                            self.stats.completed_units + self.stats.failed_units,
+                            self.stats.total_units
+                        )
+        finally:
+            for shm in inputs.values():
+                self._release(shm)
+                
+        return results
+        
+    def _release(self, shm: shared_memory.SharedMemory) -> None:
+        """Chiude e rimuove un blocco condiviso."""
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
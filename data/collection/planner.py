@@ -0,0 +1,245 @@
+"""
+Step Planner
+----------
+Pianificazione degli step del DataProcessor come grafo di
+dipendenze (requires → provides), con memoizzazione delle colonne
+prodotte in base all'impronta dei dati in ingresso.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Set
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+def column_fingerprint(index: pd.Index, values: np.ndarray) -> str:
+    """
+    Impronta di una colonna (indice e valori).
+    
+    Args:
+        index: Indice della serie
+        values: Valori della colonna
+        
+    Returns:
+        Digest esadecimale
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    index_values = index.asi8 if hasattr(index, 'asi8') else index.to_numpy()
+    digest.update(np.ascontiguousarray(index_values).tobytes())
+    digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+def params_fingerprint(params: Optional[Dict[str, Any]]) -> str:
+    """
+    Impronta dei parametri di uno step.
+    
+    Args:
+        params: Parametri dello step
+        
+    Returns:
+        Digest esadecimale
+    """
+    encoded = json.dumps(params or {}, sort_keys=True, default=str)
+    return hashlib.blake2b(encoded.encode(), digest_size=8).hexdigest()
+
+class StepPlanner:
+    """Ordinamento topologico degli step in livelli indipendenti."""
+    
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        
+    def levels(self, steps: List[Any]) -> List[List[Any]]:
+        """
+        Raggruppa gli step in livelli eseguibili in parallelo.
+        
+        Uno step dipende dagli step che producono le sue colonne
+        richieste. Gli step senza 'provides' sono opachi: formano un
+        livello a sé, dopo tutti gli step precedenti e prima di tutti
+        i successivi.
+        
+        Args:
+            steps: Step nell'ordine di configurazione
+            
+        Returns:
+            Livelli di step, ciascuno nell'ordine di configurazione
+            
+        Raises:
+            ValueError: Se le dipendenze sono cicliche
+        """
+        levels: List[List[Any]] = []
+        segment: List[Any] = []
+        
+        for step in steps:
+            if step.outputs() is None:
+                levels.extend(self._segment_levels(segment))
+                levels.append([step])
+                segment = []
+            else:
+                segment.append(step)
+                
+        levels.extend(self._segment_levels(segment))
+        return levels
+        
+    def _segment_levels(self, steps: List[Any]) -> List[List[Any]]:
+        """Livelli di un segmento di step con output dichiarati."""
+        producers = {
+            column: step.name
+            for step in steps
+            for column in step.outputs()
+        }
+        depends: Dict[str, Set[str]] = {
+            step.name: {
+                producers[column]
+                for column in (step.requires or [])
+                if column in producers and producers[column] != step.name
+            }
+            for step in steps
+        }
+        
+        levels = []
+        done: Set[str] = set()
+        remaining = list(steps)
+        while remaining:
+            ready = [s for s in remaining if depends[s.name] <= done]
+            if not ready:
+                names = [s.name for s in remaining]
+                raise ValueError(f"Dipendenze cicliche tra gli step: {names}")
+            levels.append(ready)
+            done.update(s.name for s in ready)
+            remaining = [s for s in remaining if s.name not in done]
+            
+        return levels
+        
+    def resolve(
+        self,
+        steps: List[Any],
+        targets: List[str],
+        available: Set[str]
+    ) -> List[Any]:
+        """
+        Seleziona gli step necessari per produrre i target.
+        
+        Args:
+            steps: Step disponibili
+            targets: Nomi di step o di colonne richieste
+            available: Colonne già presenti
+            
+        Returns:
+            Step necessari, nell'ordine di configurazione
+            
+        Raises:
+            ValueError: Se un target non è producibile
+        """
+        by_name = {step.name: step for step in steps}
+        producers = {
+            column: step
+            for step in steps
+            if step.outputs()
+            for column in step.outputs()
+        }
+        
+        needed: Set[str] = set()
+        pending = list(targets)
+        while pending:
+            target = pending.pop()
+            step = by_name.get(target) or producers.get(target)
+            if step is None:
+                if target in available:
+                    continue
+                raise ValueError(f"Nessuno step produce {target}")
+            if step.name in needed:
+                continue
+            needed.add(step.name)
+            pending.extend(
+                column for column in (step.requires or [])
+                if column not in available or column in producers
+            )
+            
+        return [step for step in steps if step.name in needed]
+
+class FeatureCache:
+    """
+    Cache LRU delle colonne prodotte dagli step, limitata in byte.
+    
+    La dimensione è la somma di nbytes delle colonne: i risultati meno
+    usati di recente sono rimossi finché il totale supera max_bytes.
+    """
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Inizializza la cache.
+        
+        Args:
+            max_bytes: Byte massimi delle colonne in cache (0 = nessuna cache)
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries: "OrderedDict[str, Dict[str, np.ndarray]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+    def key(self, step: Any, input_fingerprints: List[str]) -> str:
+        """
+        Chiave di cache di uno step.
+        
+        Args:
+            step: Step di processing
+            input_fingerprints: Impronte delle colonne in ingresso
+            
+        Returns:
+            Chiave di cache
+        """
+        return '|'.join(
+            [step.name, params_fingerprint(step.params)] + input_fingerprints
+        )
+        
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Recupera le colonne in cache (copie).
+        
+        Args:
+            key: Chiave di cache
+            
+        Returns:
+            Colonne prodotte o None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return {column: values.copy() for column, values in entry.items()}
+        
+    def put(self, key: str, outputs: Dict[str, np.ndarray]) -> None:
+        """
+        Salva le colonne prodotte da uno step.
+        
+        Args:
+            key: Chiave di cache
+            outputs: Colonne prodotte
+        """
+        size = sum(values.nbytes for values in outputs.values())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= sum(values.nbytes for values in previous.values())
+            self._entries[key] = outputs
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= sum(values.nbytes for values in evicted.values())
+                
+    def clear(self) -> None:
+        """Svuota la cache."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
@@ -6,12 +6,18 @@ Implementa pipeline di trasformazione e calcolo indicatori.
 """
 
 import logging
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 import numpy as np
 import pandas as pd
-import talib
+
+from .incremental import IncrementalEngine
+from .vectorized import VECTORIZED_INDICATORS, CANDLE_SHAPE_COLUMNS
+from .planner import StepPlanner, FeatureCache, column_fingerprint
+from .buffers import ColumnBuffer
+from .backends import IndicatorBackend, get_backend
 
 class ProcessingStage(Enum):
     """Stadi di processing."""
@@ -29,6 +35,23 @@ class ProcessingStep:
     params: Optional[Dict[str, Any]] = None
     requires: Optional[List[str]] = None
     enabled: bool = True
+    provides: Optional[Union[List[str], Callable[..., List[str]]]] = None
+    version: int = 1
+    inplace_function: Optional[Callable] = None
+    
+    def outputs(self) -> Optional[List[str]]:
+        """
+        Colonne prodotte dallo step.
+        
+        Se 'provides' è una funzione viene chiamata con i parametri
+        dello step. None indica uno step opaco (es. che modifica righe).
+        
+        Returns:
+            Lista delle colonne o None
+        """
+        if callable(self.provides):
+            return self.provides(**(self.params or {}))
+        return self.provides
 
 class ProcessingStats:
     """Statistiche processing."""
@@ -39,6 +62,9 @@ class ProcessingStats:
         self.failed_steps = 0
         self.added_columns = 0
         self.removed_columns = 0
+        self.total_units = 0
+        self.completed_units = 0
+        self.failed_units = 0
         
     def update(
         self,
@@ -61,15 +87,68 @@ class ProcessingStats:
         if self.total_steps == 0:
             return 0.0
         return self.completed_steps / self.total_steps
+        
+    def start_units(self, total: int):
+        """Registra le unità di lavoro (simbolo, timeframe) da processare."""
+        self.total_units += total
+        
+    def unit_completed(self, success: bool):
+        """Aggiorna statistiche unità di lavoro."""
+        if success:
+            self.completed_units += 1
+        else:
+            self.failed_units += 1
+            
+    def step_counts(self) -> Dict[str, int]:
+        """Contatori degli step, da unire con merge()."""
+        return {
+            'total_steps': self.total_steps,
+            'completed_steps': self.completed_steps,
+            'failed_steps': self.failed_steps,
+            'added_columns': self.added_columns,
+            'removed_columns': self.removed_columns
+        }
+        
+    def merge(self, counts: Dict[str, int]):
+        """Somma i contatori degli step di un altro processo."""
+        for key, value in counts.items():
+            setattr(self, key, getattr(self, key) + value)
+            
+    @property
+    def progress(self) -> float:
+        """Frazione di unità di lavoro completate."""
+        if self.total_units == 0:
+            return 0.0
+        return (self.completed_units + self.failed_units) / self.total_units
 
 class DataProcessor:
     """Processore dati di mercato."""
     
-    def __init__(self):
-        """Inizializza il processore."""
+    def __init__(
+        self,
+        cache_bytes: int = 64 * 1024 * 1024,
+        max_threads: Optional[int] = None,
+        backend: Union[str, IndicatorBackend] = 'auto'
+    ):
+        """
+        Inizializza il processore.
+        
+        Args:
+            cache_bytes: Byte massimi dei risultati di step in cache
+                (0 = nessuna cache)
+            max_threads: Thread per step indipendenti (1 = sequenziale)
+            backend: Backend indicatori (nome, 'auto' o istanza)
+        """
         self.logger = logging.getLogger(__name__)
         self.stats = ProcessingStats()
         self.steps = self._setup_steps()
+        self.incremental = IncrementalEngine()
+        self.planner = StepPlanner()
+        self.cache = FeatureCache(cache_bytes)
+        self.max_threads = max_threads
+        self.backend = (
+            get_backend(backend) if isinstance(backend, str) else backend
+        )
         
     def _setup_steps(self) -> List[ProcessingStep]:
         """
@@ -83,53 +162,74 @@ class DataProcessor:
             ProcessingStep(
                 name="remove_duplicates",
                 stage=ProcessingStage.PREPROCESSING,
-                function=self._remove_duplicates
+                function=self._remove_duplicates,
+                inplace_function=self._remove_duplicates_inplace
             ),
             ProcessingStep(
                 name="sort_index",
                 stage=ProcessingStage.PREPROCESSING,
-                function=self._sort_index
+                function=self._sort_index,
+                inplace_function=self._sort_index_inplace
             ),
             ProcessingStep(
                 name="fill_missing",
                 stage=ProcessingStage.PREPROCESSING,
-                function=self._fill_missing
+                function=self._fill_missing,
+                inplace_function=self._fill_missing_inplace
             ),
             
+            # Gli step di indicatori e feature leggono e scrivono solo per
+            # colonna: la stessa funzione lavora in place su un ColumnBuffer
+            
             # Indicatori tecnici base
             ProcessingStep(
                 name="sma",
                 stage=ProcessingStage.INDICATORS,
                 function=self._add_sma,
-                params={'periods': [20, 50, 200]}
+                inplace_function=self._add_sma,
+                params={'periods': [20, 50, 200]},
+                requires=['close'],
+                provides=lambda periods, **_: [f'sma_{p}' for p in periods]
             ),
             ProcessingStep(
                 name="ema",
                 stage=ProcessingStage.INDICATORS,
                 function=self._add_ema,
-                params={'periods': [20, 50, 200]}
+                inplace_function=self._add_ema,
+                params={'periods': [20, 50, 200]},
+                requires=['close'],
+                provides=lambda periods, **_: [f'ema_{p}' for p in periods]
             ),
             ProcessingStep(
                 name="rsi",
                 stage=ProcessingStage.INDICATORS,
                 function=self._add_rsi,
-                params={'period': 14}
+                inplace_function=self._add_rsi,
+                params={'period': 14},
+                requires=['close'],
+                provides=['rsi']
             ),
             ProcessingStep(
                 name="macd",
                 stage=ProcessingStage.INDICATORS,
                 function=self._add_macd,
+                inplace_function=self._add_macd,
                 params={
                     'fastperiod': 12,
                     'slowperiod': 26,
                     'signalperiod': 9
-                }
+                },
+                requires=['close'],
+                provides=['macd', 'macd_signal', 'macd_hist']
             ),
             ProcessingStep(
                 name="bollinger",
                 stage=ProcessingStage.INDICATORS,
                 function=self._add_bollinger,
-                params={'period': 20, 'stdev': 2}
+                inplace_function=self._add_bollinger,
+                params={'period': 20, 'stdev': 2},
+                requires=['close'],
+                provides=['bb_upper', 'bb_middle', 'bb_lower']
             ),
             
             # Indicatori volume
@@ -137,48 +237,90 @@ class DataProcessor:
                 name="volume_sma",
                 stage=ProcessingStage.INDICATORS,
                 function=self._add_volume_sma,
-                params={'periods': [20, 50]}
+                inplace_function=self._add_volume_sma,
+                params={'periods': [20, 50]},
+                requires=['volume'],
+                provides=lambda periods, **_: [f'volume_sma_{p}' for p in periods]
             ),
             ProcessingStep(
                 name="obv",
                 stage=ProcessingStage.INDICATORS,
-                function=self._add_obv
+                function=self._add_obv,
+                inplace_function=self._add_obv,
+                requires=['close', 'volume'],
+                provides=['obv']
+            ),
+            
+            # Indicatori di range (opzionali)
+            ProcessingStep(
+                name="atr",
+                stage=ProcessingStage.INDICATORS,
+                function=self._add_atr,
+                inplace_function=self._add_atr,
+                params={'period': 14},
+                requires=['high', 'low', 'close'],
+                enabled=False,
+                provides=['atr']
             ),
             
             # Features
             ProcessingStep(
                 name="returns",
                 stage=ProcessingStage.FEATURES,
-                function=self._add_returns
+                function=self._add_returns,
+                inplace_function=self._add_returns,
+                requires=['close'],
+                provides=['returns']
             ),
             ProcessingStep(
                 name="log_returns",
                 stage=ProcessingStage.FEATURES,
-                function=self._add_log_returns
+                function=self._add_log_returns,
+                inplace_function=self._add_log_returns,
+                requires=['close'],
+                provides=['log_returns']
             ),
             ProcessingStep(
                 name="volatility",
                 stage=ProcessingStage.FEATURES,
                 function=self._add_volatility,
-                params={'window': 20}
+                inplace_function=self._add_volatility,
+                params={'window': 20},
+                requires=['returns'],
+                provides=['volatility']
             ),
             ProcessingStep(
                 name="momentum",
                 stage=ProcessingStage.FEATURES,
                 function=self._add_momentum,
-                params={'periods': [1, 5, 10, 20]}
+                inplace_function=self._add_momentum,
+                params={'periods': [1, 5, 10, 20]},
+                requires=['close'],
+                provides=lambda periods, **_: [f'momentum_{p}' for p in periods]
+            ),
+            ProcessingStep(
+                name="candle_shape",
+                stage=ProcessingStage.FEATURES,
+                function=self._add_candle_shape,
+                inplace_function=self._add_candle_shape,
+                params={'doji_ratio': 0.1},
+                requires=['open', 'high', 'low', 'close'],
+                enabled=False,
+                provides=list(CANDLE_SHAPE_COLUMNS)
             ),
             
             # Postprocessing
             ProcessingStep(
                 name="remove_nan",
                 stage=ProcessingStage.POSTPROCESSING,
-                function=self._remove_nan
+                function=self._remove_nan,
+                inplace_function=self._remove_nan_inplace
             ),
             ProcessingStep(
                 name="clip_outliers",
                 stage=ProcessingStage.POSTPROCESSING,
                 function=self._clip_outliers,
+                inplace_function=self._clip_outliers_inplace,
                 params={'std_dev': 3}
             )
         ]
@@ -186,14 +328,25 @@ class DataProcessor:
     def process_data(
         self,
         df: pd.DataFrame,
-        stages: Optional[List[ProcessingStage]] = None
+        stages: Optional[List[ProcessingStage]] = None,
+        inplace: bool = False,
+        dtype: Any = np.float64
     ) -> pd.DataFrame:
         """
         Processa DataFrame.
         
+        Con inplace=True le colonne numeriche sono copiate una sola
+        volta in buffer preallocati (input float64, output degli step
+        di tipo 'dtype', es. np.float32): gli step scrivono nei buffer
+        senza creare DataFrame intermedi e il risultato li avvolge
+        senza copie. La memoria di picco è prevedibile: righe × colonne
+        × dimensione del tipo. Il DataFrame in ingresso non è modificato.
+        
         Args:
             df: DataFrame da processare
             stages: Stage da eseguire
+            inplace: Usa buffer preallocati
+            dtype: Tipo delle colonne prodotte in modalità inplace
             
         Returns:
             DataFrame processato
@@ -201,6 +354,9 @@ class DataProcessor:
         if stages is None:
             stages = list(ProcessingStage)
             
+        if inplace:
+            return self._process_buffered(df, stages, dtype)
+            
         # Copia DataFrame
         df = df.copy()
         
@@ -210,30 +366,86 @@ class DataProcessor:
                 s for s in self.steps
                 if s.stage == stage and s.enabled
             ]
+            df = self._run_steps(df, steps)
             
-            for step in steps:
-                try:
-                    # Verifica dipendenze
-                    if step.requires:
-                        missing = [
-                            r for r in step.requires
-                            if r not in df.columns
-                        ]
-                        if missing:
-                            raise ValueError(
-                                f"Colonne mancanti: {missing}"
-                            )
-                            
-                    # Esegui step
-                    cols_before = set(df.columns)
-                    df = step.function(df, **(step.params or {}))
-                    cols_after = set(df.columns)
+        return df
+        
+    def _process_buffered(
+        self,
+        df: pd.DataFrame,
+        stages: List[ProcessingStage],
+        dtype: Any
+    ) -> pd.DataFrame:
+        """
+        Processa il DataFrame su buffer di colonne preallocati.
+        
+        Args:
+            df: DataFrame da processare
+            stages: Stage da eseguire
+            dtype: Tipo delle colonne prodotte
+            
+        Returns:
+            DataFrame processato
+        """
+        steps = [
+            [s for s in self.steps if s.stage == stage and s.enabled]
+            for stage in stages
+        ]
+        reserve = [
+            column
+            for stage_steps in steps
+            for step in stage_steps
+            for column in (step.outputs() or [])
+        ]
+        
+        buffer = ColumnBuffer.from_frame(df, reserve, dtype)
+        for stage_steps in steps:
+            buffer = self._run_inplace(buffer, stage_steps)
+            
+        return buffer.to_frame()
+        
+    def _run_inplace(
+        self,
+        buffer: ColumnBuffer,
+        steps: List[ProcessingStep]
+    ) -> ColumnBuffer:
+        """
+        Esegue gli step di uno stage direttamente sul buffer.
+        
+        I livelli del grafo sono eseguiti in sequenza: ogni step scrive
+        le sue colonne nei buffer preallocati tramite inplace_function,
+        senza DataFrame intermedi né copie dei risultati. La cache degli
+        step non è usata, perché i buffer sono modificati dagli step
+        successivi (es. clip_outliers).
+        
+        Args:
+            buffer: Buffer da processare
+            steps: Step abilitati dello stage
+            
+        Returns:
+            Buffer processato
+        """
+        existing = set(buffer.columns)
+        
+        for level in self.planner.levels(steps):
+            for step in level:
+                if step.outputs() is None:
+                    buffer = self._run_opaque(buffer, step)
+                    continue
                     
-                    # Aggiorna statistiche
+                try:
+                    missing = [
+                        r for r in (step.requires or [])
+                        if r not in buffer.columns
+                    ]
+                    if missing:
+                        raise ValueError(f"Colonne mancanti: {missing}")
+                        
+                    cols_before = set(buffer.columns)
+                    self._apply_declared(buffer, step)
                     self.stats.update(
                         completed=True,
-                        added=len(cols_after - cols_before),
-                        removed=len(cols_before - cols_after)
+                        added=len(set(buffer.columns) - cols_before)
                     )
                     
                 except Exception as e:
@@ -242,8 +454,543 @@ class DataProcessor:
                     )
                     self.stats.update(completed=False)
                     
+        # Colonne nuove nell'ordine di configurazione, come _flush_outputs
+        buffer.move_to_end([
+            column
+            for step in steps
+            for column in (step.outputs() or [])
+            if column not in existing
+        ])
+        return buffer
+        
+    def _apply_declared(
+        self,
+        buffer: ColumnBuffer,
+        step: ProcessingStep
+    ) -> None:
+        """
+        Applica a un ColumnBuffer uno step con output dichiarati.
+        
+        Senza variante in place lo step riceve un DataFrame con le sole
+        colonne richieste e le colonne prodotte sono copiate nei buffer.
+        """
+        params = step.params or {}
+        if step.inplace_function is not None:
+            step.inplace_function(buffer, **params)
+            return
+            
+        self.logger.debug(f"Step {step.name} senza variante in place")
+        frame = pd.DataFrame(
+            {column: buffer[column] for column in (step.requires or [])},
+            index=buffer.index
+        )
+        result = step.function(frame, **params)
+        for column in step.outputs():
+            buffer[column] = result[column].to_numpy()
+            
+    def compute(
+        self,
+        df: pd.DataFrame,
+        targets: List[str]
+    ) -> pd.DataFrame:
+        """
+        Calcola solo le colonne richieste.
+        
+        Esegue il preprocessing e gli step di INDICATORS e FEATURES
+        necessari ai target (con le loro dipendenze), senza
+        postprocessing.
+        
+        Args:
+            df: DataFrame da processare
+            targets: Nomi di step o di colonne (es. ['rsi', 'bollinger'])
+            
+        Returns:
+            DataFrame con le colonne calcolate
+            
+        Raises:
+            ValueError: Se un target non è producibile
+        """
+        df = df.copy()
+        enabled = [s for s in self.steps if s.enabled]
+        
+        df = self._run_steps(
+            df,
+            [s for s in enabled if s.stage == ProcessingStage.PREPROCESSING]
+        )
+        
+        needed = self.planner.resolve(
+            [
+                s for s in enabled
+                if s.stage in (ProcessingStage.INDICATORS, ProcessingStage.FEATURES)
+            ],
+            targets,
+            set(df.columns)
+        )
+        for stage in (ProcessingStage.INDICATORS, ProcessingStage.FEATURES):
+            df = self._run_steps(df, [s for s in needed if s.stage == stage])
+            
         return df
         
+    def materialize(
+        self,
+        df: pd.DataFrame,
+        store: Any,
+        exchange: str,
+        symbol: str,
+        timeframe: str,
+        targets: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Legge le feature dal FeatureStore, calcolando solo quelle mancanti.
+        
+        Ogni step è salvato con chiave (exchange, symbol, timeframe,
+        step, hash dei parametri, versione dello step). I segmenti
+        calcolati da candele poi modificate sono invalidati; gli step
+        non aggiornati all'ultima candela sono ricalcolati e solo le
+        righe nuove sono aggiunte allo store.
+        
+        Args:
+            df: Candele OHLCV
+            store: FeatureStore di destinazione
+            exchange: Nome exchange
+            symbol: Simbolo trading
+            timeframe: Timeframe
+            targets: Step o colonne richieste (default: tutti gli step
+                abilitati di INDICATORS e FEATURES)
+                
+        Returns:
+            DataFrame con le colonne delle feature
+        """
+        candles = self._run_steps(
+            df.copy(),
+            [
+                s for s in self.steps
+                if s.stage == ProcessingStage.PREPROCESSING and s.enabled
+            ]
+        )
+        steps = [
+            s for s in self.steps
+            if s.enabled
+            and s.stage in (ProcessingStage.INDICATORS, ProcessingStage.FEATURES)
+        ]
+        if targets is not None:
+            steps = self.planner.resolve(steps, targets, set(candles.columns))
+            
+        keys = {
+            step.name: store.key_for(exchange, symbol, timeframe, step)
+            for step in steps
+        }
+        hash_cache: Dict[Tuple[int, int], str] = {}
+        stale = []
+        for step in steps:
+            last = store.validate(keys[step.name], candles, hash_cache)
+            if last is None or (len(candles) and last < candles.index[-1]):
+                stale.append(step)
+                store.stats.misses += 1
+            else:
+                store.stats.hits += 1
+                
+        if stale:
+            computed = self.compute(df, [s.name for s in stale])
+            for step in stale:
+                store.append(keys[step.name], computed[step.outputs()], candles)
+                
+        features = [store.load(keys[step.name]) for step in steps]
+        if not features:
+            return pd.DataFrame(index=candles.index)
+        return pd.concat(features, axis=1)
+        
+    def _run_steps(
+        self,
+        df: pd.DataFrame,
+        steps: List[ProcessingStep]
+    ) -> pd.DataFrame:
+        """
+        Esegue gli step secondo il grafo delle dipendenze.
+        
+        Gli step con output dichiarati sono eseguiti per livelli, in
+        parallelo su thread, e memoizzati per impronta dei dati in
+        ingresso; le colonne sono aggiunte nell'ordine di configurazione.
+        Gli step opachi sono eseguiti sull'intero DataFrame.
+        
+        Args:
+            df: DataFrame da processare
+            steps: Step abilitati dello stage
+            
+        Returns:
+            DataFrame processato
+        """
+        produced: Dict[str, Dict[str, np.ndarray]] = {}
+        fingerprints: Dict[str, str] = {}
+        executor = None
+        
+        try:
+            for level in self.planner.levels(steps):
+                if level[0].outputs() is None:
+                    df = self._flush_outputs(df, steps, produced)
+                    fingerprints.clear()
+                    df = self._run_opaque(df, level[0])
+                    continue
+                    
+                if len(level) > 1 and self.max_threads != 1:
+                    if executor is None:
+                        executor = ThreadPoolExecutor(self.max_threads)
+                    futures = [
+                        executor.submit(self._run_declared, df, s, produced, fingerprints)
+                        for s in level
+                    ]
+                    results = [f.exception() or f.result() for f in futures]
+                else:
+                    results = []
+                    for s in level:
+                        try:
+                            results.append(
+                                self._run_declared(df, s, produced, fingerprints)
+                            )
+                        except Exception as e:
+                            results.append(e)
+                            
+                for step, result in zip(level, results):
+                    if isinstance(result, Exception):
+                        self.logger.error(
+                            f"Errore in {step.name}: {str(result)}"
+                        )
+                        self.stats.update(completed=False)
+                    else:
+                        produced[step.name] = result
+                        self.stats.update(
+                            completed=True,
+                            added=len([c for c in result if c not in df.columns])
+                        )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+                
+        return self._flush_outputs(df, steps, produced)
+        
+    def _run_declared(
+        self,
+        df: pd.DataFrame,
+        step: ProcessingStep,
+        produced: Dict[str, Dict[str, np.ndarray]],
+        fingerprints: Dict[str, str]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Esegue uno step con output dichiarati, usando la cache.
+        
+        Lo step riceve un DataFrame con le sole colonne richieste.
+        
+        Args:
+            df: DataFrame corrente
+            step: Step da eseguire
+            produced: Colonne prodotte dagli step precedenti dello stage
+            fingerprints: Impronte delle colonne già calcolate
+            
+        Returns:
+            Colonne prodotte
+            
+        Raises:
+            ValueError: Se mancano colonne richieste
+        """
+        available = {
+            column: values
+            for outputs in produced.values()
+            for column, values in outputs.items()
+        }
+        requires = step.requires or []
+        missing = [
+            r for r in requires
+            if r not in df.columns and r not in available
+        ]
+        if missing:
+            raise ValueError(f"Colonne mancanti: {missing}")
+            
+        inputs = {
+            column: available[column] if column in available
+            else df[column].to_numpy()
+            for column in requires
+        }
+        
+        key = None
+        if requires:
+            for column, values in inputs.items():
+                if column not in fingerprints:
+                    fingerprints[column] = column_fingerprint(df.index, values)
+            key = self.cache.key(step, [fingerprints[c] for c in requires])
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+                
+        frame = pd.DataFrame(inputs, index=df.index)
+        result = step.function(frame, **(step.params or {}))
+        outputs = {
+            column: result[column].to_numpy()
+            for column in step.outputs()
+        }
+        
+        if key is not None:
+            self.cache.put(key, outputs)
+        return outputs
+        
+    def _run_opaque(
+        self,
+        df: pd.DataFrame,
+        step: ProcessingStep
+    ) -> pd.DataFrame:
+        """Esegue uno step senza output dichiarati sull'intero DataFrame."""
+        try:
+            # Verifica dipendenze
+            if step.requires:
+                missing = [
+                    r for r in step.requires
+                    if r not in df.columns
+                ]
+                if missing:
+                    raise ValueError(
+                        f"Colonne mancanti: {missing}"
+                    )
+                    
+            # Esegui step
+            cols_before = set(df.columns)
+            df = self._apply_opaque(df, step)
+            cols_after = set(df.columns)
+            
+            # Aggiorna statistiche
+            self.stats.update(
+                completed=True,
+                added=len(cols_after - cols_before),
+                removed=len(cols_before - cols_after)
+            )
+            
+        except Exception as e:
+            self.logger.error(
+                f"Errore in {step.name}: {str(e)}"
+            )
+            self.stats.update(completed=False)
+            
+        return df
+        
+    def _apply_opaque(
+        self,
+        df: Union[pd.DataFrame, ColumnBuffer],
+        step: ProcessingStep
+    ) -> Union[pd.DataFrame, ColumnBuffer]:
+        """
+        Applica uno step opaco a un DataFrame o a un ColumnBuffer.
+        
+        Sui buffer usa la variante in place dello step; se non esiste
+        il buffer viene convertito in DataFrame e ricreato.
+        """
+        params = step.params or {}
+        if not isinstance(df, ColumnBuffer):
+            return step.function(df, **params)
+            
+        if step.inplace_function is not None:
+            step.inplace_function(df, **params)
+            return df
+            
+        self.logger.debug(f"Step {step.name} senza variante in place")
+        return ColumnBuffer.from_frame(step.function(df.to_frame(), **params))
+        
+    def _flush_outputs(
+        self,
+        df: pd.DataFrame,
+        steps: List[ProcessingStep],
+        produced: Dict[str, Dict[str, np.ndarray]]
+    ) -> pd.DataFrame:
+        """Aggiunge al DataFrame le colonne prodotte, in ordine di step."""
+        for step in steps:
+            outputs = produced.pop(step.name, None)
+            if outputs:
+                for column, values in outputs.items():
+                    df[column] = values
+        return df
+        
+    def process_incremental(
+        self,
+        df: pd.DataFrame,
+        symbol: str,
+        timeframe: str
+    ) -> pd.DataFrame:
+        """
+        Aggiorna gli indicatori con nuove candele in O(N).
+        
+        Lo stato di ogni indicatore è mantenuto per (symbol, timeframe):
+        la prima chiamata inizializza lo stato con lo storico passato,
+        le successive elaborano solo le candele nuove. Sono calcolati
+        gli step abilitati degli stage INDICATORS e FEATURES; gli step
+        di postprocessing operano sull'intera serie e non sono applicati.
+        
+        Args:
+            df: Nuove candele (colonne close e volume richieste)
+            symbol: Simbolo trading
+            timeframe: Timeframe
+            
+        Returns:
+            Nuove candele con le colonne indicatore
+        """
+        return self.incremental.update(
+            (symbol, timeframe),
+            df,
+            self._incremental_steps()
+        )
+        
+    def process_candle(
+        self,
+        symbol: str,
+        timeframe: str,
+        timestamp: Any,
+        close: float,
+        volume: float
+    ) -> Optional[Dict[str, float]]:
+        """
+        Aggiorna gli indicatori con una singola candela live.
+        
+        Args:
+            symbol: Simbolo trading
+            timeframe: Timeframe
+            timestamp: Timestamp della candela
+            close: Prezzo di chiusura
+            volume: Volume
+            
+        Returns:
+            Valori degli indicatori, None se la candela è già elaborata
+        """
+        return self.incremental.update_candle(
+            (symbol, timeframe),
+            timestamp,
+            close,
+            volume,
+            self._incremental_steps()
+        )
+        
+    def _incremental_steps(self) -> List[Any]:
+        """Step abilitati calcolabili in modo incrementale."""
+        return [
+            (s.name, s.params or {})
+            for stage in (ProcessingStage.INDICATORS, ProcessingStage.FEATURES)
+            for s in self.steps
+            if s.stage == stage and s.enabled
+        ]
+        
+    def reset_incremental(
+        self,
+        symbol: Optional[str] = None,
+        timeframe: Optional[str] = None
+    ) -> None:
+        """
+        Elimina lo stato incrementale.
+        
+        Args:
+            symbol: Simbolo (None = tutte le serie)
+            timeframe: Timeframe
+        """
+        if symbol is None:
+            self.incremental.reset()
+        else:
+            self.incremental.reset((symbol, timeframe))
+            
+    def process_universe(
+        self,
+        frames: Dict[str, pd.DataFrame]
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Calcola gli indicatori per un universo di simboli.
+        
+        Le serie close/volume sono allineate su un indice comune e
+        impilate in matrici (tempo × simbolo); ogni step abilitato degli
+        stage INDICATORS e FEATURES è calcolato per tutti i simboli in
+        un'unica passata vettoriale. Dentro l'intervallo di ogni simbolo
+        i close mancanti sono riempiti in avanti e i volumi con 0.
+        
+        Args:
+            frames: DataFrame OHLCV per simbolo
+            
+        Returns:
+            DataFrame (tempo × simbolo) per ogni colonna indicatore
+        """
+        if not frames:
+            return {}
+            
+        symbols = list(frames.keys())
+        index, close, volume = self._stack_universe(frames, symbols)
+        
+        results: Dict[str, pd.DataFrame] = {}
+        for stage in (ProcessingStage.INDICATORS, ProcessingStage.FEATURES):
+            for step in self.steps:
+                if step.stage != stage or not step.enabled:
+                    continue
+                    
+                kernel = VECTORIZED_INDICATORS.get(step.name)
+                if kernel is None:
+                    self.logger.warning(
+                        f"Step {step.name} non supporta il calcolo vettoriale"
+                    )
+                    continue
+                    
+                try:
+                    outputs = kernel(close, volume, **(step.params or {}))
+                    for column, values in outputs.items():
+                        results[column] = pd.DataFrame(
+                            values,
+                            index=index,
+                            columns=symbols
+                        )
+                    self.stats.update(completed=True, added=len(outputs))
+                except Exception as e:
+                    self.logger.error(
+                        f"Errore in {step.name}: {str(e)}"
+                    )
+                    self.stats.update(completed=False)
+                    
+        return results
+        
+    def _stack_universe(
+        self,
+        frames: Dict[str, pd.DataFrame],
+        symbols: List[str]
+    ) -> Tuple[pd.Index, np.ndarray, np.ndarray]:
+        """
+        Allinea close e volume dei simboli su un indice comune.
+        
+        Args:
+            frames: DataFrame OHLCV per simbolo
+            symbols: Ordine delle colonne
+            
+        Returns:
+            Indice comune, matrici close e volume (tempo × simbolo)
+        """
+        index = frames[symbols[0]].index
+        for symbol in symbols[1:]:
+            if not index.equals(frames[symbol].index):
+                index = index.append(
+                    [frames[s].index for s in symbols[1:]]
+                ).unique()
+                break
+        index = index.sort_values()
+        
+        # Ordine Fortran: ogni serie è contigua lungo il tempo
+        close = np.full((len(index), len(symbols)), np.nan, order='F')
+        volume = np.full((len(index), len(symbols)), np.nan, order='F')
+        for col, symbol in enumerate(symbols):
+            df = frames[symbol]
+            rows = index.get_indexer(df.index)
+            close[rows, col] = df['close'].to_numpy(dtype=float)
+            volume[rows, col] = df['volume'].to_numpy(dtype=float)
+            
+        # Riempimento limitato all'intervallo quotato di ogni simbolo
+        listed = ~np.isnan(close)
+        first = np.where(listed.any(axis=0), listed.argmax(axis=0), len(index))
+        last = len(index) - 1 - listed[::-1].argmax(axis=0)
+        positions = np.arange(len(index))[:, np.newaxis]
+        inside = (positions >= first) & (positions <= last)
+        
+        filled = pd.DataFrame(close).ffill().to_numpy()
+        close = np.asfortranarray(np.where(inside, filled, np.nan))
+        volume = np.asfortranarray(np.where(inside, np.nan_to_num(volume), np.nan))
+        
+        return index, close, volume
+        
     def _remove_duplicates(
         self,
         df: pd.DataFrame,
@@ -252,6 +999,16 @@ class DataProcessor:
         """Rimuove righe duplicate."""
         return df.drop_duplicates()
         
+    def _remove_duplicates_inplace(
+        self,
+        buffer: ColumnBuffer,
+        **kwargs: Any
+    ) -> None:
+        """Rimuove righe duplicate (in place)."""
+        duplicated = buffer.to_frame().duplicated().to_numpy()
+        if duplicated.any():
+            buffer.compact(~duplicated)
+            
     def _sort_index(
         self,
         df: pd.DataFrame,
@@ -260,6 +1017,15 @@ class DataProcessor:
         """Ordina per timestamp."""
         return df.sort_index()
         
+    def _sort_index_inplace(
+        self,
+        buffer: ColumnBuffer,
+        **kwargs: Any
+    ) -> None:
+        """Ordina per timestamp (in place)."""
+        if not buffer.index.is_monotonic_increasing:
+            buffer.reorder(np.argsort(buffer.index.to_numpy(), kind='stable'))
+            
     def _fill_missing(
         self,
         df: pd.DataFrame,
@@ -276,6 +1042,25 @@ class DataProcessor:
         
         return df
         
+    def _fill_missing_inplace(
+        self,
+        buffer: ColumnBuffer,
+        **kwargs: Any
+    ) -> None:
+        """Riempie valori mancanti (in place)."""
+        # Forward fill per OHLC
+        for column in ['open', 'high', 'low', 'close']:
+            values = buffer.array(column)
+            missing = np.isnan(values)
+            if missing.any():
+                source = np.where(missing, 0, np.arange(len(values)))
+                np.maximum.accumulate(source, out=source)
+                values[:] = values[source]
+                
+        # Fill 0 per volume
+        volume = buffer.array('volume')
+        volume[np.isnan(volume)] = 0
+        
     def _add_sma(
         self,
         df: pd.DataFrame,
@@ -284,9 +1069,9 @@ class DataProcessor:
     ) -> pd.DataFrame:
         """Aggiunge SMA."""
         for period in periods:
-            df[f'sma_{period}'] = talib.SMA(
+            df[f'sma_{period}'] = self.backend.sma(
                 df['close'].values,
-                timeperiod=period
+                period
             )
         return df
         
@@ -298,9 +1083,9 @@ class DataProcessor:
     ) -> pd.DataFrame:
         """Aggiunge EMA."""
         for period in periods:
-            df[f'ema_{period}'] = talib.EMA(
+            df[f'ema_{period}'] = self.backend.ema(
                 df['close'].values,
-                timeperiod=period
+                period
             )
         return df
         
@@ -311,9 +1096,9 @@ class DataProcessor:
         **kwargs: Any
     ) -> pd.DataFrame:
         """Aggiunge RSI."""
-        df['rsi'] = talib.RSI(
+        df['rsi'] = self.backend.rsi(
             df['close'].values,
-            timeperiod=period
+            period
         )
         return df
         
@@ -326,11 +1111,11 @@ class DataProcessor:
         **kwargs: Any
     ) -> pd.DataFrame:
         """Aggiunge MACD."""
-        macd, signal, hist = talib.MACD(
+        macd, signal, hist = self.backend.macd(
             df['close'].values,
-            fastperiod=fastperiod,
-            slowperiod=slowperiod,
-            signalperiod=signalperiod
+            fastperiod,
+            slowperiod,
+            signalperiod
         )
         df['macd'] = macd
         df['macd_signal'] = signal
@@ -345,11 +1130,11 @@ class DataProcessor:
         **kwargs: Any
     ) -> pd.DataFrame:
         """Aggiunge Bollinger Bands."""
-        upper, middle, lower = talib.BBANDS(
+        upper, middle, lower = self.backend.bbands(
             df['close'].values,
-            timeperiod=period,
-            nbdevup=stdev,
-            nbdevdn=stdev
+            period,
+            stdev,
+            stdev
         )
         df['bb_upper'] = upper
         df['bb_middle'] = middle
@@ -364,9 +1149,9 @@ class DataProcessor:
     ) -> pd.DataFrame:
         """Aggiunge SMA volume."""
         for period in periods:
-            df[f'volume_sma_{period}'] = talib.SMA(
+            df[f'volume_sma_{period}'] = self.backend.sma(
                 df['volume'].values,
-                timeperiod=period
+                period
             )
         return df
         
@@ -376,12 +1161,27 @@ class DataProcessor:
         **kwargs: Any
     ) -> pd.DataFrame:
         """Aggiunge On Balance Volume."""
-        df['obv'] = talib.OBV(
+        df['obv'] = self.backend.obv(
             df['close'].values,
             df['volume'].values
         )
         return df
         
+    def _add_atr(
+        self,
+        df: pd.DataFrame,
+        period: int,
+        **kwargs: Any
+    ) -> pd.DataFrame:
+        """Aggiunge Average True Range."""
+        df['atr'] = self.backend.atr(
+            df['high'].values,
+            df['low'].values,
+            df['close'].values,
+            period
+        )
+        return df
+        
     def _add_returns(
         self,
         df: pd.DataFrame,
@@ -407,9 +1207,10 @@ class DataProcessor:
         **kwargs: Any
     ) -> pd.DataFrame:
         """Aggiunge volatilità."""
-        df['volatility'] = df['returns'].rolling(
-            window=window
-        ).std()
+        df['volatility'] = self.backend.rolling_std(
+            df['returns'].values,
+            window
+        )
         return df
         
     def _add_momentum(
@@ -420,11 +1221,30 @@ class DataProcessor:
     ) -> pd.DataFrame:
         """Aggiunge momentum."""
         for period in periods:
-            df[f'momentum_{period}'] = df['close'].pct_change(
-                periods=period
+            df[f'momentum_{period}'] = self.backend.pct_change(
+                df['close'].values,
+                period
             )
         return df
         
+    def _add_candle_shape(
+        self,
+        df: pd.DataFrame,
+        doji_ratio: float,
+        **kwargs: Any
+    ) -> pd.DataFrame:
+        """Aggiunge feature di forma della candela."""
+        features = self.backend.candle_shape(
+            df['open'].values,
+            df['high'].values,
+            df['low'].values,
+            df['close'].values,
+            doji_ratio
+        )
+        for column, values in features.items():
+            df[column] = values
+        return df
+        
     def _remove_nan(
         self,
         df: pd.DataFrame,
@@ -433,6 +1253,20 @@ class DataProcessor:
         """Rimuove righe con NaN."""
         return df.dropna()
         
+    def _remove_nan_inplace(
+        self,
+        buffer: ColumnBuffer,
+        **kwargs: Any
+    ) -> None:
+        """Rimuove righe con NaN (in place)."""
+        keep = np.ones(len(buffer), dtype=bool)
+        for column in buffer.numeric_columns():
+            keep &= ~np.isnan(buffer.array(column))
+        if buffer.extra is not None:
+            keep &= buffer.extra.notna().all(axis=1).to_numpy()
+        if not keep.all():
+            buffer.compact(keep)
+            
     def _clip_outliers(
         self,
         df: pd.DataFrame,
@@ -452,4 +1286,24 @@ class DataProcessor:
                 upper=mean + std_dev * std
             )
             
-        return df
\ No newline at end of file
+        return df
+        
+    def _clip_outliers_inplace(
+        self,
+        buffer: ColumnBuffer,
+        std_dev: float,
+        **kwargs: Any
+    ) -> None:
+        """Clip outliers (in place)."""
+        for column in buffer.numeric_columns():
+            values = buffer.array(column)
+            if len(values) < 2 or np.isnan(values).all():
+                continue
+            mean = np.nanmean(values)
+            std = np.nanstd(values, ddof=1)
+            np.clip(
+                values,
+                mean - std_dev * std,
+                mean + std_dev * std,
+                out=values
+            )
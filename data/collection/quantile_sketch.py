@@ -0,0 +1,321 @@
+"""
+Quantile Sketch
+-------------
+Sketch dei quantili (t-digest con merge) per VaR e CVaR storici.
+Ogni sketch riassume una distribuzione in un numero di centroidi
+proporzionale alla compressione, con errore minore sulle code. Gli
+sketch si aggiornano a blocchi di valori e si fondono senza
+rileggere i dati, ad esempio per aggregare simboli o periodi.
+"""
+
+import logging
+from typing import Dict, List, Any, Optional, Iterable, Hashable
+
+import numpy as np
+
+class TDigest:
+    """t-digest con compressione vettorizzata (scala k2)."""
+    
+    def __init__(
+        self,
+        compression: float = 200.0,
+        buffer_size: Optional[int] = None
+    ):
+        """
+        Inizializza lo sketch.
+        
+        Args:
+            compression: Compressione (delta): più alta = più centroidi e
+                maggiore precisione
+            buffer_size: Valori accumulati prima della compressione
+                (default: 10 × compressione)
+        """
+        self.compression = compression
+        self.buffer_size = buffer_size or int(10 * compression)
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+        self._buffer: List[np.ndarray] = []
+        self._buffered = 0
+        
+    @property
+    def count(self) -> float:
+        """Numero di valori riassunti."""
+        return float(self.weights.sum()) + self._buffered
+        
+    def update(self, values: Iterable[float]) -> None:
+        """
+        Aggiunge un blocco di valori (i NaN sono ignorati).
+        
+        Args:
+            values: Valori da aggiungere
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._buffer.append(values)
+        self._buffered += len(values)
+        if self._buffered >= self.buffer_size:
+            self._flush()
+            
+    def merge(self, other: 'TDigest') -> None:
+        """
+        Fonde un altro sketch in questo.
+        
+        Args:
+            other: Sketch da fondere
+        """
+        other._flush()
+        if len(other.means) == 0:
+            return
+        self._flush()
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(
+            np.concatenate((self.means, other.means)),
+            np.concatenate((self.weights, other.weights))
+        )
+        
+    @classmethod
+    def merge_all(
+        cls,
+        digests: Iterable['TDigest'],
+        compression: Optional[float] = None
+    ) -> 'TDigest':
+        """
+        Fonde più sketch con una sola compressione.
+        
+        Args:
+            digests: Sketch da fondere
+            compression: Compressione del risultato (default: la massima)
+            
+        Returns:
+            Nuovo sketch
+        """
+        digests = list(digests)
+        for digest in digests:
+            digest._flush()
+        merged = cls(compression or max((d.compression for d in digests), default=200.0))
+        filled = [d for d in digests if len(d.means)]
+        if filled:
+            merged.min = min(d.min for d in filled)
+            merged.max = max(d.max for d in filled)
+            merged._compress(
+                np.concatenate([d.means for d in filled]),
+                np.concatenate([d.weights for d in filled])
+            )
+        return merged
+        
+    def _flush(self) -> None:
+        """Comprime i valori in attesa nei centroidi."""
+        if not self._buffered:
+            return
+        values = np.concatenate(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        self._compress(
+            np.concatenate((self.means, values)),
+            np.concatenate((self.weights, np.ones(len(values))))
+        )
+        
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        """
+        Fonde centroidi adiacenti finché restano entro un'unità della
+        scala k2, k(q) = delta / Z * log(q / (1 - q)) con
+        Z = 4 log(n / delta) + 24, che concentra i centroidi sulle code.
+        
+        Il gruppo di ogni centroide è l'intervallo unitario di k in cui
+        cade il suo estremo destro: i gruppi sono contigui e sono sommati
+        con np.add.reduceat.
+        """
+        order = np.argsort(means, kind='stable')
+        means = means[order]
+        weights = weights[order]
+        cumulative = np.cumsum(weights)
+        total = cumulative[-1]
+        q = np.clip(cumulative / total, 0.5 / total, 1 - 0.5 / total)
+        normalizer = 4 * np.log(max(total / self.compression, 1.0)) + 24
+        k = self.compression / normalizer * np.log(q / (1 - q))
+        group = np.floor(k)
+        
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(group)) + 1))
+        merged_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.weights = merged_weights
+        
+    def _curve(self) -> tuple:
+        """
+        Posizioni e valori della funzione quantile.
+        
+        Le posizioni sono i ranghi (da 0 a n - 1) dei centri dei
+        centroidi: con centroidi di peso unitario coincidono con gli
+        indici dei valori ordinati, come l'interpolazione di
+        np.percentile.
+        """
+        self._flush()
+        centers = np.cumsum(self.weights) - self.weights / 2 - 0.5
+        total = self.weights.sum()
+        positions = np.concatenate(([0.0], centers, [total - 1]))
+        values = np.concatenate(([self.min], self.means, [self.max]))
+        return positions, values
+        
+    def quantile(self, q: float) -> float:
+        """
+        Quantile stimato (esatto, come np.percentile, finché i
+        centroidi hanno peso unitario).
+        
+        Args:
+            q: Probabilità (0-1)
+            
+        Returns:
+            Valore del quantile (NaN se lo sketch è vuoto)
+        """
+        if self.count == 0:
+            return float('nan')
+        positions, values = self._curve()
+        return float(np.interp(q * positions[-1], positions, values))
+        
+    def tail_mean(self, q: float) -> float:
+        """
+        Media dei valori sotto il quantile q.
+        
+        Le medie dei centroidi sono esatte: si sommano i centroidi
+        interamente nella coda e la quota del centroide a cavallo.
+        
+        Args:
+            q: Probabilità della coda (0-1)
+            
+        Returns:
+            Media della coda inferiore
+        """
+        if self.count == 0 or q <= 0:
+            return float('nan')
+        self._flush()
+        cumulative = np.cumsum(self.weights)
+        target = q * cumulative[-1]
+        full = int(np.searchsorted(cumulative, target, side='right'))
+        total = float(np.dot(self.means[:full], self.weights[:full]))
+        covered = float(cumulative[full - 1]) if full else 0.0
+        if full < len(self.means):
+            total += (target - covered) * self.means[full]
+        return float(total / target)
+        
+    def var(self, confidence_level: float = 0.95) -> float:
+        """VaR storico (valore assoluto, come RiskMetrics.calculate_var)."""
+        return abs(self.quantile(1 - confidence_level))
+        
+    def cvar(self, confidence_level: float = 0.95) -> float:
+        """CVaR storico (valore assoluto, come RiskMetrics.calculate_cvar)."""
+        return abs(self.tail_mean(1 - confidence_level))
+        
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serializza lo sketch (es. per salvarlo in JSON).
+        
+        Returns:
+            Dizionario con compressione, estremi e centroidi
+        """
+        self._flush()
+        return {
+            'compression': self.compression,
+            'min': float(self.min),
+            'max': float(self.max),
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist()
+        }
+        
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TDigest':
+        """
+        Ricostruisce uno sketch serializzato con to_dict().
+        
+        Args:
+            data: Dizionario dello sketch
+            
+        Returns:
+            Sketch
+        """
+        digest = cls(data['compression'])
+        digest.min = data['min']
+        digest.max = data['max']
+        digest.means = np.asarray(data['means'], dtype=np.float64)
+        digest.weights = np.asarray(data['weights'], dtype=np.float64)
+        return digest
+
+class RiskSketches:
+    """Sketch dei rendimenti per chiave (es. simbolo, timeframe)."""
+    
+    def __init__(self, compression: float = 200.0):
+        """
+        Inizializza la raccolta.
+        
+        Args:
+            compression: Compressione degli sketch
+        """
+        self.logger = logging.getLogger(__name__)
+        self.compression = compression
+        self.sketches: Dict[Hashable, TDigest] = {}
+        
+    def update(self, key: Hashable, returns: Iterable[float]) -> TDigest:
+        """
+        Aggiunge nuovi rendimenti allo sketch di una chiave.
+        
+        Args:
+            key: Chiave della serie
+            returns: Rendimenti non ancora inclusi
+            
+        Returns:
+            Sketch aggiornato
+        """
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            sketch = self.sketches[key] = TDigest(self.compression)
+        sketch.update(returns)
+        return sketch
+        
+    def aggregate(self, keys: Optional[Iterable[Hashable]] = None) -> TDigest:
+        """
+        Fonde gli sketch di più chiavi.
+        
+        Il risultato descrive l'insieme dei rendimenti delle chiavi (la
+        loro unione), non i rendimenti di un portafoglio pesato: per il
+        VaR di un portafoglio si aggiorna uno sketch con la sua serie.
+        
+        Args:
+            keys: Chiavi da fondere (None = tutte)
+            
+        Returns:
+            Sketch fuso
+        """
+        keys = self.sketches.keys() if keys is None else keys
+        return TDigest.merge_all(
+            (self.sketches[k] for k in keys if k in self.sketches),
+            self.compression
+        )
+        
+    def risk(
+        self,
+        key: Optional[Hashable] = None,
+        levels: Iterable[float] = (0.95, 0.99)
+    ) -> Dict[str, float]:
+        """
+        VaR e CVaR di una chiave o di tutte le chiavi fuse.
+        
+        Args:
+            key: Chiave (None = aggregato di tutte le chiavi)
+            levels: Livelli di confidenza
+            
+        Returns:
+            Dizionario var_XX / cvar_XX
+        """
+        sketch = self.aggregate() if key is None else self.sketches[key]
+        result = {}
+        for level in levels:
+            label = int(round(level * 100))
+            result[f'var_{label}'] = sketch.var(level)
+            result[f'cvar_{label}'] = sketch.cvar(level)
+        return result
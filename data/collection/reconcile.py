@@ -0,0 +1,260 @@
+"""
+Timeframe Reconciliation
+----------------------
+Riconciliazione di serie OHLCV ordinate su array di timestamp
+int64: unione con merge lineare, riempimento in place dei valori
+mancanti dalla serie aggregata e statistiche dei gap senza
+colonne temporanee.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+@dataclass
+class GapStats:
+    """Statistiche di continuità di una serie."""
+    rows: int = 0
+    gaps: int = 0
+    missing_candles: int = 0
+    max_gap: int = 0
+
+@dataclass
+class ReconcileStats:
+    """Statistiche di riconciliazione tra serie originale e aggregata."""
+    base_rows: int = 0
+    aggregated_rows: int = 0
+    matched_rows: int = 0
+    added_rows: int = 0
+    filled_values: int = 0
+
+def timestamps_int64(timestamps: pd.Series) -> Tuple[np.ndarray, str]:
+    """
+    Vista int64 dei timestamp (UTC per le serie con timezone).
+    
+    Args:
+        timestamps: Serie datetime
+        
+    Returns:
+        (array int64, unità numpy dei valori)
+    """
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+    values = timestamps.to_numpy()
+    return values.view(np.int64), np.datetime_data(values.dtype)[0]
+
+def interval_int64(minutes: int, unit: str) -> int:
+    """
+    Durata di un timeframe nell'unità dei timestamp.
+    
+    Args:
+        minutes: Minuti del timeframe
+        unit: Unità numpy ('ns', 'us', 'ms', 's')
+        
+    Returns:
+        Intervallo come intero
+    """
+    return int(np.timedelta64(minutes, 'm').astype(f'timedelta64[{unit}]').astype(np.int64))
+
+def merge_sorted(
+    left: np.ndarray,
+    right: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Unione di due array ordinati e senza duplicati.
+    
+    L'ordinamento stabile (timsort) di due sequenze già ordinate
+    si riduce a un'unica fusione lineare.
+    
+    Args:
+        left: Timestamp ordinati
+        right: Timestamp ordinati
+        
+    Returns:
+        (unione ordinata, posizioni di left e di right nell'unione)
+    """
+    both = np.concatenate([left, right])
+    order = np.argsort(both, kind='stable')
+    ordered = both[order]
+    
+    first = np.empty(len(ordered), dtype=bool)
+    first[:1] = True
+    np.not_equal(ordered[1:], ordered[:-1], out=first[1:])
+    
+    slots = np.empty(len(both), dtype=np.int64)
+    slots[order] = np.cumsum(first) - 1
+    return ordered[first], slots[:len(left)], slots[len(left):]
+
+def sorted_unique(timestamps: np.ndarray) -> Tuple[Optional[np.ndarray], int]:
+    """
+    Righe da mantenere per ordinare e deduplicare una serie.
+    
+    Se la serie è già strettamente crescente basta un confronto
+    lineare e non serve alcun riordino. Dei duplicati è mantenuta
+    la prima occorrenza.
+    
+    Args:
+        timestamps: Timestamp int64
+        
+    Returns:
+        (indici delle righe da mantenere o None se già in ordine,
+        duplicati rimossi)
+    """
+    if len(timestamps) < 2 or (timestamps[1:] > timestamps[:-1]).all():
+        return None, 0
+        
+    order = np.argsort(timestamps, kind='stable')
+    ordered = timestamps[order]
+    keep = np.empty(len(order), dtype=bool)
+    keep[:1] = True
+    np.not_equal(ordered[1:], ordered[:-1], out=keep[1:])
+    return order[keep], int(len(order) - keep.sum())
+
+def reconcile_ohlcv(
+    base: pd.DataFrame,
+    aggregated: pd.DataFrame
+) -> Tuple[pd.DataFrame, ReconcileStats]:
+    """
+    Unisce una serie con la sua ricostruzione aggregata.
+    
+    I valori originali hanno la precedenza; quelli mancanti (NaN o
+    righe assenti) sono presi dalla serie aggregata. Entrambe le serie
+    devono essere ordinate per timestamp e senza duplicati, con
+    timestamp datetime. Ogni colonna del risultato è allocata una
+    sola volta e riempita in place.
+    
+    Args:
+        base: DataFrame originale (timestamp, OHLCV ed eventuali extra)
+        aggregated: DataFrame aggregato (timestamp e OHLCV)
+        
+    Returns:
+        (DataFrame riconciliato, statistiche)
+    """
+    base_ts, unit = timestamps_int64(base['timestamp'])
+    agg_ts, _ = timestamps_int64(
+        aggregated['timestamp'].astype(base['timestamp'].dtype)
+    )
+    union, base_slot, agg_slot = merge_sorted(base_ts, agg_ts)
+    n = len(union)
+    
+    stats = ReconcileStats(
+        base_rows=len(base_ts),
+        aggregated_rows=len(agg_ts),
+        matched_rows=len(base_ts) + len(agg_ts) - n,
+        added_rows=n - len(base_ts)
+    )
+    
+    columns: Dict[str, Any] = {}
+    for column in base.columns:
+        if column == 'timestamp':
+            continue
+        values = base[column].to_numpy()
+        if column in OHLCV_COLUMNS and column in aggregated.columns:
+            out = np.full(n, np.nan)
+            out[base_slot] = values
+            
+            # Riempie solo le celle mancanti delle righe aggregate
+            filled = out[agg_slot]
+            missing = np.isnan(filled)
+            count = int(missing.sum())
+            if count:
+                np.copyto(
+                    filled,
+                    aggregated[column].to_numpy(dtype=np.float64),
+                    where=missing
+                )
+                out[agg_slot] = filled
+                stats.filled_values += count
+        elif stats.added_rows == 0:
+            out = values
+        else:
+            if values.dtype.kind == 'f':
+                out = np.full(n, np.nan, dtype=values.dtype)
+            else:
+                out = np.full(n, None, dtype=object)
+            out[base_slot] = values
+        columns[column] = out
+        
+    timestamps = pd.DatetimeIndex(union.view(f'datetime64[{unit}]'))
+    tz = base['timestamp'].dt.tz
+    if tz is not None:
+        timestamps = timestamps.tz_localize('UTC').tz_convert(tz)
+    columns['timestamp'] = timestamps
+    
+    return pd.DataFrame(columns, columns=list(base.columns)), stats
+
+def gap_stats(timestamps: np.ndarray, expected: int) -> GapStats:
+    """
+    Statistiche dei gap di una serie ordinata e senza duplicati.
+    
+    Args:
+        timestamps: Timestamp int64 ordinati
+        expected: Intervallo atteso nella stessa unità
+        
+    Returns:
+        Statistiche dei gap
+    """
+    stats = GapStats(rows=len(timestamps))
+    if len(timestamps) < 2:
+        return stats
+        
+    steps = np.diff(timestamps)
+    holes = steps[steps != expected]
+    stats.gaps = len(holes)
+    if stats.gaps:
+        missing = holes // expected - 1
+        stats.missing_candles = int(missing[missing > 0].sum())
+        stats.max_gap = int(max(missing.max(), 0))
+    return stats
+
+def missing_ranges(
+    timestamps: np.ndarray,
+    step: int,
+    start: int,
+    end: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Intervalli di candele mancanti in [start, end].
+    
+    Lavora solo sulle righe esistenti: ogni differenza consecutiva
+    di almeno due intervalli è un buco. Gli estremi sono allineati
+    alla griglia delle righe presenti. Complessità O(n).
+    
+    Args:
+        timestamps: Timestamp int64 ordinati e senza duplicati, in [start, end]
+        step: Intervallo del timeframe nella stessa unità
+        start: Inizio del periodo
+        end: Fine del periodo
+        
+    Returns:
+        (inizi, fini) degli intervalli mancanti, estremi inclusi
+    """
+    if len(timestamps) == 0:
+        if end < start:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return (
+            np.array([start], dtype=np.int64),
+            np.array([start + (end - start) // step * step], dtype=np.int64)
+        )
+        
+    # Differenze non multiple dell'intervallo (righe disallineate)
+    # contano come buco solo se lasciano spazio ad almeno una candela
+    holes = np.flatnonzero(np.diff(timestamps) >= 2 * step)
+    starts = timestamps[holes] + step
+    ends = timestamps[holes + 1] - step
+    
+    first = timestamps[0]
+    if first - step >= start:
+        starts = np.concatenate([[first - (first - start) // step * step], starts])
+        ends = np.concatenate([[first - step], ends])
+        
+    last = timestamps[-1]
+    if last + step <= end:
+        starts = np.concatenate([starts, [last + step]])
+        ends = np.concatenate([ends, [last + (end - last) // step * step]])
+        
+    return starts, ends
@@ -0,0 +1,489 @@
+"""
+Streaming Resampler
+-----------------
+Aggregazione OHLCV dal timeframe base (es. 1m) ai timeframe
+superiori. Le candele base sono lette una sola volta: ogni livello
+è aggregato a cascata dal livello inferiore più vicino e le barre
+ancora aperte restano in stato fino alla loro chiusura.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+
+import numpy as np
+import pandas as pd
+
+# Millisecondi per unità di timeframe (come BaseConnector.parse_timeframe)
+TIMEFRAME_UNITS = {
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000
+}
+
+# Le settimane degli exchange iniziano il lunedì (1970-01-05)
+WEEK_ORIGIN = 4 * TIMEFRAME_UNITS['d']
+
+# Timeframe derivati per default
+DEFAULT_TIMEFRAMES = ['5m', '15m', '30m', '1h', '4h', '1d']
+
+# Orario dei timestamp salvati in market_data (convert_to_local_time):
+# ora locale di Roma più un'ora, senza timezone
+STORAGE_TIMEZONE = 'Europe/Rome'
+STORAGE_OFFSET = pd.Timedelta(hours=1)
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """
+    Converte un timeframe in millisecondi.
+    
+    Args:
+        timeframe: Timeframe (es. 1m, 4h, 1d)
+        
+    Returns:
+        Millisecondi
+        
+    Raises:
+        ValueError: Se il timeframe non è valido
+    """
+    unit = timeframe[-1:]
+    if unit not in TIMEFRAME_UNITS or not timeframe[:-1].isdigit():
+        raise ValueError(f"Timeframe non valido: {timeframe}")
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS[unit]
+
+def stored_to_utc_ms(timestamps: Iterable[Any]) -> np.ndarray:
+    """
+    Converte i timestamp salvati da convert_to_local_time in ms UTC.
+    
+    Args:
+        timestamps: Datetime senza timezone letti da market_data
+        
+    Returns:
+        Timestamp UTC in millisecondi (int64)
+    """
+    local = pd.DatetimeIndex(list(timestamps)) - STORAGE_OFFSET
+    utc = local.tz_localize(
+        STORAGE_TIMEZONE,
+        ambiguous=False,
+        nonexistent='shift_forward'
+    ).tz_convert('UTC').tz_localize(None)
+    return utc.as_unit('ms').asi8.copy()
+
+def utc_ms_to_stored(timestamp: int) -> datetime:
+    """
+    Converte un timestamp UTC in ms nell'orario di market_data.
+    
+    Stessa conversione di convert_to_local_time, inversa di
+    stored_to_utc_ms (per i filtri sulle colonne timestamp).
+    
+    Args:
+        timestamp: Timestamp UTC in millisecondi
+        
+    Returns:
+        Datetime senza timezone come salvato in market_data
+    """
+    local = pd.Timestamp(timestamp, unit='ms', tz='UTC').tz_convert(STORAGE_TIMEZONE)
+    return (local.tz_localize(None) + STORAGE_OFFSET).to_pydatetime()
+
+def bucket_origin(timeframe: str) -> int:
+    """Origine (ms) della griglia delle barre di un timeframe."""
+    return WEEK_ORIGIN if timeframe.endswith('w') else 0
+
+def align_timestamp(timestamp: int, timeframe: str) -> int:
+    """
+    Allinea un timestamp all'inizio della sua barra.
+    
+    Args:
+        timestamp: Timestamp in millisecondi
+        timeframe: Timeframe
+        
+    Returns:
+        Inizio della barra in millisecondi
+    """
+    period = timeframe_to_ms(timeframe)
+    origin = bucket_origin(timeframe)
+    return timestamp - (timestamp - origin) % period
+
+def derivable_timeframes(base: str, timeframes: Iterable[str]) -> List[str]:
+    """
+    Timeframe calcolabili aggregando il timeframe base.
+    
+    Args:
+        base: Timeframe base
+        timeframes: Timeframe candidati
+        
+    Returns:
+        Timeframe multipli del base (escluso il base stesso)
+    """
+    base_ms = timeframe_to_ms(base)
+    return [
+        tf for tf in timeframes
+        if tf != base
+        and timeframe_to_ms(tf) % base_ms == 0
+        and (bucket_origin(tf) - bucket_origin(base)) % base_ms == 0
+    ]
+
+def aggregate_ohlcv(
+    candles: np.ndarray,
+    period: int,
+    origin: int = 0,
+    weights: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aggrega candele ordinate in barre di ampiezza 'period'.
+    
+    Args:
+        candles: Matrice (n × 6): timestamp ms, open, high, low, close, volume
+        period: Ampiezza barra in millisecondi
+        origin: Origine della griglia in millisecondi
+        weights: Candele base rappresentate da ogni riga (default 1)
+        
+    Returns:
+        (barre k × 6, candele base per barra)
+    """
+    n = len(candles)
+    if n == 0:
+        return np.empty((0, 6)), np.empty(0, dtype=np.int64)
+        
+    bucket = (candles[:, 0].astype(np.int64) - origin) // period
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    
+    bars = np.empty((len(starts), 6))
+    bars[:, 0] = bucket[starts] * period + origin
+    bars[:, 1] = candles[starts, 1]
+    bars[:, 2] = np.maximum.reduceat(candles[:, 2], starts)
+    bars[:, 3] = np.minimum.reduceat(candles[:, 3], starts)
+    bars[:, 4] = candles[ends, 4]
+    bars[:, 5] = np.add.reduceat(candles[:, 5], starts)
+    
+    if weights is None:
+        counts = ends - starts + 1
+    else:
+        counts = np.add.reduceat(weights, starts)
+    return bars, counts
+
+def bars_to_candles(bars: np.ndarray) -> List[List[float]]:
+    """
+    Converte barre in liste [timestamp, open, high, low, close, volume].
+    
+    Args:
+        bars: Matrice (k × 6)
+        
+    Returns:
+        Candele nel formato ccxt (timestamp intero in ms)
+    """
+    return [[int(row[0])] + row[1:] for row in bars.tolist()]
+
+class ResampleStats:
+    """Statistiche resampling."""
+    
+    def __init__(self):
+        self.base_candles = 0
+        self.skipped_candles = 0
+        self.emitted_bars = 0
+        self.incomplete_bars = 0
+
+class StreamingResampler:
+    """Aggregatore incrementale dal timeframe base ai superiori."""
+    
+    def __init__(
+        self,
+        base: str = '1m',
+        timeframes: Optional[List[str]] = None,
+        skip_partial_start: bool = False
+    ):
+        """
+        Inizializza il resampler.
+        
+        Args:
+            base: Timeframe delle candele in ingresso
+            timeframes: Timeframe da produrre (multipli del base)
+            skip_partial_start: Scarta le prime barre se la prima candela
+                non è all'inizio della barra (es. avvio live a metà barra)
+                
+        Raises:
+            ValueError: Se un timeframe non è derivabile dal base
+        """
+        self.logger = logging.getLogger(__name__)
+        self.base = base
+        self.base_ms = timeframe_to_ms(base)
+        
+        requested = timeframes if timeframes is not None else DEFAULT_TIMEFRAMES
+        invalid = set(requested) - set(derivable_timeframes(base, requested))
+        if invalid:
+            raise ValueError(
+                f"Timeframe non derivabili da {base}: {sorted(invalid)}"
+            )
+        self.timeframes = sorted(set(requested), key=timeframe_to_ms)
+        
+        # Ogni livello aggrega il livello inferiore più vicino che lo divide
+        self._sources: Dict[str, str] = {}
+        for i, tf in enumerate(self.timeframes):
+            period = timeframe_to_ms(tf)
+            self._sources[tf] = next(
+                (
+                    lower for lower in reversed(self.timeframes[:i])
+                    if period % timeframe_to_ms(lower) == 0
+                    and bucket_origin(lower) == bucket_origin(tf)
+                ),
+                base
+            )
+            
+        self._periods = {tf: timeframe_to_ms(tf) for tf in self.timeframes}
+        self._origins = {tf: bucket_origin(tf) for tf in self.timeframes}
+        self._open: Dict[str, Optional[List[float]]] = {tf: None for tf in self.timeframes}
+        self._counts: Dict[str, int] = {tf: 0 for tf in self.timeframes}
+        self.last_timestamp: Optional[int] = None
+        self.skip_partial_start = skip_partial_start
+        self._partial_start: Dict[str, int] = {}
+        self.stats = ResampleStats()
+        
+    def push(self, candles: Any) -> Dict[str, np.ndarray]:
+        """
+        Aggiunge candele base e restituisce le barre chiuse.
+        
+        Le candele già viste (timestamp non successivo all'ultimo) sono
+        ignorate. Una barra è chiusa quando arriva la sua ultima candela
+        base o una candela di una barra successiva; le barre chiuse per
+        superamento con candele mancanti sono contate come incomplete.
+        
+        Args:
+            candles: Candele [timestamp ms, open, high, low, close, volume]
+            
+        Returns:
+            Barre chiuse (k × 6) per timeframe
+        """
+        data = np.asarray(candles, dtype=np.float64).reshape(-1, 6)
+        closed = {tf: np.empty((0, 6)) for tf in self.timeframes}
+        
+        data = self._prepare(data)
+        if len(data) == 0:
+            return closed
+            
+        last = int(data[-1, 0])
+        if self.last_timestamp is None:
+            self._mark_partial_start(int(data[0, 0]))
+        self.last_timestamp = last
+        self.stats.base_candles += len(data)
+        
+        levels: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            self.base: (data, np.ones(len(data), dtype=np.int64))
+        }
+        for tf in self.timeframes:
+            source, weights = levels[self._sources[tf]]
+            bars, counts = aggregate_ohlcv(
+                source,
+                self._periods[tf],
+                self._origins[tf],
+                weights
+            )
+            # I livelli superiori aggregano le barre di questo batch,
+            # prima della fusione con lo stato aperto
+            levels[tf] = (bars, counts)
+            closed[tf] = self._merge_open(tf, bars.copy(), counts.copy(), last)
+            if tf in self._partial_start and len(closed[tf]):
+                closed[tf] = closed[tf][closed[tf][:, 0] != self._partial_start.pop(tf)]
+                
+        return closed
+        
+    def update(self, candle: List[float]) -> Dict[str, List[List[float]]]:
+        """
+        Aggiunge una candela base (uso live).
+        
+        Percorso scalare senza NumPy: ogni barra aperta è aggiornata
+        direttamente, con lo stesso stato usato da push().
+        
+        Args:
+            candle: Candela [timestamp ms, open, high, low, close, volume]
+            
+        Returns:
+            Barre chiuse per timeframe (solo timeframe con barre)
+        """
+        timestamp = int(candle[0])
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            self.stats.skipped_candles += 1
+            return {}
+        if self.last_timestamp is None:
+            self._mark_partial_start(timestamp)
+        self.last_timestamp = timestamp
+        self.stats.base_candles += 1
+        
+        _, open_, high, low, close, volume = candle[:6]
+        result: Dict[str, List[List[float]]] = {}
+        for tf in self.timeframes:
+            period = self._periods[tf]
+            bucket = timestamp - (timestamp - self._origins[tf]) % period
+            current = self._open[tf]
+            
+            if current is not None and current[0] != bucket:
+                result[tf] = [self._close_bar(tf, current)]
+                current = None
+                
+            if current is None:
+                current = [bucket, open_, high, low, close, volume]
+                self._counts[tf] = 1
+            else:
+                current[2] = max(current[2], high)
+                current[3] = min(current[3], low)
+                current[4] = close
+                current[5] += volume
+                self._counts[tf] += 1
+                
+            if timestamp + self.base_ms >= bucket + period:
+                result.setdefault(tf, []).append(self._close_bar(tf, current))
+                self._open[tf] = None
+            else:
+                self._open[tf] = current
+                
+        for tf in list(self._partial_start):
+            if tf in result:
+                start = self._partial_start.pop(tf)
+                result[tf] = [bar for bar in result[tf] if bar[0] != start]
+                if not result[tf]:
+                    del result[tf]
+                    
+        return result
+        
+    def _mark_partial_start(self, timestamp: int) -> None:
+        """Registra le barre iniziate prima della prima candela ricevuta."""
+        if not self.skip_partial_start:
+            return
+        for tf in self.timeframes:
+            start = timestamp - (timestamp - self._origins[tf]) % self._periods[tf]
+            if start != timestamp:
+                self._partial_start[tf] = start
+                
+    def _close_bar(self, tf: str, bar: List[float]) -> List[float]:
+        """Registra la chiusura di una barra aperta."""
+        self.stats.emitted_bars += 1
+        if self._counts[tf] < self._periods[tf] // self.base_ms:
+            self.stats.incomplete_bars += 1
+        self._counts[tf] = 0
+        return [int(bar[0])] + list(bar[1:])
+        
+    def open_bars(self) -> Dict[str, List[float]]:
+        """
+        Barre ancora aperte.
+        
+        Returns:
+            Barra parziale per timeframe
+        """
+        return {
+            tf: [int(bar[0])] + list(bar[1:])
+            for tf, bar in self._open.items()
+            if bar is not None
+        }
+        
+    def flush(self) -> Dict[str, np.ndarray]:
+        """
+        Chiude le barre aperte e le restituisce (parziali).
+        
+        Returns:
+            Barre parziali (0 o 1 riga) per timeframe
+        """
+        result = {}
+        for tf in self.timeframes:
+            bar = self._open[tf]
+            result[tf] = np.array([bar]) if bar is not None else np.empty((0, 6))
+            self._open[tf] = None
+            self._counts[tf] = 0
+        return result
+        
+    def _prepare(self, data: np.ndarray) -> np.ndarray:
+        """Ordina, rimuove duplicati e candele già viste."""
+        if len(data) > 1 and np.any(np.diff(data[:, 0]) <= 0):
+            # Ordinamento stabile: tra duplicati vale l'ultima candela
+            order = np.argsort(data[:, 0], kind='stable')
+            data = data[order]
+            keep = np.r_[data[1:, 0] != data[:-1, 0], True]
+            data = data[keep]
+            
+        if self.last_timestamp is not None:
+            fresh = data[:, 0] > self.last_timestamp
+            skipped = len(data) - int(fresh.sum())
+            if skipped:
+                self.stats.skipped_candles += skipped
+                self.logger.debug(f"Ignorate {skipped} candele già aggregate")
+                data = data[fresh]
+        return data
+        
+    def _merge_open(
+        self,
+        tf: str,
+        bars: np.ndarray,
+        counts: np.ndarray,
+        last: int
+    ) -> np.ndarray:
+        """Fonde le barre del batch con la barra aperta e separa le chiuse."""
+        current = self._open[tf]
+        if current is not None:
+            if bars[0, 0] == current[0]:
+                bars[0, 1] = current[1]
+                bars[0, 2] = max(bars[0, 2], current[2])
+                bars[0, 3] = min(bars[0, 3], current[3])
+                bars[0, 5] += current[5]
+                counts[0] += self._counts[tf]
+            else:
+                bars = np.vstack([current, bars])
+                counts = np.r_[self._counts[tf], counts]
+                
+        period = self._periods[tf]
+        if last + self.base_ms >= bars[-1, 0] + period:
+            self._open[tf] = None
+            self._counts[tf] = 0
+            done = bars
+        else:
+            self._open[tf] = bars[-1].tolist()
+            self._counts[tf] = int(counts[-1])
+            done = bars[:-1]
+            counts = counts[:-1]
+            
+        self.stats.emitted_bars += len(done)
+        self.stats.incomplete_bars += int(np.sum(counts < period // self.base_ms))
+        return done
+
+def resample_ohlcv(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """
+    Aggrega un DataFrame OHLCV ordinato con colonna 'timestamp'.
+    
+    Sono prodotte solo le barre con almeno una candela; il tipo
+    (e timezone) della colonna timestamp è preservato.
+    
+    Args:
+        df: DataFrame con colonne timestamp, open, high, low, close, volume
+        timeframe: Timeframe target
+        
+    Returns:
+        DataFrame aggregato
+    """
+    timestamps = pd.to_datetime(df['timestamp'])
+    if not timestamps.is_monotonic_increasing:
+        order = np.argsort(timestamps.to_numpy(), kind='stable')
+        df = df.iloc[order]
+        timestamps = timestamps.iloc[order]
+        
+    tz = timestamps.dt.tz
+    naive = timestamps.dt.tz_convert('UTC').dt.tz_localize(None) if tz is not None else timestamps
+    ms = naive.to_numpy().astype('datetime64[ms]').astype(np.int64)
+    
+    candles = np.column_stack([
+        ms.astype(np.float64),
+        df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=np.float64)
+    ])
+    bars, _ = aggregate_ohlcv(
+        candles,
+        timeframe_to_ms(timeframe),
+        bucket_origin(timeframe)
+    )
+    
+    index = pd.to_datetime(bars[:, 0].astype(np.int64), unit='ms')
+    if tz is not None:
+        index = index.tz_localize('UTC').tz_convert(tz)
+        
+    result = pd.DataFrame(
+        bars[:, 1:],
+        columns=['open', 'high', 'low', 'close', 'volume']
+    )
+    result.insert(0, 'timestamp', pd.Series(index).astype(timestamps.dtype))
+    return result
@@ -0,0 +1,259 @@
+"""
+Rolling Metrics
+-------------
+Metriche mobili su finestre scorrevoli (es. 30d, 90d, 365d): Sharpe,
+Sortino, volatilità, drawdown, VaR/CVaR e regime di mercato. Ogni
+serie è calcolata in tempo lineare, i quantili in O(n log w):
+somme cumulative per i momenti, deque monotone e blocchi di finestra
+per picchi e drawdown, alberi di Fenwick per quantili e code.
+Le definizioni seguono PerformanceMetrics, RiskMetrics e
+MarketRegime applicate alla singola finestra.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Tuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import kernels
+from .resampler import timeframe_to_ms
+
+# Codici del regime di mercato
+REGIMES = ('range', 'trend', 'volatile')
+
+def window_sum(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Somma mobile con somme cumulative.
+    
+    Args:
+        x: Serie senza NaN
+        window: Lunghezza finestra
+        
+    Returns:
+        Somme (NaN prima della finestra completa)
+    """
+    cumulative = np.concatenate(([0.0], np.cumsum(x)))
+    out = np.full(len(x), np.nan)
+    if window <= len(x):
+        out[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return out
+
+def rolling_moments(x: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Media e deviazione standard (ddof=0) mobili.
+    
+    La serie è centrata sulla sua media prima delle somme cumulative
+    per limitare la cancellazione numerica.
+    
+    Args:
+        x: Serie senza NaN
+        window: Lunghezza finestra
+        
+    Returns:
+        (medie, deviazioni standard)
+    """
+    shift = x.mean() if len(x) else 0.0
+    centered = x - shift
+    mean = window_sum(centered, window) / window
+    variance = window_sum(centered * centered, window) / window - mean * mean
+    return mean + shift, np.sqrt(np.maximum(variance, 0.0))
+
+def rolling_drawdown(prices: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Drawdown e massimo drawdown mobili.
+    
+    Il drawdown al tempo t è p[t] / max(p[t-window+1..t]) - 1, la
+    distanza dal picco della finestra. Il massimo drawdown è quello
+    della sola finestra t-window+1..t (picco e minimo entrambi interni),
+    come PerformanceMetrics sui rendimenti della finestra. Entrambe le
+    serie sono O(n).
+    
+    Args:
+        prices: Prezzi senza NaN
+        window: Lunghezza finestra
+        
+    Returns:
+        (drawdown, massimo drawdown), valori <= 0
+    """
+    drawdown = prices / kernels.rolling_extreme(prices, window, True) - 1
+    return drawdown, kernels.rolling_max_drawdown(prices, window)
+
+def rolling_trend(prices: np.ndarray, window: int) -> np.ndarray:
+    """
+    Forza del trend: |correlazione| tra prezzo e tempo nella finestra.
+    
+    Equivale a abs(r_value) di scipy.stats.linregress usato da
+    MarketRegime, calcolato con somme cumulative.
+    
+    Args:
+        prices: Prezzi senza NaN
+        window: Lunghezza finestra
+        
+    Returns:
+        Serie della forza del trend (0-1)
+    """
+    n = len(prices)
+    index = np.arange(n, dtype=np.float64) - n / 2
+    centered = prices - prices.mean()
+    
+    mean_x = window_sum(index, window) / window
+    mean_p = window_sum(centered, window) / window
+    cov = window_sum(index * centered, window) / window - mean_x * mean_p
+    var_p = window_sum(centered * centered, window) / window - mean_p * mean_p
+    var_x = (window * window - 1) / 12.0
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = cov / np.sqrt(var_x * np.maximum(var_p, 0.0))
+    return np.clip(np.abs(corr), 0.0, 1.0)
+
+@dataclass
+class RollingConfig:
+    """Configurazione delle metriche mobili."""
+    windows: Tuple[str, ...] = ('30d', '90d', '365d')
+    # Periodi per anno, come in PerformanceMetrics
+    annualization: int = 252
+    risk_free_rate: float = 0.0
+    confidence_levels: Tuple[float, ...] = (0.95, 0.99)
+    # Soglia |r| oltre la quale il regime è 'trend'
+    trend_threshold: float = 0.7
+
+class RollingMetricsEngine:
+    """Serie complete di metriche su finestre scorrevoli."""
+    
+    def __init__(self, config: Optional[RollingConfig] = None):
+        """
+        Inizializza il motore.
+        
+        Args:
+            config: Configurazione (default: RollingConfig())
+        """
+        self.logger = logging.getLogger(__name__)
+        self.config = config or RollingConfig()
+        
+    def window_size(self, window: str, timeframe: str) -> int:
+        """
+        Numero di rendimenti in una finestra.
+        
+        Args:
+            window: Durata finestra (es. 30d)
+            timeframe: Timeframe dati
+            
+        Returns:
+            Candele per finestra (almeno 2)
+        """
+        return max(timeframe_to_ms(window) // timeframe_to_ms(timeframe), 2)
+        
+    def compute(
+        self,
+        df: pd.DataFrame,
+        timeframe: str
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Calcola le metriche mobili per ogni finestra configurata.
+        
+        Args:
+            df: DataFrame con colonne timestamp e close, ordinato
+            timeframe: Timeframe dati
+            
+        Returns:
+            DataFrame delle metriche per finestra, indicizzati per
+            timestamp (NaN finché la finestra non è completa)
+        """
+        prices = df['close'].to_numpy(dtype=np.float64)
+        index = pd.Index(df['timestamp']) if 'timestamp' in df else df.index
+        
+        results = {}
+        for window in self.config.windows:
+            size = self.window_size(window, timeframe)
+            results[window] = pd.DataFrame(
+                self.compute_window(prices, size),
+                index=index
+            )
+        return results
+        
+    def compute_window(self, prices: np.ndarray, window: int) -> Dict[str, np.ndarray]:
+        """
+        Calcola le metriche mobili su una finestra di window rendimenti.
+        
+        Il valore in t usa i rendimenti che terminano in t, cioè i prezzi
+        t-window..t. Sortino usa la deviazione standard dei soli rendimenti
+        negativi, VaR e CVaR sono valori assoluti come in RiskMetrics.
+        
+        Args:
+            prices: Prezzi di chiusura senza NaN
+            window: Rendimenti per finestra
+            
+        Returns:
+            Serie allineate ai prezzi per metrica
+        """
+        n = len(prices)
+        config = self.config
+        scale = np.sqrt(config.annualization)
+        out: Dict[str, np.ndarray] = {}
+        if n < 2:
+            return out
+            
+        returns = np.diff(prices) / prices[:-1]
+        
+        def aligned(values: np.ndarray) -> np.ndarray:
+            return np.concatenate(([np.nan], values))
+            
+        # Momenti dei rendimenti
+        mean, std = rolling_moments(returns, window)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sharpe = (mean - config.risk_free_rate / config.annualization) / std * scale
+            
+            negative = np.minimum(returns, 0.0)
+            count = window_sum((returns < 0).astype(np.float64), window)
+            neg_mean = window_sum(negative, window) / count
+            neg_var = window_sum(negative * negative, window) / count - neg_mean * neg_mean
+            sortino = mean / np.sqrt(np.maximum(neg_var, 0.0)) * scale
+            
+        out['mean_return'] = aligned(mean)
+        out['volatility'] = aligned(std * scale)
+        out['sharpe_ratio'] = aligned(sharpe)
+        out['sortino_ratio'] = aligned(sortino)
+        
+        # Drawdown sui prezzi cumulati dai rendimenti della finestra
+        drawdown, max_drawdown = rolling_drawdown(prices[1:], window)
+        out['drawdown'] = aligned(drawdown)
+        out['max_drawdown'] = aligned(max_drawdown)
+        
+        # VaR/CVaR e 75° percentile per il regime in una sola passata
+        probs = np.array([1 - c for c in config.confidence_levels] + [0.75])
+        if window <= len(returns):
+            quantiles, tails = kernels.rolling_quantiles(returns, window, probs)
+        else:
+            quantiles = tails = np.full((len(probs), len(returns)), np.nan)
+        for k, level in enumerate(config.confidence_levels):
+            label = int(round(level * 100))
+            out[f'var_{label}'] = aligned(np.abs(quantiles[k]))
+            out[f'cvar_{label}'] = aligned(np.abs(tails[k]))
+            
+        # Regime come in MarketRegime.classify_regime
+        trend = rolling_trend(prices, window + 1)
+        upper = aligned(quantiles[-1])
+        regime = np.where(
+            trend > config.trend_threshold, 1,
+            np.where(aligned(std) > upper, 2, 0)
+        )
+        regime = np.where(np.isnan(trend) | np.isnan(upper), -1, regime)
+        out['trend_strength'] = trend
+        out['regime'] = regime.astype(np.int8)
+        return out
+        
+    @staticmethod
+    def regime_names(codes: np.ndarray) -> np.ndarray:
+        """
+        Converte i codici del regime nei nomi di MarketRegime.
+        
+        Args:
+            codes: Codici (-1 = finestra incompleta)
+            
+        Returns:
+            Nomi del regime (None per finestra incompleta)
+        """
+        names = np.array(REGIMES + (None,), dtype=object)
+        return names[np.where(codes < 0, len(REGIMES), codes)]
@@ -11,6 +11,20 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass
 import numpy as np
 import pandas as pd
+from sqlalchemy import select, func, cast, and_, Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import MarketData
+from .resampler import StreamingResampler, resample_ohlcv
+from .reconcile import (
+    GapStats,
+    timestamps_int64,
+    interval_int64,
+    sorted_unique,
+    reconcile_ohlcv,
+    gap_stats,
+    missing_ranges
+)
 
 @dataclass
 class TimeframeConfig:
@@ -27,6 +41,9 @@ class SyncStats:
         self.total_candles = 0
         self.synced_candles = 0
         self.missing_candles = 0
+        self.filled_values = 0
+        self.duplicates = 0
+        self.gaps: Dict[str, GapStats] = {}
         self.start_time = datetime.utcnow()
         self.end_time: Optional[datetime] = None
         
@@ -126,10 +143,11 @@ class DataSynchronizer:
             result[tf] = df
             
             # Aggiorna statistiche
+            complete = int(df.notna().all(axis=1).sum())
             self.stats.update(
                 len(df),
-                len(df.dropna()),
-                len(df) - len(df.dropna())
+                complete,
+                len(df) - complete
             )
             
         return result
@@ -149,33 +167,56 @@ class DataSynchronizer:
         Returns:
             DataFrame aggregato
         """
-        # Imposta indice temporale
-        df = df.set_index('timestamp')
-        
-        # Calcola intervallo resample
-        minutes = config.minutes
-        if minutes < 60:
-            freq = f"{minutes}T"
-        elif minutes < 1440:
-            freq = f"{minutes//60}H"
-        else:
-            freq = f"{minutes//1440}D"
-            
-        # Aggrega OHLCV
-        agg_dict = {
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last',
-            'volume': 'sum'
-        }
+        return resample_ohlcv(df, config.name)
         
-        df_agg = df.resample(freq).agg(agg_dict)
+    def derive_timeframes(
+        self,
+        base_df: pd.DataFrame,
+        timeframes: List[str],
+        include_open: bool = False
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Deriva più timeframe dal timeframe base in un'unica passata.
         
-        # Ripristina indice come colonna
-        df_agg = df_agg.reset_index()
+        Args:
+            base_df: DataFrame 1m con colonne timestamp e OHLCV
+            timeframes: Timeframe da derivare
+            include_open: Include l'ultima barra se ancora aperta
+            
+        Returns:
+            DataFrame per timeframe
+        """
+        resampler = StreamingResampler('1m', timeframes)
+        closed = resampler.push(self._to_candles(base_df))
+        if include_open:
+            for tf, bar in resampler.flush().items():
+                closed[tf] = np.vstack([closed[tf], bar])
+                
+        tz = pd.to_datetime(base_df['timestamp']).dt.tz
+        result = {}
+        for tf, bars in closed.items():
+            timestamps = pd.to_datetime(bars[:, 0].astype(np.int64), unit='ms')
+            if tz is not None:
+                timestamps = timestamps.tz_localize('UTC').tz_convert(tz)
+            df = pd.DataFrame(
+                bars[:, 1:],
+                columns=['open', 'high', 'low', 'close', 'volume']
+            )
+            df.insert(0, 'timestamp', timestamps)
+            result[tf] = df
+            
+        return result
         
-        return df_agg
+    def _to_candles(self, df: pd.DataFrame) -> np.ndarray:
+        """Converte un DataFrame OHLCV in matrice [timestamp ms, OHLCV]."""
+        timestamps = pd.to_datetime(df['timestamp'])
+        if timestamps.dt.tz is not None:
+            timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+        ms = timestamps.to_numpy().astype('datetime64[ms]').astype(np.int64)
+        return np.column_stack([
+            ms.astype(np.float64),
+            df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=np.float64)
+        ])
         
     def _sync_dataframes(
         self,
@@ -185,27 +226,39 @@ class DataSynchronizer:
         """
         Sincronizza due DataFrame.
         
+        Merge lineare sui timestamp ordinati: i valori di df1 hanno
+        la precedenza, quelli mancanti sono presi da df2.
+        
         Args:
-            df1: Primo DataFrame
-            df2: Secondo DataFrame
+            df1: DataFrame originale
+            df2: DataFrame aggregato
             
         Returns:
             DataFrame sincronizzato
         """
-        # Merge su timestamp
-        df = pd.merge(
-            df1,
-            df2,
-            on='timestamp',
-            how='outer',
-            suffixes=('', '_agg')
-        )
+        df1 = self._sorted_frame(df1)
+        df2 = self._sorted_frame(df2)
+        df, stats = reconcile_ohlcv(df1, df2)
+        self.stats.filled_values += stats.filled_values
+        return df
+        
+    def _sorted_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Ordina e deduplica per timestamp solo se necessario.
         
-        # Usa valori aggregati dove mancano originali
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            df[col] = df[col].fillna(df[f"{col}_agg"])
-            df = df.drop(f"{col}_agg", axis=1)
+        Args:
+            df: DataFrame con colonna timestamp
+            
+        Returns:
+            DataFrame ordinato senza duplicati
+        """
+        if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            df = df.assign(timestamp=pd.to_datetime(df['timestamp']))
             
+        keep, duplicates = sorted_unique(timestamps_int64(df['timestamp'])[0])
+        if keep is not None:
+            df = df.iloc[keep].reset_index(drop=True)
+            self.stats.duplicates += duplicates
         return df
         
     def _validate_timeframe(
@@ -216,6 +269,9 @@ class DataSynchronizer:
         """
         Valida DataFrame per timeframe.
         
+        I gap sono calcolati con np.diff sui timestamp int64 e
+        registrati in stats.gaps senza colonne temporanee.
+        
         Args:
             df: DataFrame da validare
             config: Configurazione timeframe
@@ -223,31 +279,18 @@ class DataSynchronizer:
         Returns:
             DataFrame validato
         """
-        # Verifica timestamp
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        # Ordina per timestamp
-        df = df.sort_values('timestamp')
-        
-        # Rimuovi duplicati
-        df = df.drop_duplicates('timestamp')
-        
-        # Verifica intervalli
-        minutes = config.minutes
-        expected_diff = pd.Timedelta(minutes=minutes)
+        df = self._sorted_frame(df)
+        timestamps, unit = timestamps_int64(df['timestamp'])
+        gaps = gap_stats(timestamps, interval_int64(config.minutes, unit))
+        self.stats.gaps[config.name] = gaps
         
-        df['diff'] = df['timestamp'].diff()
-        gaps = df['diff'] != expected_diff
-        
-        if gaps.any():
+        if gaps.gaps:
             self.logger.warning(
                 f"Gap trovati in {config.name}: "
-                f"{gaps.sum()} su {len(df)} candele"
+                f"{gaps.gaps} su {len(df)} candele "
+                f"({gaps.missing_candles} mancanti, max {gaps.max_gap})"
             )
             
-        # Rimuovi colonna diff
-        df = df.drop('diff', axis=1)
-        
         return df
         
     def get_missing_ranges(
@@ -260,6 +303,9 @@ class DataSynchronizer:
         """
         Trova intervalli mancanti.
         
+        Usa np.diff sui timestamp presenti (O(n) sulle righe esistenti)
+        invece di materializzare l'intero calendario del periodo.
+        
         Args:
             df: DataFrame da analizzare
             config: Configurazione timeframe
@@ -267,49 +313,134 @@ class DataSynchronizer:
             end_time: Fine periodo
             
         Returns:
-            Lista tuple (inizio, fine) intervalli mancanti
+            Lista tuple (inizio, fine) intervalli mancanti, estremi inclusi
         """
-        # Crea indice completo
-        minutes = config.minutes
-        idx = pd.date_range(
-            start=start_time,
-            end=end_time,
-            freq=f"{minutes}T"
+        timestamps = df['timestamp']
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps)
+        tz = timestamps.dt.tz
+        values, unit = timestamps_int64(timestamps)
+        keep, _ = sorted_unique(values)
+        if keep is not None:
+            values = values[keep]
+            
+        start = self._bound_int64(start_time, tz, unit)
+        end = self._bound_int64(end_time, tz, unit)
+        values = values[np.searchsorted(values, start):np.searchsorted(values, end, 'right')]
+        
+        starts, ends = missing_ranges(
+            values,
+            interval_int64(config.minutes, unit),
+            start,
+            end
         )
         
-        # Trova timestamp mancanti
-        missing = idx.difference(df['timestamp'])
-        
-        # Raggruppa in intervalli
         ranges = []
-        if len(missing) > 0:
-            # Converti in array numpy per efficienza
-            missing_arr = missing.values
-            diff = np.diff(missing_arr)
-            splits = np.where(
-                diff > np.timedelta64(minutes, 'm')
-            )[0] + 1
+        for bounds in zip(starts, ends):
+            first, last = (pd.Timestamp(int(b), unit=unit) for b in bounds)
+            if tz is not None:
+                first = first.tz_localize('UTC').tz_convert(tz)
+                last = last.tz_localize('UTC').tz_convert(tz)
+            ranges.append((first, last))
+        return ranges
+        
+    def _bound_int64(self, value: datetime, tz: Any, unit: str) -> int:
+        """Converte un estremo del periodo nella scala dei timestamp."""
+        value = pd.Timestamp(value)
+        if value.tz is None and tz is not None:
+            value = value.tz_localize(tz)
+        if value.tz is not None:
+            value = value.tz_convert('UTC').tz_localize(None)
+        return int(value.to_datetime64().astype(f'datetime64[{unit}]').view(np.int64))
+        
+    async def get_missing_ranges_sql(
+        self,
+        session: AsyncSession,
+        exchange_id: int,
+        symbol_id: int,
+        config: TimeframeConfig,
+        start_time: datetime,
+        end_time: datetime
+    ) -> List[Tuple[datetime, datetime]]:
+        """
+        Trova intervalli mancanti direttamente in SQLite.
+        
+        I buchi sono individuati con la window function LAG sulle
+        righe del periodo, senza caricare le candele.
+        
+        Args:
+            session: Sessione database
+            exchange_id: ID exchange
+            symbol_id: ID simbolo
+            config: Configurazione timeframe
+            start_time: Inizio periodo
+            end_time: Fine periodo
             
-            # Dividi in intervalli
-            ranges = list(zip(
-                np.split(missing_arr, splits)[:-1],
-                np.split(missing_arr, splits)[1:]
-            ))
+        Returns:
+            Lista tuple (inizio, fine) intervalli mancanti, estremi inclusi
+        """
+        bounds_stmt, gaps_stmt = self._missing_ranges_statements(
+            exchange_id, symbol_id, config, start_time, end_time
+        )
+        step = timedelta(minutes=config.minutes)
+        
+        first, last = (await session.execute(bounds_stmt)).one()
+        if first is None:
+            return [(start_time, start_time + (end_time - start_time) // step * step)]
             
-            # Aggiungi ultimo intervallo
-            if len(ranges) > 0:
-                ranges.append((
-                    missing_arr[splits[-1]],
-                    missing_arr[-1]
-                ))
-            else:
-                ranges.append((
-                    missing_arr[0],
-                    missing_arr[-1]
-                ))
-                
+        ranges = []
+        if first - step >= start_time:
+            ranges.append((first - (first - start_time) // step * step, first - step))
+        for previous, current in await session.execute(gaps_stmt):
+            ranges.append((previous + step, current - step))
+        if last + step <= end_time:
+            ranges.append((last + step, last + (end_time - last) // step * step))
         return ranges
         
+    def _missing_ranges_statements(
+        self,
+        exchange_id: int,
+        symbol_id: int,
+        config: TimeframeConfig,
+        start_time: datetime,
+        end_time: datetime
+    ) -> Tuple[Any, Any]:
+        """
+        Query per estremi e buchi di una serie in market_data.
+        
+        Returns:
+            (query MIN/MAX del periodo, query coppie (precedente, corrente)
+            separate da almeno due intervalli)
+        """
+        period = and_(
+            MarketData.exchange_id == exchange_id,
+            MarketData.symbol_id == symbol_id,
+            MarketData.timeframe == config.name,
+            MarketData.timestamp.between(start_time, end_time)
+        )
+        bounds = select(
+            func.min(MarketData.timestamp),
+            func.max(MarketData.timestamp)
+        ).where(period)
+        
+        ordered = select(
+            MarketData.timestamp.label('current'),
+            func.lag(
+                MarketData.timestamp,
+                type_=MarketData.timestamp.type
+            ).over(order_by=MarketData.timestamp).label('previous')
+        ).where(period).subquery()
+        
+        def seconds(column):
+            return cast(func.strftime('%s', column), Integer)
+            
+        gaps = select(ordered.c.previous, ordered.c.current).where(
+            ordered.c.previous.isnot(None),
+            seconds(ordered.c.current) - seconds(ordered.c.previous)
+            >= 2 * config.minutes * 60
+        ).order_by(ordered.c.current)
+        return bounds, gaps
+        
     def estimate_download_size(
         self,
         timeframe: str,
@@ -0,0 +1,426 @@
+"""
+Validation Engine
+---------------
+Motore di validazione a chunk per il DataValidator.
+Le regole che condividono grandezze intermedie (rendimenti,
+z-score) sono fuse: una prima passata calcola una sola volta
+variazioni e log-rendimenti, le regole puntuali e i momenti; una
+seconda passata applica gli z-score con i momenti globali. I chunk
+sono elaborati in thread (NumPy rilascia il GIL).
+"""
+
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+# Versione della logica delle regole (entra nella rule_set_version)
+ENGINE_VERSION = 1
+
+# Modalità di validazione
+MODES = ('full', 'fast', 'sampled', 'rows')
+
+# Finestra della media mobile per gli spike di volume
+VOLUME_WINDOW = 20
+
+@dataclass
+class RuleOutcome:
+    """Esito aggregato di una regola sui chunk."""
+    counts: Dict[str, int] = field(default_factory=dict)
+    maxima: Dict[str, float] = field(default_factory=dict)
+    arrays: Dict[str, List[np.ndarray]] = field(default_factory=dict)
+    
+    @property
+    def total(self) -> int:
+        """Violazioni totali."""
+        return sum(self.counts.values())
+        
+    def add(
+        self,
+        key: str,
+        mask: np.ndarray,
+        collect: Optional[np.ndarray] = None
+    ) -> int:
+        """
+        Registra le violazioni di una maschera.
+        
+        Args:
+            key: Nome del conteggio
+            mask: Maschera delle violazioni
+            collect: Valori da raccogliere (indici o valori), None per
+                contare soltanto
+                
+        Returns:
+            Numero di violazioni
+        """
+        count = int(np.count_nonzero(mask))
+        self.counts[key] = self.counts.get(key, 0) + count
+        if collect is not None:
+            self.arrays.setdefault(key, []).append(collect[mask])
+        return count
+        
+    def peak(self, key: str, values: np.ndarray) -> None:
+        """Aggiorna il massimo di una grandezza (NaN propagati come np.max)."""
+        if len(values) == 0:
+            return
+        value = float(np.max(values))
+        current = self.maxima.get(key)
+        if current is None or value > current or math.isnan(value):
+            self.maxima[key] = value
+            
+    def merge(self, other: 'RuleOutcome') -> None:
+        """Somma l'esito di un altro chunk."""
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        for key, value in other.maxima.items():
+            current = self.maxima.get(key)
+            if current is None or value > current or math.isnan(value):
+                self.maxima[key] = value
+        for key, arrays in other.arrays.items():
+            self.arrays.setdefault(key, []).extend(arrays)
+            
+    def collected(self, key: str) -> List[Any]:
+        """Valori raccolti per un conteggio, come lista."""
+        arrays = self.arrays.get(key)
+        if not arrays:
+            return []
+        return np.concatenate(arrays).tolist()
+
+@dataclass
+class Moments:
+    """Conteggio, media e M2 di una serie (combinabili tra chunk)."""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    
+    @classmethod
+    def of(cls, values: np.ndarray) -> 'Moments':
+        """Momenti di un array."""
+        if len(values) == 0:
+            return cls()
+        mean = float(np.mean(values))
+        centered = values - mean
+        return cls(len(values), mean, float(np.dot(centered, centered)))
+        
+    def combine(self, other: 'Moments') -> 'Moments':
+        """Combina due insiemi di momenti (formula di Chan)."""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            return other
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        return Moments(
+            count,
+            self.mean + delta * other.count / count,
+            self.m2 + other.m2 + delta * delta * self.count * other.count / count
+        )
+        
+    @property
+    def std(self) -> float:
+        """Deviazione standard di popolazione (come stats.zscore)."""
+        if self.count == 0:
+            return float('nan')
+        return math.sqrt(self.m2 / self.count)
+
+@dataclass
+class _Chunk:
+    """Stato di un chunk tra le due passate."""
+    start: int
+    stop: int
+    outcomes: Dict[str, RuleOutcome] = field(default_factory=dict)
+    moments: Dict[str, Moments] = field(default_factory=dict)
+    returns: Optional[np.ndarray] = None
+    critical: bool = False
+    skipped: bool = False
+
+class ValidationEngine:
+    """Esecuzione fusa e parallela delle regole di validazione."""
+    
+    def __init__(
+        self,
+        chunk_size: int = 65536,
+        max_threads: int = 4
+    ):
+        """
+        Inizializza il motore.
+        
+        Args:
+            chunk_size: Righe per chunk
+            max_threads: Thread per l'elaborazione dei chunk
+        """
+        self.chunk_size = max(chunk_size, VOLUME_WINDOW)
+        self.max_threads = max_threads
+        
+    def run(
+        self,
+        data: np.ndarray,
+        rules: Dict[str, Any],
+        period: int,
+        now: float,
+        mode: str = 'full',
+        sample_rate: float = 0.1,
+        fail_fast: bool = False,
+        seed: Optional[int] = None
+    ) -> Tuple[Dict[str, RuleOutcome], Dict[str, Any]]:
+        """
+        Valida una matrice di candele.
+        
+        Args:
+            data: Matrice (n × 6) [timestamp, open, high, low, close, volume]
+            rules: Regole abilitate per nome
+            period: Durata del timeframe in ms
+            now: Timestamp corrente in ms
+            mode: 'full' (indici completi), 'fast' (solo conteggi),
+                'sampled' (conteggi stimati su un campione di chunk) o
+                'rows' (indici delle candele che violano ogni regola)
+            sample_rate: Frazione di chunk validati in modalità 'sampled'
+            fail_fast: Salta i chunk rimanenti alla prima violazione critica
+                (le regole z-score usano i momenti dei chunk validati)
+            seed: Seed del campionamento
+            
+        Returns:
+            (esiti per regola, informazioni di esecuzione)
+            
+        Raises:
+            ValueError: Se la modalità non è valida
+        """
+        if mode not in MODES:
+            raise ValueError(f"Modalità di validazione non valida: {mode}")
+            
+        n = len(data)
+        chunks = [
+            _Chunk(start, min(start + self.chunk_size, n))
+            for start in range(0, n, self.chunk_size)
+        ]
+        if mode == 'sampled' and len(chunks) > 1:
+            rng = np.random.default_rng(seed)
+            size = max(1, math.ceil(sample_rate * len(chunks)))
+            picked = np.sort(rng.choice(len(chunks), size=size, replace=False))
+            chunks = [chunks[i] for i in picked]
+            
+        collect = mode if mode in ('full', 'rows') else None
+        stop = threading.Event()
+        
+        def first_pass(chunk: _Chunk) -> _Chunk:
+            if stop.is_set():
+                chunk.skipped = True
+                return chunk
+            self._first_pass(chunk, data, rules, period, now, collect)
+            if fail_fast and chunk.critical:
+                stop.set()
+            return chunk
+            
+        with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
+            chunks = list(executor.map(first_pass, chunks))
+            validated_chunks = [chunk for chunk in chunks if not chunk.skipped]
+            
+            # Momenti globali per gli z-score (sui soli chunk validati
+            # se fail_fast ha interrotto la prima passata)
+            moments: Dict[str, Moments] = {}
+            for chunk in validated_chunks:
+                for key, value in chunk.moments.items():
+                    moments[key] = moments.get(key, Moments()).combine(value)
+                    
+            if 'price_volatility' in rules or 'outliers' in rules:
+                list(executor.map(
+                    lambda chunk: self._second_pass(chunk, data, rules, moments, collect),
+                    validated_chunks
+                ))
+                
+        outcomes: Dict[str, RuleOutcome] = {}
+        validated = 0
+        for chunk in chunks:
+            if not chunk.outcomes:
+                continue
+            validated += chunk.stop - chunk.start
+            for name, outcome in chunk.outcomes.items():
+                outcomes.setdefault(name, RuleOutcome()).merge(outcome)
+                
+        info = {
+            'mode': mode,
+            'rows': n,
+            'validated_rows': validated,
+            'chunks': len(chunks),
+            'stopped': len(validated_chunks) < len(chunks),
+            'scale': n / validated if validated else 0.0
+        }
+        if mode == 'sampled' and validated:
+            for outcome in outcomes.values():
+                for key in outcome.counts:
+                    outcome.counts[key] = int(round(outcome.counts[key] * info['scale']))
+        return outcomes, info
+        
+    def _first_pass(
+        self,
+        chunk: _Chunk,
+        data: np.ndarray,
+        rules: Dict[str, Any],
+        period: int,
+        now: float,
+        collect: Optional[str]
+    ) -> None:
+        """
+        Regole puntuali e momenti di un chunk.
+        
+        Le grandezze sulle coppie di righe consecutive (differenze,
+        variazioni, rendimenti) includono la coppia a cavallo con il
+        chunk precedente, indicizzata come la riga più recente - 1
+        (in modalità 'rows' come la riga più recente).
+        """
+        a, b = chunk.start, chunk.stop
+        halo = max(a - 1, 0)
+        block = data[halo:b]
+        rows = np.arange(a, b)
+        pairs = np.arange(halo, b - 1)  # Indice della prima riga di ogni coppia
+        later = pairs + 1
+        if collect is None:
+            rows = later = pairs = None
+        elif collect == 'rows':
+            pairs = later
+            
+        timestamps = block[:, 0]
+        opens, highs, lows, closes, volumes = (block[:, j] for j in range(1, 6))
+        own = slice(a - halo, None)  # Righe del chunk senza halo
+        outcomes = chunk.outcomes
+        
+        # Grandezze condivise: variazioni e log-rendimenti
+        step = np.diff(closes)
+        previous = closes[:-1]
+        changes = np.abs(step / previous)
+        
+        rule = rules.get('timestamp_sequence')
+        if rule is not None:
+            diff = np.diff(timestamps)
+            outcome = outcomes['timestamp_sequence'] = RuleOutcome()
+            gaps = diff > period * rule.parameters['max_gap']
+            outcome.add('gaps', gaps, diff if collect == 'full' else later)
+            
+        rule = rules.get('timestamp_future')
+        if rule is not None:
+            outcome = outcomes['timestamp_future'] = RuleOutcome()
+            future = timestamps[own] > now
+            outcome.add('future', future, timestamps[own] if collect == 'full' else rows)
+            
+        rule = rules.get('price_range')
+        if rule is not None:
+            outcome = outcomes['price_range'] = RuleOutcome()
+            min_price = rule.parameters['min_price']
+            invalid = (
+                (opens[own] < min_price) |
+                (highs[own] < min_price) |
+                (lows[own] < min_price) |
+                (closes[own] < min_price)
+            )
+            # Variazione eccessiva attribuita alla candela più recente
+            excessive = changes > rule.parameters['max_change']
+            invalid[len(invalid) - len(excessive):] |= excessive
+            outcome.add('invalid_prices', invalid, rows)
+            outcome.peak('max_change', changes)
+            
+        rule = rules.get('price_consistency')
+        if rule is not None:
+            outcome = outcomes['price_consistency'] = RuleOutcome()
+            o, h, l, c = opens[own], highs[own], lows[own], closes[own]
+            invalid = (l > o) | (l > c) | (h < o) | (h < c) | (h < l)
+            outcome.add('inconsistent', invalid, rows)
+            
+        rule = rules.get('volume_range')
+        if rule is not None:
+            outcome = outcomes['volume_range'] = RuleOutcome()
+            invalid = volumes[own] < rule.parameters['min_volume']
+            outcome.add('invalid_volumes', invalid, rows)
+            
+        rule = rules.get('volume_spikes')
+        if rule is not None and len(data) >= VOLUME_WINDOW:
+            outcome = outcomes['volume_spikes'] = RuleOutcome()
+            ma = self._volume_ma(data[:, 5], a, b)
+            own_volumes = volumes[own]
+            spikes = own_volumes > ma * rule.parameters['threshold']
+            outcome.add('spike_indexes', spikes, rows)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                outcome.peak('max_ratio', own_volumes / ma)
+                
+        rule = rules.get('price_gaps')
+        if rule is not None:
+            outcome = outcomes['price_gaps'] = RuleOutcome()
+            outcome.add('gap_indexes', changes > rule.parameters['threshold'], pairs)
+            outcome.peak('max_gap', changes)
+            
+        if 'price_volatility' in rules:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                chunk.returns = np.log(closes[1:]) - np.log(previous)
+            chunk.moments['returns'] = Moments.of(chunk.returns)
+            
+        if 'outliers' in rules:
+            chunk.moments['closes'] = Moments.of(closes[own])
+            chunk.moments['volumes'] = Moments.of(volumes[own])
+            
+        chunk.critical = any(
+            outcome.total > 0 and rules[name].severity == 'critical'
+            for name, outcome in outcomes.items()
+        )
+        
+    def _second_pass(
+        self,
+        chunk: _Chunk,
+        data: np.ndarray,
+        rules: Dict[str, Any],
+        moments: Dict[str, Moments],
+        collect: Optional[str]
+    ) -> None:
+        """Regole basate sugli z-score con i momenti globali."""
+        if not chunk.outcomes and not chunk.moments:
+            return
+        a, b = chunk.start, chunk.stop
+        rows = np.arange(a, b) if collect else None
+        
+        rule = rules.get('price_volatility')
+        if rule is not None:
+            outcome = chunk.outcomes['price_volatility'] = RuleOutcome()
+            stats = moments['returns']
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z = np.abs(chunk.returns - stats.mean) / stats.std
+            pairs = np.arange(max(a - 1, 0), b - 1)
+            if collect is None:
+                pairs = None
+            elif collect == 'rows':
+                pairs = pairs + 1
+            outcome.add('vol_indexes', z > rule.parameters['threshold'], pairs)
+            outcome.peak('max_zscore', z)
+            chunk.returns = None
+            
+        rule = rules.get('outliers')
+        if rule is not None:
+            outcome = chunk.outcomes['outliers'] = RuleOutcome()
+            threshold = rule.parameters['threshold']
+            for key, column, series in (
+                ('price_outliers', 4, 'closes'),
+                ('volume_outliers', 5, 'volumes')
+            ):
+                stats = moments[series]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    z = np.abs(data[a:b, column] - stats.mean) / stats.std
+                outcome.add(key, z > threshold, rows)
+                
+    def _volume_ma(self, volumes: np.ndarray, a: int, b: int) -> np.ndarray:
+        """
+        Media mobile del volume sulle righe [a, b).
+        
+        Le prime VOLUME_WINDOW - 1 righe usano la prima media completa,
+        come il padding 'edge' della convoluzione.
+        """
+        w = VOLUME_WINDOW
+        lo = max(a - (w - 1), 0)
+        sums = np.concatenate([[0.0], np.cumsum(volumes[lo:b])])
+        rows = np.arange(a, b)
+        ends = rows - lo + 1
+        ma = np.empty(b - a)
+        full = rows >= w - 1
+        ma[full] = (sums[ends[full]] - sums[ends[full] - w]) / w
+        if not full.all():
+            ma[~full] = volumes[:w].mean()
+        return ma
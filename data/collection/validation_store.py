@@ -0,0 +1,407 @@
+"""
+Validation Store
+--------------
+Persistenza dei risultati di validazione per segmenti di candele.
+Ogni segmento (simbolo, timeframe, intervallo) è salvato con la
+versione delle regole e un'impronta delle candele: una nuova
+validazione ricalcola solo i segmenti nuovi o modificati. Le
+candele invalide sono indicizzate per le query su un intervallo.
+"""
+
+import json
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select, delete, insert, func, cast, text, Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import MarketData, DataValidation, InvalidCandle
+from .validator import DataValidator
+from .resampler import stored_to_utc_ms
+
+# Colonne aggiunte a data_validations su database creati in precedenza
+VALIDATION_COLUMNS = {
+    'rule_set_version': 'VARCHAR(32)',
+    'data_hash': 'VARCHAR(32)'
+}
+
+# Regole che dipendono dall'ora di esecuzione: il loro esito non
+# dipende solo dalle candele e non può essere salvato
+TIME_DEPENDENT_RULES = {'timestamp_future'}
+
+# Versione del formato dei risultati salvati (timestamp UTC)
+STORE_VERSION = 2
+
+class ValidationStore:
+    """Risultati di validazione persistiti e rivalidazione incrementale."""
+    
+    def __init__(
+        self,
+        validator: Optional[DataValidator] = None,
+        segment_candles: int = 1000
+    ):
+        """
+        Inizializza lo store.
+        
+        Args:
+            validator: Validatore (default: DataValidator con regole standard)
+            segment_candles: Candele per segmento di validazione
+        """
+        self.logger = logging.getLogger(__name__)
+        self.validator = validator or DataValidator()
+        self.segment_candles = segment_candles
+        self.rules = {
+            rule.name for rule in self.validator.rules
+            if rule.name not in TIME_DEPENDENT_RULES
+        }
+        
+    @property
+    def version(self) -> str:
+        """Impronta di regole salvate, configurazione e formato dello store."""
+        encoded = json.dumps(
+            [STORE_VERSION, self.validator.rule_set_version, sorted(self.rules)]
+        )
+        return hashlib.blake2b(encoded.encode(), digest_size=8).hexdigest()
+        
+    async def ensure_schema(self, session: AsyncSession) -> None:
+        """
+        Aggiunge a data_validations le colonne mancanti.
+        
+        Args:
+            session: Sessione database
+        """
+        result = await session.execute(text("PRAGMA table_info(data_validations)"))
+        existing = {row[1] for row in result}
+        for column, sql_type in VALIDATION_COLUMNS.items():
+            if existing and column not in existing:
+                await session.execute(text(
+                    f"ALTER TABLE data_validations ADD COLUMN {column} {sql_type}"
+                ))
+                
+    def _segment_seconds(self, timeframe: str) -> int:
+        """Durata di un segmento in secondi."""
+        return self.validator._parse_timeframe(timeframe) // 1000 * self.segment_candles
+        
+    async def validate_range(
+        self,
+        session: AsyncSession,
+        exchange_id: int,
+        symbol_id: int,
+        timeframe: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """
+        Valida un intervallo ricalcolando solo i segmenti cambiati.
+        
+        Un segmento è ricalcolato se manca un risultato con la versione
+        corrente delle regole, se l'impronta delle sue candele è
+        cambiata o se è cambiato il segmento precedente (le regole
+        sulle coppie di candele usano l'ultima candela precedente). Le
+        regole statistiche sono valutate sul singolo segmento.
+        
+        Args:
+            session: Sessione database
+            exchange_id: ID exchange
+            symbol_id: ID simbolo
+            timeframe: Timeframe
+            start: Inizio intervallo (None = dall'inizio)
+            end: Fine intervallo (None = fino all'ultima candela)
+            
+        Returns:
+            Conteggi di segmenti, segmenti rivalidati e candele invalide
+        """
+        version = self.version
+        seconds = self._segment_seconds(timeframe)
+        
+        signatures = await self._segment_signatures(
+            session, exchange_id, symbol_id, timeframe, seconds, start, end
+        )
+        stored = await self._stored_segments(
+            session, exchange_id, symbol_id, timeframe, start, end
+        )
+        
+        changed: Set[int] = set()
+        for bucket, signature in signatures.items():
+            validation = stored.get(self._bucket_start(bucket, seconds))
+            if (
+                validation is None
+                or validation.rule_set_version != version
+                or validation.data_hash != signature
+            ):
+                changed.add(bucket)
+        changed |= {b + 1 for b in changed if b + 1 in signatures}
+        
+        summary = {'segments': len(signatures), 'revalidated': 0, 'invalid_candles': 0}
+        for bucket in sorted(changed):
+            summary['invalid_candles'] += await self._validate_segment(
+                session, exchange_id, symbol_id, timeframe,
+                bucket, seconds, signatures[bucket], version
+            )
+            summary['revalidated'] += 1
+            
+        await session.commit()
+        self.logger.info(
+            f"Validazione {symbol_id} {timeframe}: "
+            f"{summary['revalidated']}/{summary['segments']} segmenti ricalcolati"
+        )
+        return summary
+        
+    def _bucket_start(self, bucket: int, seconds: int) -> datetime:
+        """Inizio di un segmento (UTC senza timezone)."""
+        return datetime(1970, 1, 1) + timedelta(seconds=bucket * seconds)
+        
+    async def _segment_signatures(
+        self,
+        session: AsyncSession,
+        exchange_id: int,
+        symbol_id: int,
+        timeframe: str,
+        seconds: int,
+        start: Optional[datetime],
+        end: Optional[datetime]
+    ) -> Dict[int, str]:
+        """
+        Impronta di ogni segmento calcolata in SQLite, senza caricare
+        le candele.
+        
+        Returns:
+            Impronta per indice di segmento
+        """
+        bucket = (cast(func.strftime('%s', MarketData.timestamp), Integer) // seconds).label('bucket')
+        stmt = select(
+            bucket,
+            func.count(),
+            func.min(MarketData.timestamp),
+            func.max(MarketData.timestamp),
+            func.total(MarketData.open),
+            func.total(MarketData.high),
+            func.total(MarketData.low),
+            func.total(MarketData.close),
+            func.total(MarketData.volume)
+        ).where(
+            *self._series_filter(exchange_id, symbol_id, timeframe, start, end)
+        ).group_by(bucket)
+        
+        signatures = {}
+        for row in await session.execute(stmt):
+            digest = hashlib.blake2b(repr(tuple(row[1:])).encode(), digest_size=16)
+            signatures[int(row[0])] = digest.hexdigest()
+        return signatures
+        
+    def _series_filter(
+        self,
+        exchange_id: int,
+        symbol_id: int,
+        timeframe: str,
+        start: Optional[datetime],
+        end: Optional[datetime]
+    ) -> List[Any]:
+        """Condizioni sulla serie e sull'intervallo di market_data."""
+        conditions = [
+            MarketData.exchange_id == exchange_id,
+            MarketData.symbol_id == symbol_id,
+            MarketData.timeframe == timeframe
+        ]
+        if start is not None:
+            conditions.append(MarketData.timestamp >= start)
+        if end is not None:
+            conditions.append(MarketData.timestamp <= end)
+        return conditions
+        
+    async def _stored_segments(
+        self,
+        session: AsyncSession,
+        exchange_id: int,
+        symbol_id: int,
+        timeframe: str,
+        start: Optional[datetime],
+        end: Optional[datetime]
+    ) -> Dict[datetime, DataValidation]:
+        """Risultati salvati per inizio segmento."""
+        stmt = select(DataValidation).where(
+            DataValidation.exchange_id == exchange_id,
+            DataValidation.symbol_id == symbol_id,
+            DataValidation.timeframe == timeframe
+        )
+        if start is not None:
+            stmt = stmt.where(DataValidation.end_time >= start)
+        if end is not None:
+            stmt = stmt.where(DataValidation.start_time <= end)
+        result = await session.execute(stmt)
+        return {v.start_time: v for v in result.scalars()}
+        
+    async def _validate_segment(
+        self,
+        session: AsyncSession,
+        exchange_id: int,
+        symbol_id: int,
+        timeframe: str,
+        bucket: int,
+        seconds: int,
+        signature: str,
+        version: str
+    ) -> int:
+        """
+        Valida un segmento e sostituisce il risultato salvato.
+        
+        Returns:
+            Numero di candele invalide
+        """
+        segment_start = self._bucket_start(bucket, seconds)
+        segment_end = segment_start + timedelta(seconds=seconds) - timedelta(microseconds=1)
+        columns = (
+            MarketData.timestamp, MarketData.open, MarketData.high,
+            MarketData.low, MarketData.close, MarketData.volume
+        )
+        series = self._series_filter(exchange_id, symbol_id, timeframe, None, None)
+        
+        rows = (await session.execute(
+            select(*columns).where(
+                *series,
+                MarketData.timestamp.between(segment_start, segment_end)
+            ).order_by(MarketData.timestamp)
+        )).all()
+        halo = (await session.execute(
+            select(*columns).where(
+                *series,
+                MarketData.timestamp < segment_start
+            ).order_by(MarketData.timestamp.desc()).limit(1)
+        )).all()
+        
+        # I timestamp salvati sono in ora locale: le regole lavorano in UTC
+        candles = halo + rows
+        data = np.column_stack([
+            stored_to_utc_ms(c[0] for c in candles).astype(np.float64),
+            np.array([c[1:] for c in candles], dtype=np.float64).reshape(-1, 5)
+        ])
+        outcomes, _ = self.validator.run_rules(
+            data, timeframe, mode='rows', only=self.rules
+        )
+        
+        # Righe invalide per regola, escludendo la candela di contesto
+        severities = {rule.name: rule.severity for rule in self.validator.rules}
+        offset = len(halo)
+        invalid: List[Tuple[int, str]] = []
+        counts: Dict[str, int] = {}
+        for name, outcome in outcomes.items():
+            indexes = np.unique(np.concatenate(
+                [np.asarray(a, dtype=np.int64) for arrays in outcome.arrays.values() for a in arrays]
+                or [np.empty(0, dtype=np.int64)]
+            ))
+            indexes = indexes[indexes >= offset]
+            if len(indexes):
+                counts[name] = len(indexes)
+                invalid.extend((int(i), name) for i in indexes)
+                
+        # Sostituisce i risultati precedenti del segmento
+        previous = select(DataValidation.id).where(
+            DataValidation.exchange_id == exchange_id,
+            DataValidation.symbol_id == symbol_id,
+            DataValidation.timeframe == timeframe,
+            DataValidation.start_time == segment_start
+        )
+        await session.execute(
+            delete(InvalidCandle).where(InvalidCandle.validation_id.in_(previous))
+        )
+        await session.execute(
+            delete(DataValidation).where(DataValidation.id.in_(previous))
+        )
+        
+        period = self.validator._parse_timeframe(timeframe)
+        span = (data[-1, 0] - data[offset, 0]) / period + 1 if rows else 0
+        validation = DataValidation(
+            exchange_id=exchange_id,
+            symbol_id=symbol_id,
+            timeframe=timeframe,
+            start_time=segment_start,
+            end_time=segment_end,
+            total_candles=len(rows),
+            missing_candles=max(int(span) - len(rows), 0),
+            invalid_candles=len({i for i, _ in invalid}),
+            gaps_detected=counts.get('timestamp_sequence', 0),
+            anomalies_detected=sum(
+                count for name, count in counts.items()
+                if severities.get(name) != 'critical'
+            ),
+            validation_details=json.dumps(counts),
+            is_valid=not any(
+                severities.get(name) == 'critical' for name in counts
+            ),
+            rule_set_version=version,
+            data_hash=signature
+        )
+        session.add(validation)
+        await session.flush()
+        
+        if invalid:
+            await session.execute(insert(InvalidCandle), [
+                {
+                    'validation_id': validation.id,
+                    'exchange_id': exchange_id,
+                    'symbol_id': symbol_id,
+                    'timeframe': timeframe,
+                    'timestamp': candles[i][0],
+                    'rule': name,
+                    'severity': severities.get(name, 'warning')
+                }
+                for i, name in invalid
+            ])
+        return validation.invalid_candles
+        
+    async def invalid_candles(
+        self,
+        session: AsyncSession,
+        exchange_id: int,
+        symbol_id: int,
+        timeframe: str,
+        start: datetime,
+        end: datetime,
+        rules: Optional[List[str]] = None,
+        severity: Optional[str] = None
+    ) -> List[Tuple[datetime, str, str]]:
+        """
+        Candele invalide in un intervallo (indice idx_invalid_lookup).
+        
+        Sono restituiti solo i risultati della versione corrente delle
+        regole. Le regole in TIME_DEPENDENT_RULES (es. timestamp futuri)
+        non sono salvate e vanno eseguite al momento.
+        
+        Args:
+            session: Sessione database
+            exchange_id: ID exchange
+            symbol_id: ID simbolo
+            timeframe: Timeframe
+            start: Inizio intervallo
+            end: Fine intervallo
+            rules: Regole da includere (None = tutte)
+            severity: Severità da includere (None = tutte)
+            
+        Returns:
+            Lista (timestamp, regola, severità) ordinata per timestamp
+        """
+        stmt = select(
+            InvalidCandle.timestamp,
+            InvalidCandle.rule,
+            InvalidCandle.severity
+        ).join(
+            DataValidation,
+            DataValidation.id == InvalidCandle.validation_id
+        ).where(
+            InvalidCandle.exchange_id == exchange_id,
+            InvalidCandle.symbol_id == symbol_id,
+            InvalidCandle.timeframe == timeframe,
+            InvalidCandle.timestamp.between(start, end),
+            DataValidation.rule_set_version == self.version
+        )
+        if rules:
+            stmt = stmt.where(InvalidCandle.rule.in_(rules))
+        if severity:
+            stmt = stmt.where(InvalidCandle.severity == severity)
+        stmt = stmt.order_by(InvalidCandle.timestamp, InvalidCandle.rule)
+        
+        result = await session.execute(stmt)
+        return [tuple(row) for row in result]
@@ -5,13 +5,36 @@ Sistema di validazione dati di mercato.
 Implementa regole e controlli di qualità.
 """
 
+import json
+import hashlib
 import logging
 from typing import Dict, List, Any, Optional, Tuple, Set
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 import numpy as np
-from scipy import stats
+
+from .validation_engine import ValidationEngine, RuleOutcome, ENGINE_VERSION
+
+# Prefisso dei dettagli e formato del valore in modalità 'full' per
+# regola: None = lista dei valori raccolti, 'dict' = indici per chiave
+RULE_DETAILS: Dict[str, Tuple[str, Optional[str]]] = {
+    'timestamp_sequence': ("Gap trovati: ", None),
+    'timestamp_future': ("Timestamp futuri: ", None),
+    'price_range': ("Prezzi invalidi: ", 'dict'),
+    'price_consistency': ("Candele inconsistenti: ", None),
+    'volume_range': ("Volumi invalidi: ", None),
+    'volume_spikes': ("Volume spike: ", 'dict'),
+    'price_gaps': ("Gap prezzi: ", 'dict'),
+    'price_volatility': ("Alta volatilità: ", 'dict'),
+    'outliers': ("Outliers ", 'dict')
+}
+
+# Etichette dei conteggi delle regole con più conteggi
+COUNT_LABELS: Dict[str, str] = {
+    'price_outliers': 'prezzi',
+    'volume_outliers': 'volumi'
+}
 
 @dataclass
 class ValidationRule:
@@ -91,11 +114,22 @@ class ValidationStats:
 class DataValidator:
     """Validatore dati di mercato."""
     
-    def __init__(self):
-        """Inizializza il validatore."""
+    def __init__(
+        self,
+        chunk_size: int = 65536,
+        max_threads: int = 4
+    ):
+        """
+        Inizializza il validatore.
+        
+        Args:
+            chunk_size: Righe per chunk di validazione
+            max_threads: Thread per la validazione dei chunk
+        """
         self.logger = logging.getLogger(__name__)
         self.stats = ValidationStats()
         self.rules = self._setup_rules()
+        self.engine = ValidationEngine(chunk_size, max_threads)
         
     def _setup_rules(self) -> List[ValidationRule]:
         """
@@ -180,47 +214,48 @@ class DataValidator:
     def validate_candles(
         self,
         candles: List[List[float]],
-        timeframe: str
+        timeframe: str,
+        mode: str = 'full',
+        sample_rate: float = 0.1,
+        fail_fast: bool = False
     ) -> Tuple[List[ValidationResult], ValidationStats]:
         """
         Valida lista di candele.
         
+        Le regole sono eseguite dal ValidationEngine a chunk paralleli.
+        In modalità 'fast' e 'sampled' i risultati contengono solo
+        conteggi e massimi, senza liste di indici.
+        
         Args:
-            candles: Lista candele OHLCV
+            candles: Lista (o matrice) candele OHLCV
             timeframe: Timeframe dati
+            mode: 'full', 'fast' o 'sampled'
+            sample_rate: Frazione di chunk validati in modalità 'sampled'
+            fail_fast: Interrompe alla prima violazione critica
             
         Returns:
             Tuple con risultati e statistiche
         """
+        data = np.asarray(candles, dtype=np.float64)
+        if len(data) == 0:
+            return [], self.stats
+            
+        outcomes, info = self.run_rules(
+            data, timeframe, mode, sample_rate, fail_fast
+        )
+        if info['stopped']:
+            self.logger.warning(
+                f"Validazione interrotta alla prima violazione critica "
+                f"({info['validated_rows']} su {info['rows']} righe)"
+            )
+            
         results = []
-        
-        # Converti in array numpy
-        data = np.array(candles)
-        timestamps = data[:, 0]
-        opens = data[:, 1]
-        highs = data[:, 2]
-        lows = data[:, 3]
-        closes = data[:, 4]
-        volumes = data[:, 5]
-        
-        # Valida timestamp
-        results.extend(self._validate_timestamps(
-            timestamps, timeframe
-        ))
-        
-        # Valida prezzi
-        results.extend(self._validate_prices(
-            opens, highs, lows, closes
-        ))
-        
-        # Valida volumi
-        results.extend(self._validate_volumes(volumes))
-        
-        # Valida statistiche
-        results.extend(self._validate_statistics(
-            timestamps, closes, volumes, timeframe
-        ))
-        
+        for rule in self.rules:
+            if rule.name in outcomes:
+                results.append(self._rule_result(rule, outcomes[rule.name], mode))
+            elif rule.name == 'data_density' and rule.enabled:
+                results.append(self._density_result(rule, data[:, 0], timeframe))
+                
         # Aggiorna statistiche
         for result in results:
             self.stats.update(
@@ -230,344 +265,145 @@ class DataValidator:
             
         return results, self.stats
         
-    def _validate_timestamps(
+    def run_rules(
         self,
-        timestamps: np.ndarray,
-        timeframe: str
-    ) -> List[ValidationResult]:
+        data: np.ndarray,
+        timeframe: str,
+        mode: str = 'full',
+        sample_rate: float = 0.1,
+        fail_fast: bool = False,
+        only: Optional[Set[str]] = None
+    ) -> Tuple[Dict[str, RuleOutcome], Dict[str, Any]]:
         """
-        Valida timestamp.
+        Esegue le regole abilitate sul motore di validazione.
         
         Args:
-            timestamps: Array timestamp
+            data: Matrice (n × 6) delle candele
             timeframe: Timeframe dati
+            mode: Modalità del ValidationEngine
+            sample_rate: Frazione di chunk in modalità 'sampled'
+            fail_fast: Interrompe alla prima violazione critica
+            only: Nomi delle regole da eseguire (None = tutte)
             
         Returns:
-            Lista risultati validazione
+            (esiti per regola, informazioni di esecuzione)
         """
-        results = []
-        
-        # Verifica sequenza
-        rule = self._get_rule("timestamp_sequence")
-        if rule and rule.enabled:
-            # Calcola gaps
-            diff = np.diff(timestamps)
-            period = self._parse_timeframe(timeframe)
-            max_gap = period * rule.parameters["max_gap"]
-            
-            gaps = diff > max_gap
-            if np.any(gaps):
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=False,
-                    details=f"Gap trovati: {np.sum(gaps)}",
-                    value=diff[gaps].tolist()
-                ))
-            else:
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=True
-                ))
-                
-        # Verifica futuro
-        rule = self._get_rule("timestamp_future")
-        if rule and rule.enabled:
-            now = datetime.utcnow().timestamp() * 1000
-            future = timestamps > now
-            
-            if np.any(future):
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=False,
-                    details=f"Timestamp futuri: {np.sum(future)}",
-                    value=timestamps[future].tolist()
-                ))
-            else:
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=True
-                ))
-                
-        return results
+        rules = {
+            rule.name: rule
+            for rule in self.rules
+            if rule.enabled and rule.name in RULE_DETAILS
+            and (only is None or rule.name in only)
+        }
+        return self.engine.run(
+            data,
+            rules,
+            self._parse_timeframe(timeframe),
+            datetime.utcnow().timestamp() * 1000,
+            mode=mode,
+            sample_rate=sample_rate,
+            fail_fast=fail_fast
+        )
         
-    def _validate_prices(
-        self,
-        opens: np.ndarray,
-        highs: np.ndarray,
-        lows: np.ndarray,
-        closes: np.ndarray
-    ) -> List[ValidationResult]:
+    @property
+    def rule_set_version(self) -> str:
         """
-        Valida prezzi.
+        Impronta della configurazione delle regole.
+        
+        Cambia quando cambiano regole, severità, parametri o la
+        versione del motore: i risultati salvati con un'impronta
+        diversa vanno ricalcolati.
         
-        Args:
-            opens: Prezzi apertura
-            highs: Prezzi massimi
-            lows: Prezzi minimi
-            closes: Prezzi chiusura
-            
         Returns:
-            Lista risultati validazione
+            Digest esadecimale
         """
-        results = []
-        
-        # Verifica range
-        rule = self._get_rule("price_range")
-        if rule and rule.enabled:
-            min_price = rule.parameters["min_price"]
-            max_change = rule.parameters["max_change"]
-            
-            # Verifica prezzi negativi
-            invalid = (
-                (opens < min_price) |
-                (highs < min_price) |
-                (lows < min_price) |
-                (closes < min_price)
-            )
-            
-            # Verifica variazioni eccessive
-            changes = np.abs(np.diff(closes) / closes[:-1])
-            invalid |= changes > max_change
-            
-            if np.any(invalid):
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=False,
-                    details=f"Prezzi invalidi: {np.sum(invalid)}",
-                    value={
-                        'invalid_prices': np.where(invalid)[0].tolist(),
-                        'max_change': float(np.max(changes))
-                    }
-                ))
-            else:
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=True
-                ))
-                
-        # Verifica consistenza
-        rule = self._get_rule("price_consistency")
-        if rule and rule.enabled:
-            invalid = (
-                (lows > opens) |
-                (lows > closes) |
-                (highs < opens) |
-                (highs < closes) |
-                (highs < lows)
-            )
-            
-            if np.any(invalid):
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=False,
-                    details=f"Candele inconsistenti: {np.sum(invalid)}",
-                    value=np.where(invalid)[0].tolist()
-                ))
-            else:
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=True
-                ))
-                
-        return results
+        encoded = json.dumps(
+            [
+                ENGINE_VERSION,
+                [[r.name, r.severity, r.enabled, r.parameters] for r in self.rules]
+            ],
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.blake2b(encoded.encode(), digest_size=8).hexdigest()
         
-    def _validate_volumes(
+    def _rule_result(
         self,
-        volumes: np.ndarray
-    ) -> List[ValidationResult]:
+        rule: ValidationRule,
+        outcome: RuleOutcome,
+        mode: str
+    ) -> ValidationResult:
         """
-        Valida volumi.
+        Converte l'esito del motore in risultato di validazione.
         
         Args:
-            volumes: Array volumi
+            rule: Regola
+            outcome: Esito aggregato sui chunk
+            mode: Modalità di validazione
             
         Returns:
-            Lista risultati validazione
+            Risultato della regola
         """
-        results = []
+        if outcome.total == 0:
+            return ValidationResult(rule=rule, passed=True)
+            
+        label, value_key = RULE_DETAILS[rule.name]
+        details = label + ", ".join(
+            f"{COUNT_LABELS.get(key, key)}: {count}" if len(outcome.counts) > 1
+            else str(count)
+            for key, count in outcome.counts.items()
+        )
         
-        # Verifica range
-        rule = self._get_rule("volume_range")
-        if rule and rule.enabled:
-            min_volume = rule.parameters["min_volume"]
-            invalid = volumes < min_volume
+        if mode != 'full':
+            if mode == 'sampled':
+                details += " (stima su campione)"
+            value: Any = {**outcome.counts, **outcome.maxima}
+        elif value_key is None:
+            value = outcome.collected(next(iter(outcome.counts)))
+        else:
+            value = {key: outcome.collected(key) for key in outcome.counts}
+            value.update(outcome.maxima)
             
-            if np.any(invalid):
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=False,
-                    details=f"Volumi invalidi: {np.sum(invalid)}",
-                    value=np.where(invalid)[0].tolist()
-                ))
-            else:
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=True
-                ))
-                
-        # Verifica spike
-        rule = self._get_rule("volume_spikes")
-        if rule and rule.enabled:
-            # Calcola media mobile
-            window = 20
-            if len(volumes) >= window:
-                ma = np.convolve(
-                    volumes,
-                    np.ones(window)/window,
-                    mode='valid'
-                )
-                ma = np.pad(ma, (window-1, 0), mode='edge')
-                
-                # Trova spike
-                threshold = rule.parameters["threshold"]
-                spikes = volumes > (ma * threshold)
-                
-                if np.any(spikes):
-                    results.append(ValidationResult(
-                        rule=rule,
-                        passed=False,
-                        details=f"Volume spike: {np.sum(spikes)}",
-                        value={
-                            'spike_indexes': np.where(spikes)[0].tolist(),
-                            'max_ratio': float(np.max(volumes / ma))
-                        }
-                    ))
-                else:
-                    results.append(ValidationResult(
-                        rule=rule,
-                        passed=True
-                    ))
-                    
-        return results
+        return ValidationResult(
+            rule=rule,
+            passed=False,
+            details=details,
+            value=value
+        )
         
-    def _validate_statistics(
+    def _density_result(
         self,
+        rule: ValidationRule,
         timestamps: np.ndarray,
-        closes: np.ndarray,
-        volumes: np.ndarray,
         timeframe: str
-    ) -> List[ValidationResult]:
+    ) -> ValidationResult:
         """
-        Valida statistiche.
+        Valida densità dati (dipende solo da estremi e numero di righe).
         
         Args:
+            rule: Regola data_density
             timestamps: Array timestamp
-            closes: Prezzi chiusura
-            volumes: Volumi
             timeframe: Timeframe dati
             
         Returns:
-            Lista risultati validazione
+            Risultato della regola
         """
-        results = []
-        
-        # Verifica gap prezzi
-        rule = self._get_rule("price_gaps")
-        if rule and rule.enabled:
-            # Calcola gap percentuali
-            gaps = np.abs(np.diff(closes) / closes[:-1])
-            threshold = rule.parameters["threshold"]
-            
-            large_gaps = gaps > threshold
-            if np.any(large_gaps):
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=False,
-                    details=f"Gap prezzi: {np.sum(large_gaps)}",
-                    value={
-                        'gap_indexes': np.where(large_gaps)[0].tolist(),
-                        'max_gap': float(np.max(gaps))
-                    }
-                ))
-            else:
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=True
-                ))
-                
-        # Verifica volatilità
-        rule = self._get_rule("price_volatility")
-        if rule and rule.enabled:
-            # Calcola rendimenti
-            returns = np.diff(np.log(closes))
-            
-            # Calcola z-score
-            z_scores = np.abs(stats.zscore(returns))
-            threshold = rule.parameters["threshold"]
-            
-            high_vol = z_scores > threshold
-            if np.any(high_vol):
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=False,
-                    details=f"Alta volatilità: {np.sum(high_vol)}",
-                    value={
-                        'vol_indexes': np.where(high_vol)[0].tolist(),
-                        'max_zscore': float(np.max(z_scores))
-                    }
-                ))
-            else:
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=True
-                ))
-                
-        # Verifica densità
-        rule = self._get_rule("data_density")
-        if rule and rule.enabled:
-            # Calcola periodi attesi
-            period = self._parse_timeframe(timeframe)
-            expected = (timestamps[-1] - timestamps[0]) / period
-            density = len(timestamps) / expected
-            
-            min_density = rule.parameters["min_density"]
-            if density < min_density:
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=False,
-                    details="Densità dati insufficiente",
-                    value={
-                        'density': float(density),
-                        'missing': int(expected - len(timestamps))
-                    }
-                ))
-            else:
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=True
-                ))
-                
-        # Verifica outliers
-        rule = self._get_rule("outliers")
-        if rule and rule.enabled:
-            # Calcola z-score per prezzi e volumi
-            z_prices = np.abs(stats.zscore(closes))
-            z_volumes = np.abs(stats.zscore(volumes))
-            
-            threshold = rule.parameters["threshold"]
-            price_outliers = z_prices > threshold
-            volume_outliers = z_volumes > threshold
-            
-            if np.any(price_outliers) or np.any(volume_outliers):
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=False,
-                    details=(
-                        f"Outliers prezzi: {np.sum(price_outliers)}, "
-                        f"volumi: {np.sum(volume_outliers)}"
-                    ),
-                    value={
-                        'price_outliers': np.where(price_outliers)[0].tolist(),
-                        'volume_outliers': np.where(volume_outliers)[0].tolist()
-                    }
-                ))
-            else:
-                results.append(ValidationResult(
-                    rule=rule,
-                    passed=True
-                ))
-                
-        return results
+        period = self._parse_timeframe(timeframe)
+        expected = (timestamps[-1] - timestamps[0]) / period
+        if expected <= 0:
+            return ValidationResult(rule=rule, passed=True)
+        density = len(timestamps) / expected
+        
+        if density < rule.parameters["min_density"]:
+            return ValidationResult(
+                rule=rule,
+                passed=False,
+                details="Densità dati insufficiente",
+                value={
+                    'density': float(density),
+                    'missing': int(expected - len(timestamps))
+                }
+            )
+        return ValidationResult(rule=rule, passed=True)
         
     def _get_rule(self, name: str) -> Optional[ValidationRule]:
         """
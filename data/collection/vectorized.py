@@ -0,0 +1,445 @@
+"""
+Vectorized Indicators
+-------------------
+Kernel NumPy per il calcolo degli indicatori su matrici 2D
+(tempo × simbolo). Un'unica passata calcola l'indicatore per
+tutti i simboli di un universo; ogni colonna può iniziare con
+NaN (simboli quotati in date diverse) e segue la semantica di
+talib a partire dal primo valore valido.
+"""
+
+from typing import Dict, List, Any, Callable
+
+import numpy as np
+from scipy.signal import lfilter
+
+def first_valid(x: np.ndarray) -> np.ndarray:
+    """
+    Indice del primo valore valido di ogni colonna.
+    
+    Args:
+        x: Matrice (tempo × simbolo)
+        
+    Returns:
+        Indici per colonna (len(x) se la colonna è vuota)
+    """
+    valid = ~np.isnan(x)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(x))
+
+def _mask_incomplete(total: np.ndarray, starts: Any, window: int) -> np.ndarray:
+    """Imposta NaN dove la finestra non contiene 'window' valori validi."""
+    if starts.dtype == bool:
+        count = np.cumsum(starts, axis=0)
+        count[window:] -= count[:-window].copy()
+        total[count < window] = np.nan
+    else:
+        for j, start in enumerate(starts):
+            total[:start + window - 1, j] = np.nan
+    return total
+
+def _window_sums(filled: np.ndarray, starts: Any, window: int) -> np.ndarray:
+    """
+    Somme su finestra di valori senza NaN.
+    
+    Args:
+        filled: Valori con NaN sostituiti da 0
+        starts: Primo valore valido per colonna se i NaN sono solo
+            iniziali, altrimenti maschera dei valori validi
+        window: Ampiezza finestra
+        
+    Returns:
+        Somme, NaN se la finestra non contiene 'window' valori
+    """
+    csum = np.cumsum(filled, axis=0)
+    total = np.empty_like(csum)
+    total[:window] = csum[:window]
+    np.subtract(csum[window:], csum[:-window], out=total[window:])
+    return _mask_incomplete(total, starts, window)
+
+def _nan_layout(x: np.ndarray) -> Any:
+    """
+    Posizione dei NaN di ogni colonna.
+    
+    Returns:
+        (maschera dei NaN, primi validi per colonna se i NaN sono
+        solo iniziali, altrimenti maschera dei validi)
+    """
+    nan = np.isnan(x)
+    starts = np.where(nan.all(axis=0), len(x), (~nan).argmax(axis=0))
+    if nan.any() and not (nan.sum(axis=0) == starts).all():
+        return nan, ~nan
+    return nan, starts
+
+def _centered(x: np.ndarray) -> Any:
+    """
+    Valori centrati sul primo valore valido di ogni colonna.
+    
+    Le somme cumulative di valori centrati accumulano molto meno
+    errore di arrotondamento su serie lunghe (prezzi, volumi).
+    
+    Returns:
+        (valori centrati con NaN a 0, primi validi o maschera dei
+        validi per _window_sums, centro per colonna)
+    """
+    nan, starts = _nan_layout(x)
+    center = np.zeros(x.shape[1])
+    if len(x):
+        first = np.minimum(nan.argmin(axis=0), len(x) - 1)
+        center = np.nan_to_num(x[first, np.arange(x.shape[1])])
+    filled = x - center
+    filled[nan] = 0.0
+    return filled, starts, center
+
+def rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Somma mobile; NaN finché la finestra non contiene 'window' valori.
+    
+    Args:
+        x: Matrice (tempo × simbolo)
+        window: Ampiezza finestra
+        
+    Returns:
+        Matrice delle somme
+    """
+    filled, starts, center = _centered(x)
+    total = _window_sums(filled, starts, window)
+    total += window * center
+    return total
+
+def sma(x: np.ndarray, period: int) -> np.ndarray:
+    """Media mobile semplice (talib.SMA)."""
+    total = rolling_sum(x, period)
+    total /= period
+    return total
+
+def rolling_var(
+    x: np.ndarray,
+    window: int,
+    ddof: int = 0,
+    block: int = 1024
+) -> np.ndarray:
+    """
+    Varianza mobile da somme e somme dei quadrati.
+    
+    Le somme cumulative ripartono a ogni blocco di 'block' righe,
+    con valori centrati sulla media del blocco: l'errore di
+    cancellazione resta quello di un blocco anche su serie lunghe
+    con forte deriva. Le finestre a cavallo di due blocchi
+    combinano le somme parziali riportandole allo stesso centro.
+    
+    Args:
+        x: Matrice (tempo × simbolo)
+        window: Ampiezza finestra
+        ddof: Gradi di libertà sottratti al denominatore
+        block: Righe per blocco (almeno 'window')
+        
+    Returns:
+        Matrice delle varianze
+    """
+    n, m = x.shape
+    out = np.full((n, m), np.nan)
+    if n < window:
+        return out
+        
+    nan, starts = _nan_layout(x)
+    block = max(block, window)
+    blocks = -(-n // block)
+    
+    # Valori centrati per blocco (le righe NaN cadono in finestre scartate)
+    padded = np.zeros((blocks * block, m))
+    padded[:n] = x
+    offsets = np.arange(blocks) * block
+    rows = np.minimum(block, n - offsets)
+    counts = np.repeat(rows[:, np.newaxis], m, axis=1)
+    if starts.dtype == bool:
+        padded[:n][nan] = 0.0
+        counts -= np.add.reduceat(nan, offsets, axis=0)
+    else:
+        for j, start in enumerate(starts):
+            padded[:start, j] = 0.0
+            counts[:, j] -= np.clip(start - offsets, 0, rows)
+    grouped = padded.reshape(blocks, block, m)
+    centers = grouped.sum(axis=1) / np.maximum(counts, 1)
+    grouped -= centers[:, np.newaxis, :]
+    
+    s1 = np.cumsum(grouped, axis=1).reshape(-1, m)
+    np.square(grouped, out=grouped)
+    s2 = np.cumsum(grouped, axis=1).reshape(-1, m)
+    
+    # Finestre interne a un blocco: differenza delle somme cumulative
+    sum1 = np.empty((n - window + 1, m))
+    sum2 = np.empty((n - window + 1, m))
+    np.subtract(s1[window:n], s1[:n - window], out=sum1[1:])
+    np.subtract(s2[window:n], s2[:n - window], out=sum2[1:])
+    
+    # Finestre che iniziano sul bordo di un blocco
+    first = np.arange(0, n - window + 1, block)
+    sum1[first] = s1[first + window - 1]
+    sum2[first] = s2[first + window - 1]
+    
+    # Finestre a cavallo di due blocchi
+    first = np.add.outer(
+        np.arange(block, n, block),
+        np.arange(1 - window, 0)
+    ).ravel()
+    first = first[first + window - 1 < n]
+    if len(first):
+        ends = first + window - 1
+        left = first // block
+        last = left * block + block - 1
+        size = (last - first + 1)[:, np.newaxis].astype(np.float64)
+        part = s1[last] - s1[first - 1]
+        shift = centers[left] - centers[left + 1]
+        sum1[first] = part + size * shift + s1[ends]
+        sum2[first] = (
+            s2[last] - s2[first - 1]
+            + shift * (2.0 * part + size * shift)
+            + s2[ends]
+        )
+        
+    var = out[window - 1:]
+    np.square(sum1, out=var)
+    var *= -1.0 / window
+    var += sum2
+    var *= 1.0 / (window - ddof)
+    np.maximum(var, 0.0, out=var)
+    return _mask_incomplete(out, starts, window)
+
+def ema(x: np.ndarray, period: int, alpha: float = None) -> np.ndarray:
+    """
+    Media mobile esponenziale (talib.EMA).
+    
+    Il seed è la media dei primi 'period' valori validi di ogni
+    colonna. Il seed è iniettato nell'input del filtro, così tutte
+    le colonne sono filtrate con un'unica chiamata a lfilter
+    anche se iniziano in righe diverse.
+    
+    Args:
+        x: Matrice (tempo × simbolo), senza NaN dopo il primo valore valido
+        period: Periodo
+        alpha: Fattore di smoothing (default 2 / (period + 1))
+        
+    Returns:
+        Matrice delle EMA
+    """
+    if alpha is None:
+        alpha = 2.0 / (period + 1)
+        
+    n, m = x.shape
+    seed_rows = first_valid(x) + period - 1
+    cols = np.flatnonzero(seed_rows < n)
+    rows = seed_rows[cols]
+    
+    # y[t] = alpha * x[t] + (1 - alpha) * y[t-1], con y = 0 prima del seed
+    signal = np.where(np.arange(n)[:, np.newaxis] > seed_rows, x, 0.0)
+    csum = np.cumsum(np.nan_to_num(x), axis=0)
+    seed = csum[rows, cols] - np.where(
+        rows >= period,
+        csum[np.maximum(rows - period, 0), cols],
+        0.0
+    )
+    signal[rows, cols] = seed / period / alpha
+    
+    out = lfilter([alpha], [1.0, alpha - 1.0], signal, axis=0)
+    out[np.arange(n)[:, np.newaxis] < seed_rows] = np.nan
+    return out
+
+def rsi(x: np.ndarray, period: int) -> np.ndarray:
+    """RSI con medie di Wilder (talib.RSI)."""
+    delta = np.diff(x, axis=0, prepend=np.nan)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    gain[np.isnan(delta)] = np.nan
+    loss[np.isnan(delta)] = np.nan
+    
+    avg_gain = ema(gain, period, alpha=1.0 / period)
+    avg_loss = ema(loss, period, alpha=1.0 / period)
+    total = avg_gain + avg_loss
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = np.where(total != 0, 100.0 * avg_gain / total, 0.0)
+    out[np.isnan(total)] = np.nan
+    return out
+
+def macd(
+    x: np.ndarray,
+    fastperiod: int,
+    slowperiod: int,
+    signalperiod: int
+) -> Dict[str, np.ndarray]:
+    """MACD, signal e istogramma (talib.MACD)."""
+    if slowperiod < fastperiod:
+        fastperiod, slowperiod = slowperiod, fastperiod
+        
+    # talib calcola la EMA veloce partendo dallo stesso indice della lenta
+    fast_input = x.copy()
+    starts = first_valid(x)
+    skip = slowperiod - fastperiod
+    for col, start in enumerate(starts):
+        fast_input[start:start + skip, col] = np.nan
+        
+    line = ema(fast_input, fastperiod) - ema(x, slowperiod)
+    signal = ema(line, signalperiod)
+    line[np.isnan(signal)] = np.nan
+    
+    return {
+        'macd': line,
+        'macd_signal': signal,
+        'macd_hist': line - signal
+    }
+
+def bollinger(x: np.ndarray, period: int, stdev: float) -> Dict[str, np.ndarray]:
+    """Bande di Bollinger (talib.BBANDS, deviazione di popolazione)."""
+    middle = sma(x, period)
+    band = stdev * np.sqrt(rolling_var(x, period))
+    return {
+        'bb_upper': middle + band,
+        'bb_middle': middle,
+        'bb_lower': middle - band
+    }
+
+def obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """On Balance Volume (talib.OBV)."""
+    direction = np.sign(np.diff(close, axis=0, prepend=np.nan))
+    signed = np.where(np.isnan(direction), 0.0, direction * volume)
+    
+    # Il primo valore valido parte dal volume della candela
+    starts = first_valid(close)
+    cols = np.flatnonzero(starts < len(close))
+    signed[starts[cols], cols] = volume[starts[cols], cols]
+    
+    # Un NaN interno non cambia l'OBV (come talib): NaN solo prima dell'inizio
+    out = np.cumsum(np.nan_to_num(signed), axis=0)
+    out[np.arange(len(close))[:, None] < starts] = np.nan
+    return out
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True Range rispetto alla chiusura precedente (talib.TRANGE)."""
+    previous = np.full(close.shape, np.nan)
+    previous[1:] = close[:-1]
+    return np.maximum(
+        high - low,
+        np.maximum(np.abs(high - previous), np.abs(low - previous))
+    )
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    """Average True Range con medie di Wilder (talib.ATR)."""
+    return ema(true_range(high, low, close), period, alpha=1.0 / period)
+
+# Feature di forma della candela (stessi nomi delle proprietà di MarketData)
+CANDLE_SHAPE_COLUMNS = [
+    'tr',
+    'body_size',
+    'upper_shadow',
+    'lower_shadow',
+    'is_bullish',
+    'is_bearish',
+    'is_doji'
+]
+
+def candle_shape(
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    doji_ratio: float = 0.1
+) -> Dict[str, np.ndarray]:
+    """
+    Feature di forma della candela, equivalenti alle proprietà di MarketData.
+    
+    I flag sono 1.0/0.0; tutte le feature sono NaN se la candela
+    contiene NaN.
+    
+    Args:
+        open_: Aperture
+        high: Massimi
+        low: Minimi
+        close: Chiusure
+        doji_ratio: Corpo massimo di un doji rispetto al range
+        
+    Returns:
+        Feature per nome colonna
+    """
+    body = close - open_
+    span = high - low
+    top = np.maximum(open_, close)
+    bottom = np.minimum(open_, close)
+    missing = np.isnan(body) | np.isnan(span)
+    
+    features = {
+        'tr': np.maximum(span, np.maximum(np.abs(high - close), np.abs(low - close))),
+        'body_size': np.abs(body),
+        'upper_shadow': high - top,
+        'lower_shadow': bottom - low,
+        'is_bullish': (body > 0).astype(np.float64),
+        'is_bearish': (body < 0).astype(np.float64),
+        'is_doji': (np.abs(body) <= doji_ratio * span).astype(np.float64)
+    }
+    for name in ('is_bullish', 'is_bearish', 'is_doji'):
+        features[name][missing] = np.nan
+    return features
+
+def pct_change(x: np.ndarray, periods: int = 1) -> np.ndarray:
+    """Variazione percentuale su 'periods' righe."""
+    out = np.full(x.shape, np.nan)
+    out[periods:] = x[periods:] / x[:-periods] - 1.0
+    return out
+
+def log_returns(x: np.ndarray) -> np.ndarray:
+    """Log rendimenti."""
+    out = np.full(x.shape, np.nan)
+    out[1:] = np.diff(np.log(x), axis=0)
+    return out
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """Deviazione standard mobile campionaria (ddof=1, come pandas)."""
+    var = rolling_var(x, window, ddof=1)
+    return np.sqrt(var, out=var)
+
+def _sma(close, volume, periods: List[int], **kwargs: Any):
+    return {f'sma_{p}': sma(close, p) for p in periods}
+
+def _ema(close, volume, periods: List[int], **kwargs: Any):
+    return {f'ema_{p}': ema(close, p) for p in periods}
+
+def _rsi(close, volume, period: int, **kwargs: Any):
+    return {'rsi': rsi(close, period)}
+
+def _macd(close, volume, fastperiod: int, slowperiod: int, signalperiod: int, **kwargs: Any):
+    return macd(close, fastperiod, slowperiod, signalperiod)
+
+def _bollinger(close, volume, period: int, stdev: float, **kwargs: Any):
+    return bollinger(close, period, stdev)
+
+def _volume_sma(close, volume, periods: List[int], **kwargs: Any):
+    return {f'volume_sma_{p}': sma(volume, p) for p in periods}
+
+def _obv(close, volume, **kwargs: Any):
+    return {'obv': obv(close, volume)}
+
+def _returns(close, volume, **kwargs: Any):
+    return {'returns': pct_change(close)}
+
+def _log_returns(close, volume, **kwargs: Any):
+    return {'log_returns': log_returns(close)}
+
+def _volatility(close, volume, window: int, **kwargs: Any):
+    return {'volatility': rolling_std(pct_change(close), window)}
+
+def _momentum(close, volume, periods: List[int], **kwargs: Any):
+    return {f'momentum_{p}': pct_change(close, p) for p in periods}
+
+# Step del DataProcessor calcolabili su matrici (tempo × simbolo)
+VECTORIZED_INDICATORS: Dict[str, Callable[..., Dict[str, np.ndarray]]] = {
+    'sma': _sma,
+    'ema': _ema,
+    'rsi': _rsi,
+    'macd': _macd,
+    'bollinger': _bollinger,
+    'volume_sma': _volume_sma,
+    'obv': _obv,
+    'returns': _returns,
+    'log_returns': _log_returns,
+    'volatility': _volatility,
+    'momentum': _momentum
+}
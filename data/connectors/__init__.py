@@ -19,6 +19,23 @@ from .ccxt_connector import (
     CCXTConnectorFactory
 )
 
+from .replay_connector import (
+    ReplayConnector,
+    ReplayConnectorFactory,
+    CandleSource,
+    FixtureCandleSource,
+    SyntheticCandleSource,
+    LatencyProfile,
+    FaultProfile
+)
+
+from .mock_exchange import MockExchangeServer
+
+from .stream_connector import (
+    StreamingConnector,
+    StreamingConnectorFactory
+)
+
 from .rate_limiter import (
     RateLimitStrategy,
     RateLimitRule,
@@ -31,8 +48,11 @@ from .retry_handler import (
     RetryConfig,
     RetryStats,
     RetryError,
+    RetryBudget,
     RetryHandler,
     CircuitBreaker,
+    CircuitBreakerOpenError,
+    CircuitBreakerRegistry,
     RetryWithCircuitBreaker,
     retry
 )
@@ -49,6 +69,20 @@ __all__ = [
     'CCXTConnector',
     'CCXTConnectorFactory',
     
+    # Replay Connector
+    'ReplayConnector',
+    'ReplayConnectorFactory',
+    'CandleSource',
+    'FixtureCandleSource',
+    'SyntheticCandleSource',
+    'LatencyProfile',
+    'FaultProfile',
+    'MockExchangeServer',
+    
+    # Streaming Connector
+    'StreamingConnector',
+    'StreamingConnectorFactory',
+    
     # Rate Limiter
     'RateLimitStrategy',
     'RateLimitRule',
@@ -60,13 +94,17 @@ __all__ = [
     'RetryConfig',
     'RetryStats',
     'RetryError',
+    'RetryBudget',
     'RetryHandler',
     'CircuitBreaker',
+    'CircuitBreakerOpenError',
+    'CircuitBreakerRegistry',
     'RetryWithCircuitBreaker',
     'retry',
     
     # Factory functions
     'create_connector',
+    'create_stream_connector',
     'create_rate_limiter',
     'create_retry_handler'
 ]
@@ -88,8 +126,38 @@ def create_connector(
     Raises:
         ExchangeError: Se la creazione fallisce
     """
+    if exchange_id == ReplayConnector.EXCHANGE_ID:
+        return ReplayConnectorFactory.create_connector(exchange_id, config)
     return CCXTConnectorFactory.create_connector(exchange_id, config)
 
+def create_stream_connector(
+    exchange_id: str,
+    config: Dict[str, Any],
+    candle_sink=None,
+    trade_sink=None
+) -> StreamingConnector:
+    """
+    Crea un connettore WebSocket con backfill REST.
+    
+    Args:
+        exchange_id: ID dell'exchange
+        config: Configurazione connettore
+        candle_sink: Callback per le candele chiuse
+        trade_sink: Callback per i trade
+        
+    Returns:
+        Istanza configurata del connettore streaming
+        
+    Raises:
+        ExchangeError: Se l'exchange non supporta lo streaming
+    """
+    return StreamingConnectorFactory.create_connector(
+        exchange_id,
+        config,
+        candle_sink,
+        trade_sink
+    )
+
 def create_rate_limiter(
     max_requests: int,
     time_window: float,
@@ -119,7 +187,8 @@ def create_retry_handler(
     exceptions: Optional[Set[Type[Exception]]] = None,
     use_circuit_breaker: bool = True,
     failure_threshold: int = 5,
-    reset_timeout: float = 60.0
+    reset_timeout: float = 60.0,
+    half_open_max_calls: int = 1
 ) -> Union[RetryHandler, RetryWithCircuitBreaker]:
     """
     Crea un nuovo retry handler.
@@ -133,6 +202,7 @@ def create_retry_handler(
         use_circuit_breaker: Usa circuit breaker
         failure_threshold: Soglia fallimenti
         reset_timeout: Timeout reset
+        half_open_max_calls: Richieste di prova in half-open
         
     Returns:
         Istanza configurata del retry handler
@@ -149,7 +219,8 @@ def create_retry_handler(
         return RetryWithCircuitBreaker(
             config,
             failure_threshold,
-            reset_timeout
+            reset_timeout,
+            half_open_max_calls
         )
     else:
         return RetryHandler(config)
\ No newline at end of file
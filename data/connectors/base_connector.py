@@ -8,10 +8,21 @@ Implementa funzionalità comuni come rate limiting e retry.
 import time
 import logging
 import asyncio
-from typing import Dict, List, Any, Optional, Tuple
+from typing import (
+    Dict, List, Any, Optional, Tuple,
+    Callable, Awaitable, Set, Type
+)
 from datetime import datetime, timedelta
 from abc import ABC, abstractmethod
 
+from .retry_handler import (
+    CircuitBreakerRegistry,
+    RetryConfig,
+    RetryError,
+    RetryHandler,
+    RetryStrategy
+)
+
 class RateLimiter:
     """Gestisce il rate limiting delle richieste."""
     
@@ -66,54 +77,27 @@ class RateLimiter:
         """Context manager exit."""
         pass
 
-class RetryStrategy:
-    """Strategia di retry per le richieste."""
+class ExchangeError(Exception):
+    """Errore base per operazioni exchange."""
+    pass
+
+class RateLimitError(ExchangeError):
+    """Errore per superamento rate limit."""
     
     def __init__(
         self,
-        max_retries: int = 3,
-        base_delay: float = 1.0,
-        max_delay: float = 60.0,
-        exponential: bool = True
+        message: str,
+        retry_after: Optional[float] = None
     ):
         """
-        Inizializza la strategia.
+        Inizializza l'errore.
         
         Args:
-            max_retries: Massimo numero di tentativi
-            base_delay: Ritardo base in secondi
-            max_delay: Ritardo massimo in secondi
-            exponential: Usa backoff esponenziale
-        """
-        self.max_retries = max_retries
-        self.base_delay = base_delay
-        self.max_delay = max_delay
-        self.exponential = exponential
-        
-    def get_delay(self, attempt: int) -> float:
-        """
-        Calcola il ritardo per un tentativo.
-        
-        Args:
-            attempt: Numero del tentativo
-            
-        Returns:
-            Ritardo in secondi
+            message: Messaggio errore
+            retry_after: Attesa suggerita dall'exchange in secondi
         """
-        if self.exponential:
-            delay = self.base_delay * (2 ** (attempt - 1))
-        else:
-            delay = self.base_delay * attempt
-            
-        return min(delay, self.max_delay)
-
-class ExchangeError(Exception):
-    """Errore base per operazioni exchange."""
-    pass
-
-class RateLimitError(ExchangeError):
-    """Errore per superamento rate limit."""
-    pass
+        super().__init__(message)
+        self.retry_after = retry_after
 
 class AuthenticationError(ExchangeError):
     """Errore di autenticazione."""
@@ -148,12 +132,27 @@ class BaseConnector(ABC):
             time_window=config.get('time_window', 60)
         )
         
-        # Retry strategy
-        self.retry_strategy = RetryStrategy(
-            max_retries=config.get('max_retries', 3),
+        # Motore di retry unico per tutte le richieste del connettore
+        self.retry_handler = RetryHandler(RetryConfig(
+            max_attempts=config.get('max_retries', 3),
             base_delay=config.get('base_delay', 1.0),
             max_delay=config.get('max_delay', 60.0),
-            exponential=config.get('exponential_backoff', True)
+            strategy=(
+                RetryStrategy.EXPONENTIAL
+                if config.get('exponential_backoff', True)
+                else RetryStrategy.LINEAR
+            ),
+            exceptions={NetworkError, RateLimitError},
+            budget=config.get('retry_budget', 30),
+            budget_window=config.get('retry_budget_window', 60.0)
+        ))
+        
+        # Circuit breaker per (exchange, endpoint)
+        self.circuit_breakers = CircuitBreakerRegistry(
+            failure_threshold=config.get('breaker_failure_threshold', 5),
+            reset_timeout=config.get('breaker_reset_timeout', 60.0),
+            half_open_max_calls=config.get('breaker_half_open_calls', 1),
+            exceptions={NetworkError, RateLimitError}
         )
         
         # Cache
@@ -230,50 +229,83 @@ class BaseConnector(ABC):
         Raises:
             ExchangeError: Se la richiesta fallisce
         """
-        attempt = 1
-        last_error = None
-        
-        while attempt <= self.retry_strategy.max_retries:
-            try:
-                async with self.rate_limiter:
-                    response = await self._do_request(
-                        method, endpoint, params
-                    )
-                    return response
-                    
-            except Exception as e:
-                last_error = e
-                
-                # Verifica se fare retry
-                should_retry = False
-                if retry_on_errors:
-                    should_retry = any(
-                        isinstance(e, err_type)
-                        for err_type in retry_on_errors
-                    )
-                else:
-                    should_retry = isinstance(
-                        e, (NetworkError, RateLimitError)
-                    )
-                    
-                if not should_retry:
-                    break
-                    
-                # Calcola delay
-                delay = self.retry_strategy.get_delay(attempt)
-                self.logger.warning(
-                    f"Tentativo {attempt} fallito per {endpoint}. "
-                    f"Retry tra {delay}s. Errore: {str(e)}"
-                )
-                
-                await asyncio.sleep(delay)
-                attempt += 1
-                
-        # Rilancia ultimo errore
-        raise last_error or ExchangeError(
-            f"Tutti i tentativi falliti per {endpoint}"
+        return await self.with_retry(
+            self._rate_limited_request,
+            method,
+            endpoint,
+            params,
+            retry_on=set(retry_on_errors) if retry_on_errors else None,
+            endpoint=endpoint
         )
         
+    async def _rate_limited_request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """Esegue un singolo tentativo rispettando il rate limit."""
+        async with self.rate_limiter:
+            return await self._do_request(method, endpoint, params)
+            
+    async def with_retry(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        retry_on: Optional[Set[Type[Exception]]] = None,
+        endpoint: Optional[str] = None,
+        **kwargs: Any
+    ) -> Any:
+        """
+        Esegue una chiamata tramite il motore di retry del connettore.
+        
+        Se è indicato un endpoint, ogni tentativo passa dal circuit
+        breaker di (exchange, endpoint); un circuito aperto interrompe
+        subito i retry.
+        
+        Args:
+            func: Coroutine da eseguire
+            *args: Argomenti posizionali
+            retry_on: Errori su cui fare retry
+            endpoint: Endpoint per il circuit breaker
+            **kwargs: Argomenti nominali
+            
+        Returns:
+            Risultato della chiamata
+            
+        Raises:
+            ExchangeError: Ultimo errore se i tentativi si esauriscono
+            CircuitBreakerOpenError: Se il circuito è aperto
+        """
+        if endpoint:
+            breaker = self.circuit_breakers.get(self.exchange_id, endpoint)
+            args = (func,) + args
+            func = breaker.execute
+            
+        try:
+            return await self.retry_handler.call(
+                func, args, kwargs, exceptions=retry_on
+            )
+        except RetryError as e:
+            # Rilancia l'errore originale per mantenere il tipo
+            if e.last_error is not None:
+                raise e.last_error from e
+            raise ExchangeError(str(e))
+            
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Recupera statistiche di retry e latenza.
+        
+        Returns:
+            Dizionario statistiche
+        """
+        stats = self.retry_handler.stats.to_dict()
+        stats['circuit_breakers'] = {
+            endpoint: state
+            for (_, endpoint), state in self.circuit_breakers.states().items()
+        }
+        return stats
+        
     @abstractmethod
     async def _do_request(
         self,
@@ -5,15 +5,18 @@ Implementazione del connettore usando CCXT.
 Supporta multiple exchanges tramite interfaccia unificata.
 """
 
-import asyncio
+import re
+import time
 import logging
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Union, Callable, Awaitable
 from datetime import datetime
 
+import aiohttp
 import ccxt.async_support as ccxt
 from ccxt.base.errors import (
     NetworkError as CCXTNetworkError,
     RateLimitExceeded,
+    DDoSProtection,
     AuthenticationError as CCXTAuthError
 )
 
@@ -38,6 +41,9 @@ class CCXTConnector(BaseConnector):
         '1d': '1d'
     }
     
+    # Messaggio di ban IP (es. Binance: "banned until 1700000000000")
+    BAN_PATTERN = re.compile(r'banned until (\d{13})')
+    
     def __init__(
         self,
         exchange_id: str,
@@ -46,6 +52,11 @@ class CCXTConnector(BaseConnector):
         """
         Inizializza il connettore CCXT.
         
+        Ogni connettore possiede un proprio pool di connessioni HTTP
+        (keep-alive, limite connessioni, cache DNS) configurabile con
+        le chiavi 'pool_size', 'pool_size_per_host', 'dns_cache_ttl'
+        e 'keepalive_timeout'.
+        
         Args:
             exchange_id: ID dell'exchange
             config: Configurazione connettore
@@ -55,18 +66,23 @@ class CCXTConnector(BaseConnector):
         # Crea istanza CCXT
         exchange_class = getattr(ccxt, exchange_id)
         
+        # Pool HTTP dedicato all'exchange
+        self._http_session = self._create_http_session(config)
+        
         # Configura l'exchange
         exchange_config = {
             'enableRateLimit': True,
             'timeout': config.get('timeout', 30000),
-            'verbose': config.get('verbose', False)
+            'verbose': config.get('verbose', False),
+            'session': self._http_session
         }
         
         if exchange_id == 'binance':
             exchange_config['options'] = {
                 'defaultType': 'spot',
                 'fetchMarkets': {
-                    'type': 'spot'
+                    'type': 'spot',
+                    'types': ['spot']
                 },
                 'fetchOHLCV': {
                     'type': 'spot'
@@ -81,12 +97,17 @@ class CCXTConnector(BaseConnector):
             api_secret != 'your_api_secret_here'):
             exchange_config['apiKey'] = api_key
             exchange_config['secret'] = api_secret
+            
+        # Override degli endpoint (es. MockExchangeServer locale)
+        if config.get('urls'):
+            exchange_config['urls'] = config['urls']
         
         self.exchange = exchange_class(exchange_config)
         
-        # Configura rate limits
-        if hasattr(self.exchange, 'rateLimit'):
-            self.rate_limiter = self.exchange.rateLimit
+        # Intervallo minimo tra richieste dichiarato da CCXT (ms).
+        # Il budget di richieste resta quello del RateLimiter del
+        # connettore, indipendente per ogni exchange.
+        self.exchange_rate_limit = getattr(self.exchange, 'rateLimit', None)
             
         # Cache mercati e timeframe
         self._markets: Optional[Dict[str, Any]] = None
@@ -102,20 +123,14 @@ class CCXTConnector(BaseConnector):
         Raises:
             ExchangeError: Se il recupero fallisce
         """
-        try:
-            if not self._markets:
-                self._markets = await self.exchange.load_markets()
-                
-            return list(self._markets.values())
-            
-        except CCXTNetworkError as e:
-            raise NetworkError(str(e))
-        except RateLimitExceeded as e:
-            raise RateLimitError(str(e))
-        except CCXTAuthError as e:
-            raise AuthenticationError(str(e))
-        except Exception as e:
-            raise ExchangeError(str(e))
+        if not self._markets:
+            self._markets = await self.with_retry(
+                self._call,
+                self.exchange.load_markets,
+                endpoint='markets'
+            )
+            
+        return list(self._markets.values())
             
     async def fetch_ohlcv(
         self,
@@ -139,49 +154,28 @@ class CCXTConnector(BaseConnector):
         Raises:
             ExchangeError: Se il recupero fallisce
         """
-        try:
-            # Verifica supporto OHLCV
-            if not self.exchange.has['fetchOHLCV']:
-                raise ExchangeError(
-                    f"{self.exchange_id} non supporta OHLCV"
-                )
-                
-            # Mappa il timeframe al formato corretto per l'exchange
-            exchange_timeframe = self.TIMEFRAME_MAP.get(timeframe)
-            if not exchange_timeframe:
-                raise ExchangeError(
-                    f"Timeframe {timeframe} non supportato"
-                )
-            
-            # Recupera OHLCV con retry in caso di errore
-            max_retries = 3
-            retry_delay = 1  # secondi
+        # Verifica supporto OHLCV
+        if not self.exchange.has['fetchOHLCV']:
+            raise ExchangeError(
+                f"{self.exchange_id} non supporta OHLCV"
+            )
             
-            for attempt in range(max_retries):
-                try:
-                    # Usa la firma corretta del metodo fetch_ohlcv
-                    ohlcv = await self.exchange.fetch_ohlcv(
-                        symbol,
-                        exchange_timeframe,
-                        since,
-                        limit
-                    )
-                    return ohlcv
-                except (CCXTNetworkError, RateLimitExceeded) as e:
-                    if attempt == max_retries - 1:  # Ultimo tentativo
-                        raise
-                    await asyncio.sleep(retry_delay * (attempt + 1))
-            
-            return []  # Non dovrebbe mai arrivare qui
-            
-        except CCXTNetworkError as e:
-            raise NetworkError(str(e))
-        except RateLimitExceeded as e:
-            raise RateLimitError(str(e))
-        except CCXTAuthError as e:
-            raise AuthenticationError(str(e))
-        except Exception as e:
-            raise ExchangeError(str(e))
+        # Mappa il timeframe al formato corretto per l'exchange
+        exchange_timeframe = self.TIMEFRAME_MAP.get(timeframe)
+        if not exchange_timeframe:
+            raise ExchangeError(
+                f"Timeframe {timeframe} non supportato"
+            )
+        
+        return await self.with_retry(
+            self._call,
+            self.exchange.fetch_ohlcv,
+            symbol,
+            exchange_timeframe,
+            since,
+            limit,
+            endpoint='ohlcv'
+        )
             
     async def fetch_ticker(
         self,
@@ -199,18 +193,12 @@ class CCXTConnector(BaseConnector):
         Raises:
             ExchangeError: Se il recupero fallisce
         """
-        try:
-            ticker = await self.exchange.fetch_ticker(symbol)
-            return ticker
-            
-        except CCXTNetworkError as e:
-            raise NetworkError(str(e))
-        except RateLimitExceeded as e:
-            raise RateLimitError(str(e))
-        except CCXTAuthError as e:
-            raise AuthenticationError(str(e))
-        except Exception as e:
-            raise ExchangeError(str(e))
+        return await self.with_retry(
+            self._call,
+            self.exchange.fetch_ticker,
+            symbol,
+            endpoint='ticker'
+        )
             
     async def _do_request(
         self,
@@ -232,28 +220,96 @@ class CCXTConnector(BaseConnector):
         Raises:
             ExchangeError: Se la richiesta fallisce
         """
+        # Costruisci metodo CCXT
+        ccxt_method = f"{method.lower()}_{endpoint}"
+        if not hasattr(self.exchange, ccxt_method):
+            raise ExchangeError(
+                f"Metodo {ccxt_method} non supportato"
+            )
+            
+        # Esegui richiesta
+        method_func = getattr(self.exchange, ccxt_method)
         try:
-            # Costruisci metodo CCXT
-            ccxt_method = f"{method.lower()}_{endpoint}"
-            if not hasattr(self.exchange, ccxt_method):
-                raise ExchangeError(
-                    f"Metodo {ccxt_method} non supportato"
-                )
-                
-            # Esegui richiesta
-            method_func = getattr(self.exchange, ccxt_method)
-            response = await method_func(params or {})
-            
-            return response
-            
-        except CCXTNetworkError as e:
-            raise NetworkError(str(e))
-        except RateLimitExceeded as e:
-            raise RateLimitError(str(e))
-        except CCXTAuthError as e:
-            raise AuthenticationError(str(e))
+            return await method_func(params or {})
+        except Exception as e:
+            raise self._map_error(e)
+            
+    async def _call(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any
+    ) -> Any:
+        """
+        Esegue un singolo tentativo di chiamata CCXT.
+        
+        Args:
+            func: Metodo CCXT da chiamare
+            *args: Argomenti del metodo
+            
+        Returns:
+            Risultato della chiamata
+            
+        Raises:
+            ExchangeError: Errore mappato dalla gerarchia CCXT
+        """
+        try:
+            async with self.rate_limiter:
+                return await func(*args)
         except Exception as e:
-            raise ExchangeError(str(e))
+            raise self._map_error(e)
+            
+    def _map_error(self, error: Exception) -> ExchangeError:
+        """
+        Converte un errore CCXT nella gerarchia del connettore.
+        
+        Args:
+            error: Errore originale
+            
+        Returns:
+            Errore del connettore
+        """
+        if isinstance(error, ExchangeError):
+            return error
+        # DDoSProtection e RateLimitExceeded derivano da NetworkError
+        # in CCXT, vanno verificati per primi
+        if isinstance(error, (RateLimitExceeded, DDoSProtection)):
+            return RateLimitError(
+                str(error),
+                retry_after=self._get_retry_after(error)
+            )
+        if isinstance(error, CCXTNetworkError):
+            return NetworkError(str(error))
+        if isinstance(error, CCXTAuthError):
+            return AuthenticationError(str(error))
+        return ExchangeError(str(error))
+        
+    def _get_retry_after(self, error: Exception) -> Optional[float]:
+        """
+        Estrae l'attesa richiesta dall'exchange.
+        
+        Usa l'header Retry-After dell'ultima risposta oppure il
+        timestamp di fine ban presente nel messaggio (es. Binance 418).
+        
+        Args:
+            error: Errore ricevuto
+            
+        Returns:
+            Secondi di attesa o None
+        """
+        headers = getattr(self.exchange, 'last_response_headers', None) or {}
+        for key, value in headers.items():
+            if key.lower() == 'retry-after':
+                try:
+                    return float(value)
+                except (TypeError, ValueError):
+                    break
+                    
+        match = self.BAN_PATTERN.search(str(error))
+        if match:
+            banned_until = int(match.group(1)) / 1000
+            return max(0.0, banned_until - time.time())
+            
+        return None
             
     async def get_timeframes(self) -> List[str]:
         """
@@ -290,10 +346,39 @@ class CCXTConnector(BaseConnector):
         except ValueError:
             raise ExchangeError(f"Formato timeframe non valido: {timeframe}")
         
+    def _create_http_session(
+        self,
+        config: Dict[str, Any]
+    ) -> aiohttp.ClientSession:
+        """
+        Crea la sessione HTTP con pool di connessioni dedicato.
+        
+        Args:
+            config: Configurazione connettore
+            
+        Returns:
+            Sessione aiohttp configurata
+        """
+        connector = aiohttp.TCPConnector(
+            limit=config.get('pool_size', 20),
+            limit_per_host=config.get('pool_size_per_host', 0),
+            ttl_dns_cache=config.get('dns_cache_ttl', 300),
+            keepalive_timeout=config.get('keepalive_timeout', 30),
+            enable_cleanup_closed=True
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            trust_env=config.get('trust_env', False)
+        )
+        
     async def close(self) -> None:
         """Chiude il connettore e libera le risorse."""
         if self.exchange:
             await self.exchange.close()
+            
+        # La sessione è passata a CCXT, va chiusa qui
+        if self._http_session and not self._http_session.closed:
+            await self._http_session.close()
 
 class CCXTConnectorFactory:
     """Factory per creare connettori CCXT."""
@@ -327,8 +412,12 @@ class CCXTConnectorFactory:
             connector = CCXTConnector(exchange_id, config)
             
             # Verifica connessione
-            await connector.fetch_markets()
-            
+            try:
+                await connector.fetch_markets()
+            except Exception:
+                await connector.close()
+                raise
+
             return connector
             
         except Exception as e:
@@ -0,0 +1,253 @@
+"""
+Mock Exchange Server
+-----------------
+Server HTTP locale che emula un sottoinsieme delle API REST spot
+di Binance. CCXT può puntare a questo server per misurare downloader,
+retry e rate limiter senza accedere alla rete.
+"""
+
+import time
+import logging
+from typing import Dict, List, Any, Optional
+
+from aiohttp import web
+
+from .replay_connector import (
+    CandleSource,
+    SyntheticCandleSource,
+    FaultInjector,
+    LatencyProfile,
+    FaultProfile,
+    ServerRateLimit,
+    parse_timeframe
+)
+
+class MockExchangeServer:
+    """Server locale compatibile con le API pubbliche spot di Binance."""
+    
+    def __init__(
+        self,
+        source: Optional[CandleSource] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: Optional[LatencyProfile] = None,
+        faults: Optional[FaultProfile] = None,
+        rate_limit: Optional[ServerRateLimit] = None,
+        seed: int = 42
+    ):
+        """
+        Inizializza il server.
+        
+        Args:
+            source: Sorgente candele (default: sintetica)
+            host: Host di ascolto
+            port: Porta di ascolto (0 = porta libera casuale)
+            latency: Profilo di latenza
+            faults: Profilo errori
+            rate_limit: Rate limit lato server
+            seed: Seed del generatore
+        """
+        self.source = source or SyntheticCandleSource(seed=seed)
+        self.host = host
+        self.port = port
+        self.injector = FaultInjector(latency, faults, rate_limit, seed)
+        self.logger = logging.getLogger(__name__)
+        self._runner: Optional[web.AppRunner] = None
+        
+        self.app = web.Application(middlewares=[self._fault_middleware])
+        self.app.router.add_get('/api/v3/ping', self._ping)
+        self.app.router.add_get('/api/v3/time', self._time)
+        self.app.router.add_get('/api/v3/exchangeInfo', self._exchange_info)
+        self.app.router.add_get('/api/v3/klines', self._klines)
+        self.app.router.add_get('/api/v3/ticker/24hr', self._ticker)
+        
+    @property
+    def url(self) -> str:
+        """URL base del server."""
+        return f"http://{self.host}:{self.port}"
+        
+    def ccxt_config(self) -> Dict[str, Any]:
+        """
+        Configurazione connettore per puntare CCXT (binance) al server.
+        
+        Returns:
+            Dizionario da unire alla configurazione del connettore
+        """
+        api = f"{self.url}/api/v3"
+        return {
+            'urls': {
+                'api': {
+                    'public': api,
+                    'private': api,
+                    'v3': api
+                }
+            }
+        }
+        
+    async def start(self) -> None:
+        """Avvia il server."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        
+        # Recupera la porta effettiva se assegnata dal sistema
+        if self.port == 0:
+            sockets = site._server.sockets if site._server else []
+            if sockets:
+                self.port = sockets[0].getsockname()[1]
+                
+        self.logger.info(f"Mock exchange in ascolto su {self.url}")
+        
+    async def stop(self) -> None:
+        """Arresta il server."""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+            
+    async def __aenter__(self):
+        """Context manager entry."""
+        await self.start()
+        return self
+        
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        await self.stop()
+        
+    @web.middleware
+    async def _fault_middleware(self, request: web.Request, handler):
+        """Applica latenza, rate limit ed errori a ogni richiesta."""
+        failure = await self.injector.before_request()
+        if failure is not None:
+            status, retry_after = failure
+            headers = {}
+            if retry_after is not None:
+                headers['Retry-After'] = str(max(1, int(round(retry_after))))
+            if status == 429:
+                return web.json_response(
+                    {'code': -1003, 'msg': 'Too many requests.'},
+                    status=429,
+                    headers=headers
+                )
+            return web.json_response(
+                {'code': -1001, 'msg': 'Service unavailable.'},
+                status=status
+            )
+        return await handler(request)
+        
+    async def _ping(self, request: web.Request) -> web.Response:
+        """Endpoint /ping."""
+        return web.json_response({})
+        
+    async def _time(self, request: web.Request) -> web.Response:
+        """Endpoint /time."""
+        return web.json_response({'serverTime': int(time.time() * 1000)})
+        
+    async def _exchange_info(self, request: web.Request) -> web.Response:
+        """Endpoint /exchangeInfo con i simboli della sorgente."""
+        symbols = []
+        for symbol in self.source.symbols():
+            quote = 'USDT' if symbol.endswith('USDT') else symbol[-3:]
+            symbols.append({
+                'symbol': symbol,
+                'status': 'TRADING',
+                'baseAsset': symbol[:-len(quote)],
+                'baseAssetPrecision': 8,
+                'quoteAsset': quote,
+                'quotePrecision': 8,
+                'quoteAssetPrecision': 8,
+                'orderTypes': ['LIMIT', 'MARKET'],
+                'isSpotTradingAllowed': True,
+                'isMarginTradingAllowed': False,
+                'permissions': ['SPOT'],
+                'filters': [
+                    {
+                        'filterType': 'PRICE_FILTER',
+                        'minPrice': '0.01',
+                        'maxPrice': '1000000.00',
+                        'tickSize': '0.01'
+                    },
+                    {
+                        'filterType': 'LOT_SIZE',
+                        'minQty': '0.00001',
+                        'maxQty': '9000.00',
+                        'stepSize': '0.00001'
+                    }
+                ]
+            })
+            
+        return web.json_response({
+            'timezone': 'UTC',
+            'serverTime': int(time.time() * 1000),
+            'rateLimits': [],
+            'exchangeFilters': [],
+            'symbols': symbols
+        })
+        
+    async def _klines(self, request: web.Request) -> web.Response:
+        """Endpoint /klines."""
+        symbol = request.query.get('symbol', '')
+        interval = request.query.get('interval', '1m')
+        since = request.query.get('startTime')
+        limit = min(int(request.query.get('limit', 500)), 1000)
+        
+        try:
+            candles = self.source.get_candles(
+                symbol,
+                interval,
+                int(since) if since is not None else None,
+                limit
+            )
+        except Exception as e:
+            return web.json_response(
+                {'code': -1121, 'msg': str(e)},
+                status=400
+            )
+            
+        candles = self.injector.truncate_page(candles)
+        return web.json_response([
+            self._format_kline(candle, interval)
+            for candle in candles
+        ])
+        
+    async def _ticker(self, request: web.Request) -> web.Response:
+        """Endpoint /ticker/24hr."""
+        symbol = request.query.get('symbol', '')
+        try:
+            candles = self.source.get_candles(symbol, '1m', None, 1)
+        except Exception as e:
+            return web.json_response(
+                {'code': -1121, 'msg': str(e)},
+                status=400
+            )
+            
+        close = candles[-1][4] if candles else 0.0
+        now = int(time.time() * 1000)
+        return web.json_response({
+            'symbol': symbol,
+            'lastPrice': str(close),
+            'openPrice': str(candles[-1][1] if candles else 0.0),
+            'highPrice': str(candles[-1][2] if candles else 0.0),
+            'lowPrice': str(candles[-1][3] if candles else 0.0),
+            'volume': str(candles[-1][5] if candles else 0.0),
+            'openTime': now - 24 * 60 * 60 * 1000,
+            'closeTime': now
+        })
+        
+    def _format_kline(self, candle: List[float], interval: str) -> List[Any]:
+        """Converte una candela nel formato kline di Binance."""
+        open_time = int(candle[0])
+        return [
+            open_time,
+            str(candle[1]),
+            str(candle[2]),
+            str(candle[3]),
+            str(candle[4]),
+            str(candle[5]),
+            open_time + parse_timeframe(interval) - 1,
+            str(candle[4] * candle[5]),
+            100,
+            str(candle[5] / 2),
+            str(candle[4] * candle[5] / 2),
+            '0'
+        ]
@@ -0,0 +1,615 @@
+"""
+Replay Exchange Connector
+----------------------
+Connettore offline per test di carico deterministici.
+Serve OHLCV da fixture registrate o da generatori sintetici con
+latenza, rate limit ed errori iniettati in modo riproducibile.
+"""
+
+import os
+import json
+import math
+import time
+import bisect
+import random
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+from dataclasses import dataclass, field
+from collections import deque
+from abc import ABC, abstractmethod
+
+from .base_connector import (
+    BaseConnector,
+    ExchangeError,
+    RateLimitError,
+    NetworkError
+)
+
+@dataclass
+class LatencyProfile:
+    """Distribuzione della latenza simulata (secondi)."""
+    distribution: str = "fixed"  # fixed, uniform, normal, lognormal
+    mean: float = 0.0
+    stddev: float = 0.0
+    minimum: float = 0.0
+    maximum: Optional[float] = None
+    
+    def sample(self, rng: random.Random) -> float:
+        """
+        Estrae una latenza.
+        
+        Args:
+            rng: Generatore casuale
+            
+        Returns:
+            Latenza in secondi
+        """
+        if self.distribution == "uniform":
+            value = rng.uniform(
+                max(0.0, self.mean - self.stddev),
+                self.mean + self.stddev
+            )
+        elif self.distribution == "normal":
+            value = rng.gauss(self.mean, self.stddev)
+        elif self.distribution == "lognormal":
+            if self.mean <= 0:
+                value = 0.0
+            else:
+                # Parametri della normale sottostante da media e deviazione
+                variance = self.stddev ** 2
+                sigma2 = math.log(1 + variance / self.mean ** 2)
+                mu = math.log(self.mean) - sigma2 / 2
+                value = rng.lognormvariate(mu, math.sqrt(sigma2))
+        else:
+            value = self.mean
+            
+        value = max(self.minimum, value)
+        if self.maximum is not None:
+            value = min(self.maximum, value)
+        return value
+
+@dataclass
+class FaultProfile:
+    """Errori iniettati nelle risposte simulate."""
+    rate_limit_rate: float = 0.0  # probabilità di 429
+    server_error_rate: float = 0.0  # probabilità di 5xx
+    partial_page_rate: float = 0.0  # probabilità di pagina troncata
+    retry_after: Optional[float] = 1.0  # Retry-After sui 429
+
+@dataclass
+class ServerRateLimit:
+    """Rate limit applicato lato "server"."""
+    max_requests: int = 1200
+    time_window: float = 60.0
+    _requests: deque = field(default_factory=deque, repr=False)
+    
+    def check(self) -> Optional[float]:
+        """
+        Registra una richiesta.
+        
+        Returns:
+            Secondi di attesa se il limite è superato, altrimenti None
+        """
+        now = time.monotonic()
+        while self._requests and now - self._requests[0] > self.time_window:
+            self._requests.popleft()
+            
+        if len(self._requests) >= self.max_requests:
+            return self.time_window - (now - self._requests[0])
+            
+        self._requests.append(now)
+        return None
+
+def parse_timeframe(timeframe: str) -> int:
+    """
+    Converte timeframe in millisecondi.
+    
+    Args:
+        timeframe: Timeframe (es. 1m, 1h, 1d)
+        
+    Returns:
+        Millisecondi
+    """
+    units = {
+        'm': 60 * 1000,
+        'h': 60 * 60 * 1000,
+        'd': 24 * 60 * 60 * 1000,
+        'w': 7 * 24 * 60 * 60 * 1000
+    }
+    
+    amount = int(timeframe[:-1])
+    unit = timeframe[-1]
+    
+    if unit not in units:
+        raise ValueError(f"Timeframe non valido: {timeframe}")
+        
+    return amount * units[unit]
+
+class CandleSource(ABC):
+    """Sorgente di candele per il replay."""
+    
+    @abstractmethod
+    def symbols(self) -> List[str]:
+        """
+        Recupera simboli disponibili.
+        
+        Returns:
+            Lista dei simboli
+        """
+        pass
+        
+    @abstractmethod
+    def get_candles(
+        self,
+        symbol: str,
+        timeframe: str,
+        since: Optional[int] = None,
+        limit: int = 500
+    ) -> List[List[float]]:
+        """
+        Recupera candele OHLCV.
+        
+        Args:
+            symbol: Simbolo trading
+            timeframe: Timeframe
+            since: Timestamp iniziale (ms)
+            limit: Numero massimo candele
+            
+        Returns:
+            Lista di candle [timestamp, open, high, low, close, volume]
+        """
+        pass
+
+class FixtureCandleSource(CandleSource):
+    """
+    Candele registrate su file.
+    
+    Ogni fixture è un file JSON '<SYMBOL>_<timeframe>.json' contenente
+    una lista di candle [timestamp, open, high, low, close, volume].
+    """
+    
+    def __init__(
+        self,
+        fixtures_dir: Optional[str] = None,
+        data: Optional[Dict[Tuple[str, str], List[List[float]]]] = None
+    ):
+        """
+        Inizializza la sorgente.
+        
+        Args:
+            fixtures_dir: Directory delle fixture
+            data: Candele già caricate per (simbolo, timeframe)
+        """
+        self._data: Dict[Tuple[str, str], List[List[float]]] = {}
+        self._index: Dict[Tuple[str, str], List[int]] = {}
+        
+        if fixtures_dir:
+            self._load_dir(fixtures_dir)
+        for key, candles in (data or {}).items():
+            self.add(key[0], key[1], candles)
+            
+    def _load_dir(self, fixtures_dir: str) -> None:
+        """Carica tutte le fixture di una directory."""
+        for filename in sorted(os.listdir(fixtures_dir)):
+            if not filename.endswith('.json'):
+                continue
+            symbol, _, timeframe = filename[:-5].rpartition('_')
+            if not symbol:
+                continue
+            with open(os.path.join(fixtures_dir, filename), 'r') as f:
+                self.add(symbol, timeframe, json.load(f))
+                
+    def add(
+        self,
+        symbol: str,
+        timeframe: str,
+        candles: List[List[float]]
+    ) -> None:
+        """
+        Aggiunge candele alla sorgente.
+        
+        Args:
+            symbol: Simbolo trading
+            timeframe: Timeframe
+            candles: Candele OHLCV
+        """
+        candles = sorted(candles, key=lambda c: c[0])
+        self._data[(symbol, timeframe)] = candles
+        self._index[(symbol, timeframe)] = [int(c[0]) for c in candles]
+        
+    def symbols(self) -> List[str]:
+        return sorted({symbol for symbol, _ in self._data})
+        
+    def get_candles(
+        self,
+        symbol: str,
+        timeframe: str,
+        since: Optional[int] = None,
+        limit: int = 500
+    ) -> List[List[float]]:
+        candles = self._data.get((symbol, timeframe))
+        if candles is None:
+            raise ExchangeError(
+                f"Fixture mancante per {symbol} {timeframe}"
+            )
+            
+        start = 0
+        if since is not None:
+            start = bisect.bisect_left(self._index[(symbol, timeframe)], since)
+        return [list(c) for c in candles[start:start + limit]]
+
+class SyntheticCandleSource(CandleSource):
+    """
+    Candele sintetiche deterministiche.
+    
+    Ogni candela dipende solo da (seed, simbolo, timeframe, indice),
+    quindi la paginazione restituisce sempre gli stessi dati.
+    """
+    
+    def __init__(
+        self,
+        symbols: Optional[List[str]] = None,
+        seed: int = 42,
+        base_price: float = 100.0,
+        volatility: float = 0.002,
+        end_time: Optional[int] = None
+    ):
+        """
+        Inizializza la sorgente.
+        
+        Args:
+            symbols: Simboli generati
+            seed: Seed del generatore
+            base_price: Prezzo medio
+            volatility: Ampiezza del rumore per candela
+            end_time: Ultimo timestamp servito (ms, default: ora)
+        """
+        self._symbols = symbols or ['BTCUSDT', 'ETHUSDT', 'BNBUSDT']
+        self.seed = seed
+        self.base_price = base_price
+        self.volatility = volatility
+        self.end_time = end_time
+        
+    def symbols(self) -> List[str]:
+        return list(self._symbols)
+        
+    def _noise(self, symbol: str, timeframe: str, index: int) -> Tuple[float, float, float]:
+        """Rumore deterministico per una candela."""
+        rng = random.Random(f"{self.seed}:{symbol}:{timeframe}:{index}")
+        return rng.gauss(0, 1), rng.random(), rng.random()
+        
+    def _close(self, symbol: str, timeframe: str, index: int) -> float:
+        """Prezzo di chiusura della candela di indice dato."""
+        offset = (sum(map(ord, symbol)) % 97) / 97
+        trend = 1 + 0.1 * math.sin(index / 500 + offset * 2 * math.pi)
+        noise, _, _ = self._noise(symbol, timeframe, index)
+        price = self.base_price * (1 + offset) * trend
+        return price * (1 + noise * self.volatility)
+        
+    def get_candles(
+        self,
+        symbol: str,
+        timeframe: str,
+        since: Optional[int] = None,
+        limit: int = 500
+    ) -> List[List[float]]:
+        if symbol not in self._symbols:
+            raise ExchangeError(f"Simbolo {symbol} non disponibile")
+            
+        period = parse_timeframe(timeframe)
+        end_time = self.end_time or int(time.time() * 1000)
+        last_index = end_time // period - 1  # solo candele chiuse
+        
+        first_index = last_index - limit + 1
+        if since is not None:
+            first_index = -(-since // period)
+            
+        candles = []
+        for index in range(first_index, min(first_index + limit, last_index + 1)):
+            close = self._close(symbol, timeframe, index)
+            open_price = self._close(symbol, timeframe, index - 1)
+            _, up, down = self._noise(symbol, timeframe, index)
+            spread = max(open_price, close) * self.volatility
+            candles.append([
+                index * period,
+                open_price,
+                max(open_price, close) + up * spread,
+                min(open_price, close) - down * spread,
+                close,
+                1000.0 * (1 + up)
+            ])
+        return candles
+
+class FaultInjector:
+    """Applica latenza, rate limit ed errori alle richieste simulate."""
+    
+    def __init__(
+        self,
+        latency: Optional[LatencyProfile] = None,
+        faults: Optional[FaultProfile] = None,
+        rate_limit: Optional[ServerRateLimit] = None,
+        seed: int = 42
+    ):
+        """
+        Inizializza l'injector.
+        
+        Args:
+            latency: Profilo di latenza
+            faults: Profilo errori
+            rate_limit: Rate limit lato server
+            seed: Seed del generatore
+        """
+        self.latency = latency or LatencyProfile()
+        self.faults = faults or FaultProfile()
+        self.rate_limit = rate_limit
+        self.rng = random.Random(seed)
+        self.stats = {
+            'requests': 0,
+            'rate_limited': 0,
+            'server_errors': 0,
+            'partial_pages': 0
+        }
+        
+    async def before_request(self) -> Optional[Tuple[int, Optional[float]]]:
+        """
+        Simula latenza ed errori prima della risposta.
+        
+        Returns:
+            (status, retry_after) se la richiesta deve fallire, altrimenti None
+        """
+        self.stats['requests'] += 1
+        
+        delay = self.latency.sample(self.rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+            
+        if self.rate_limit is not None:
+            wait = self.rate_limit.check()
+            if wait is not None:
+                self.stats['rate_limited'] += 1
+                return 429, wait
+                
+        roll = self.rng.random()
+        if roll < self.faults.rate_limit_rate:
+            self.stats['rate_limited'] += 1
+            return 429, self.faults.retry_after
+        if roll < self.faults.rate_limit_rate + self.faults.server_error_rate:
+            self.stats['server_errors'] += 1
+            return 503, None
+            
+        return None
+        
+    def truncate_page(self, candles: List[List[float]]) -> List[List[float]]:
+        """
+        Tronca la pagina con la probabilità configurata.
+        
+        Args:
+            candles: Pagina completa
+            
+        Returns:
+            Pagina eventualmente troncata
+        """
+        if len(candles) > 1 and self.rng.random() < self.faults.partial_page_rate:
+            self.stats['partial_pages'] += 1
+            return candles[:self.rng.randint(1, len(candles) - 1)]
+        return candles
+
+class ReplayConnector(BaseConnector):
+    """Connettore che riproduce dati registrati o sintetici."""
+    
+    EXCHANGE_ID = 'replay'
+    
+    def __init__(
+        self,
+        exchange_id: str,
+        config: Dict[str, Any],
+        source: Optional[CandleSource] = None
+    ):
+        """
+        Inizializza il connettore replay.
+        
+        Chiavi di configurazione: 'fixtures_dir' (altrimenti dati
+        sintetici), 'symbols', 'seed', 'latency' e 'faults' (dizionari
+        per LatencyProfile e FaultProfile), 'server_max_requests' e
+        'server_time_window' per il rate limit simulato.
+        
+        Args:
+            exchange_id: ID dell'exchange
+            config: Configurazione connettore
+            source: Sorgente candele esplicita
+        """
+        super().__init__(exchange_id, config)
+        self.logger = logging.getLogger(f"connector.{exchange_id}")
+        
+        seed = config.get('seed', 42)
+        if source is None:
+            if config.get('fixtures_dir'):
+                source = FixtureCandleSource(config['fixtures_dir'])
+            else:
+                source = SyntheticCandleSource(
+                    symbols=config.get('symbols'),
+                    seed=seed,
+                    end_time=config.get('end_time')
+                )
+        self.source = source
+        
+        rate_limit = None
+        if config.get('server_max_requests'):
+            rate_limit = ServerRateLimit(
+                config['server_max_requests'],
+                config.get('server_time_window', 60.0)
+            )
+        self.injector = FaultInjector(
+            latency=LatencyProfile(**config.get('latency', {})),
+            faults=FaultProfile(**config.get('faults', {})),
+            rate_limit=rate_limit,
+            seed=seed
+        )
+        
+    async def fetch_markets(self) -> List[Dict[str, Any]]:
+        """
+        Recupera informazioni sui mercati disponibili.
+        
+        Returns:
+            Lista dei mercati
+        """
+        return await self.with_retry(
+            self._serve, 'markets', endpoint='markets'
+        )
+        
+    async def fetch_ohlcv(
+        self,
+        symbol: str,
+        timeframe: str,
+        since: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[List[float]]:
+        """
+        Recupera dati OHLCV.
+        
+        Args:
+            symbol: Simbolo trading
+            timeframe: Timeframe
+            since: Timestamp iniziale
+            limit: Limite candle
+            
+        Returns:
+            Lista di candle OHLCV
+        """
+        return await self.with_retry(
+            self._serve,
+            'ohlcv',
+            {
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'since': since,
+                'limit': limit or 500
+            },
+            endpoint='ohlcv'
+        )
+        
+    async def fetch_ticker(
+        self,
+        symbol: str
+    ) -> Dict[str, Any]:
+        """
+        Recupera ticker corrente.
+        
+        Args:
+            symbol: Simbolo trading
+            
+        Returns:
+            Dati ticker
+        """
+        return await self.with_retry(
+            self._serve, 'ticker', {'symbol': symbol}, endpoint='ticker'
+        )
+        
+    async def _do_request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        Esegue la richiesta simulata.
+        
+        Args:
+            method: Metodo HTTP
+            endpoint: Endpoint (markets, ohlcv, ticker)
+            params: Parametri richiesta
+            
+        Returns:
+            Risposta simulata
+        """
+        return await self._serve(endpoint, params)
+        
+    async def _serve(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        Serve una richiesta applicando latenza ed errori.
+        
+        Args:
+            endpoint: Endpoint richiesto
+            params: Parametri richiesta
+            
+        Returns:
+            Risposta simulata
+            
+        Raises:
+            RateLimitError: Per 429 simulati
+            NetworkError: Per 5xx simulati
+        """
+        params = params or {}
+        
+        async with self.rate_limiter:
+            failure = await self.injector.before_request()
+            
+        if failure is not None:
+            status, retry_after = failure
+            if status == 429:
+                raise RateLimitError(
+                    f"{self.exchange_id} 429 Too Many Requests",
+                    retry_after=retry_after
+                )
+            raise NetworkError(f"{self.exchange_id} {status} Service Unavailable")
+            
+        if endpoint == 'markets':
+            return [
+                {'id': s, 'symbol': s, 'active': True}
+                for s in self.source.symbols()
+            ]
+        if endpoint == 'ohlcv':
+            candles = self.source.get_candles(
+                params['symbol'],
+                params['timeframe'],
+                params.get('since'),
+                params.get('limit', 500)
+            )
+            return self.injector.truncate_page(candles)
+        if endpoint == 'ticker':
+            candles = self.source.get_candles(params['symbol'], '1m', None, 1)
+            last = candles[-1][4] if candles else None
+            return {
+                'symbol': params['symbol'],
+                'timestamp': candles[-1][0] if candles else None,
+                'last': last,
+                'close': last
+            }
+            
+        raise ExchangeError(f"Endpoint {endpoint} non supportato")
+        
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Recupera statistiche di retry, latenza ed errori iniettati.
+        
+        Returns:
+            Dizionario statistiche
+        """
+        stats = super().get_stats()
+        stats['injected'] = dict(self.injector.stats)
+        return stats
+
+class ReplayConnectorFactory:
+    """Factory per creare connettori replay."""
+    
+    @staticmethod
+    async def create_connector(
+        exchange_id: str,
+        config: Dict[str, Any]
+    ) -> ReplayConnector:
+        """
+        Crea un nuovo connettore replay.
+        
+        Args:
+            exchange_id: ID dell'exchange
+            config: Configurazione connettore
+            
+        Returns:
+            Istanza di ReplayConnector
+        """
+        return ReplayConnector(exchange_id, config)
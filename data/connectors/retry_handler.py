@@ -9,10 +9,12 @@ import time
 import random
 import logging
 import asyncio
+import threading
 from typing import (
     TypeVar, Callable, Awaitable, Optional,
-    List, Dict, Any, Type, Union, Set
+    List, Dict, Any, Type, Union, Set, Tuple, Deque
 )
+from collections import deque
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
@@ -36,6 +38,9 @@ class RetryConfig:
     jitter: bool = True
     strategy: RetryStrategy = RetryStrategy.EXPONENTIAL
     exceptions: Set[Type[Exception]] = None
+    budget: Optional[int] = None  # retry massimi per finestra
+    budget_window: float = 60.0  # finestra budget in secondi
+    respect_retry_after: bool = True
 
 class RetryStats:
     """Statistiche dei retry."""
@@ -47,6 +52,11 @@ class RetryStats:
         self.total_delay = 0.0
         self.last_retry = None
         self.last_error = None
+        self.total_calls = 0
+        self.failed_calls = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.budget_exhausted = 0
         
     def retry_attempted(self, success: bool, delay: float):
         """Aggiorna statistiche retry."""
@@ -58,6 +68,14 @@ class RetryStats:
         self.total_delay += delay
         self.last_retry = datetime.utcnow()
         
+    def call_completed(self, latency: float, success: bool):
+        """Aggiorna statistiche latenza di un tentativo."""
+        self.total_calls += 1
+        if not success:
+            self.failed_calls += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        
     @property
     def success_rate(self) -> float:
         """Calcola tasso di successo."""
@@ -71,6 +89,30 @@ class RetryStats:
         if self.total_retries == 0:
             return 0.0
         return self.total_delay / self.total_retries
+        
+    @property
+    def average_latency(self) -> float:
+        """Calcola latenza media per tentativo."""
+        if self.total_calls == 0:
+            return 0.0
+        return self.total_latency / self.total_calls
+        
+    def to_dict(self) -> Dict[str, Any]:
+        """Esporta le statistiche."""
+        return {
+            'total_calls': self.total_calls,
+            'failed_calls': self.failed_calls,
+            'total_retries': self.total_retries,
+            'successful_retries': self.successful_retries,
+            'failed_retries': self.failed_retries,
+            'budget_exhausted': self.budget_exhausted,
+            'success_rate': self.success_rate,
+            'average_delay': self.average_delay,
+            'average_latency': self.average_latency,
+            'max_latency': self.max_latency,
+            'last_retry': self.last_retry,
+            'last_error': str(self.last_error) if self.last_error else None
+        }
 
 class RetryError(Exception):
     """Errore dopo tutti i tentativi falliti."""
@@ -85,8 +127,71 @@ class RetryError(Exception):
         self.last_error = last_error
         self.attempts = attempts
 
+class RetryBudget:
+    """Budget di retry su finestra temporale scorrevole."""
+    
+    def __init__(self, max_retries: int, window: float):
+        """
+        Inizializza il budget.
+        
+        Args:
+            max_retries: Retry consentiti nella finestra
+            window: Finestra in secondi
+        """
+        self.max_retries = max_retries
+        self.window = window
+        self._retries: Deque[float] = deque()
+        
+    def try_acquire(self) -> bool:
+        """
+        Consuma un retry dal budget.
+        
+        Returns:
+            True se il retry è consentito
+        """
+        now = time.monotonic()
+        while self._retries and now - self._retries[0] > self.window:
+            self._retries.popleft()
+            
+        if len(self._retries) >= self.max_retries:
+            return False
+            
+        self._retries.append(now)
+        return True
+        
+    @property
+    def remaining(self) -> int:
+        """Retry ancora disponibili nella finestra."""
+        now = time.monotonic()
+        used = sum(1 for ts in self._retries if now - ts <= self.window)
+        return max(0, self.max_retries - used)
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """
+    Estrae l'attesa suggerita dal server (Retry-After, ban).
+    
+    Args:
+        error: Errore ricevuto
+        
+    Returns:
+        Secondi di attesa suggeriti o None
+    """
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        return None
+
 class RetryHandler:
-    """Gestore dei retry."""
+    """
+    Gestore dei retry.
+    
+    Motore unico di retry usato da tutti i connettori: backoff con
+    jitter, rispetto di Retry-After e dei ban dell'exchange, budget
+    di retry per finestra temporale e statistiche di latenza.
+    """
     
     def __init__(
         self,
@@ -100,6 +205,10 @@ class RetryHandler:
         """
         self.config = config or RetryConfig()
         self.stats = RetryStats()
+        self.budget = (
+            RetryBudget(self.config.budget, self.config.budget_window)
+            if self.config.budget is not None else None
+        )
         self.logger = logging.getLogger(__name__)
         
     async def execute(
@@ -122,41 +231,97 @@ class RetryHandler:
         Raises:
             RetryError: Se tutti i tentativi falliscono
         """
+        return await self.call(func, args, kwargs)
+        
+    async def call(
+        self,
+        func: Callable[..., Awaitable[T]],
+        args: Tuple[Any, ...] = (),
+        kwargs: Optional[Dict[str, Any]] = None,
+        exceptions: Optional[Set[Type[Exception]]] = None
+    ) -> T:
+        """
+        Esegue una funzione con retry ed eccezioni personalizzate.
+        
+        Args:
+            func: Funzione da eseguire
+            args: Argomenti posizionali
+            kwargs: Argomenti nominali
+            exceptions: Eccezioni su cui fare retry (default da config)
+            
+        Returns:
+            Risultato della funzione
+            
+        Raises:
+            RetryError: Se i tentativi o il budget si esauriscono
+        """
+        kwargs = kwargs or {}
+        retry_on = exceptions or self.config.exceptions
         attempt = 1
         last_error = None
+        delay = 0.0
         
         while attempt <= self.config.max_attempts:
+            started = time.monotonic()
             try:
                 result = await func(*args, **kwargs)
+                self.stats.call_completed(time.monotonic() - started, True)
                 
-                # Aggiorna statistiche successo
+                # Ogni retry è contato una volta, con il suo esito
                 if attempt > 1:
-                    self.stats.retry_attempted(True, 0)
+                    self.stats.retry_attempted(True, delay)
                     
                 return result
                 
             except Exception as e:
+                self.stats.call_completed(time.monotonic() - started, False)
+                if attempt > 1:
+                    self.stats.retry_attempted(False, delay)
                 last_error = e
+                self.stats.last_error = last_error
                 
                 # Verifica se fare retry
-                if self.config.exceptions and not any(
-                    isinstance(e, exc) for exc in self.config.exceptions
+                if retry_on and not any(
+                    isinstance(e, exc) for exc in retry_on
                 ):
                     raise
                     
-                # Calcola delay
+                if attempt >= self.config.max_attempts:
+                    break
+                    
+                # Calcola delay, rispettando i suggerimenti del server
                 delay = self._calculate_delay(attempt)
-                
+                retry_after = (
+                    get_retry_after(e)
+                    if self.config.respect_retry_after else None
+                )
+                if retry_after is not None:
+                    if retry_after > self.config.max_delay:
+                        # Ban o attesa troppo lunga: meglio fallire subito
+                        # che bloccare la coroutine per minuti
+                        raise RetryError(
+                            f"Attesa richiesta dal server troppo lunga: "
+                            f"{retry_after:.1f}s",
+                            last_error,
+                            attempt
+                        )
+                    delay = max(delay, retry_after)
+                    
+                # Verifica budget
+                if self.budget and not self.budget.try_acquire():
+                    self.stats.budget_exhausted += 1
+                    raise RetryError(
+                        "Budget di retry esaurito",
+                        last_error,
+                        attempt
+                    )
+                    
                 # Log errore
                 self.logger.warning(
                     f"Tentativo {attempt} fallito. "
-                    f"Retry tra {delay}s. Errore: {str(e)}"
+                    f"Retry tra {delay:.2f}s. Errore: {str(e)}"
                 )
                 
-                # Aggiorna statistiche
-                self.stats.retry_attempted(False, delay)
-                self.stats.last_error = last_error
-                
                 # Attendi prima del retry
                 await asyncio.sleep(delay)
                 attempt += 1
@@ -165,9 +330,21 @@ class RetryHandler:
         raise RetryError(
             f"Tutti i {self.config.max_attempts} tentativi falliti",
             last_error,
-            attempt - 1
+            attempt
         )
         
+    def get_delay(self, attempt: int) -> float:
+        """
+        Calcola il backoff per un tentativo (es. riconnessioni).
+        
+        Args:
+            attempt: Numero del tentativo
+            
+        Returns:
+            Delay in secondi
+        """
+        return self._calculate_delay(attempt)
+        
     def _calculate_delay(self, attempt: int) -> float:
         """
         Calcola delay per un tentativo.
@@ -247,13 +424,27 @@ def retry(
         return wrapper
     return decorator
 
+class CircuitBreakerOpenError(Exception):
+    """Errore per circuito aperto."""
+    pass
+
 class CircuitBreaker:
-    """Implementazione Circuit Breaker."""
+    """
+    Implementazione Circuit Breaker.
+    
+    Il lock è usato solo per le transizioni di stato: nel caso normale
+    (circuito chiuso, nessun fallimento) le chiamate non si serializzano.
+    In half-open sono ammesse al massimo half_open_max_calls richieste
+    di prova contemporanee.
+    """
     
     def __init__(
         self,
         failure_threshold: int = 5,
-        reset_timeout: float = 60.0
+        reset_timeout: float = 60.0,
+        half_open_max_calls: int = 1,
+        exceptions: Optional[Set[Type[Exception]]] = None,
+        name: Optional[str] = None
     ):
         """
         Inizializza il circuit breaker.
@@ -261,13 +452,22 @@ class CircuitBreaker:
         Args:
             failure_threshold: Soglia fallimenti
             reset_timeout: Timeout reset in secondi
+            half_open_max_calls: Richieste di prova in half-open
+            exceptions: Eccezioni conteggiate come fallimento (tutte se None)
+            name: Nome del circuito per i log
         """
         self.failure_threshold = failure_threshold
         self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.exceptions = tuple(exceptions) if exceptions else None
+        self.name = name or "default"
         self.failures = 0
         self.last_failure = None
         self.state = "closed"
-        self._lock = asyncio.Lock()
+        self._half_open_calls = 0
+        self._half_open_successes = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
         
     async def execute(
         self,
@@ -287,35 +487,98 @@ class CircuitBreaker:
             Risultato della funzione
             
         Raises:
-            Exception: Se il circuito è aperto
+            CircuitBreakerOpenError: Se il circuito è aperto
+        """
+        probe = self._before_call()
+        
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            self._on_failure(e)
+            raise
+        except BaseException:
+            # Prova annullata (es. CancelledError): conta come fallimento,
+            # altrimenti lo slot di prova resterebbe occupato
+            if probe:
+                self._record_failure()
+            raise
+            
+        self._on_success()
+        return result
+        
+    def _before_call(self) -> bool:
+        """
+        Verifica lo stato prima della chiamata.
+        
+        Returns:
+            True se la chiamata occupa uno slot di prova in half-open
         """
-        async with self._lock:
+        # Percorso veloce senza lock
+        if self.state == "closed":
+            return False
+            
+        with self._lock:
             if self.state == "open":
-                if self._should_reset():
-                    self.state = "half-open"
-                else:
-                    raise Exception("Circuit breaker aperto")
-                    
-            try:
-                result = await func(*args, **kwargs)
+                if not self._should_reset():
+                    raise CircuitBreakerOpenError(
+                        f"Circuit breaker aperto: {self.name}"
+                    )
+                self.state = "half-open"
+                self._half_open_calls = 0
+                self._half_open_successes = 0
+                self.logger.info(f"Circuit breaker half-open: {self.name}")
                 
-                if self.state == "half-open":
+            if self.state == "half-open":
+                if self._half_open_calls >= self.half_open_max_calls:
+                    raise CircuitBreakerOpenError(
+                        f"Circuit breaker in prova: {self.name}"
+                    )
+                self._half_open_calls += 1
+                return True
+        return False
+        
+    def _on_success(self) -> None:
+        """Aggiorna lo stato dopo una chiamata riuscita."""
+        # Percorso veloce senza lock
+        if self.state == "closed" and self.failures == 0:
+            return
+            
+        with self._lock:
+            if self.state == "half-open":
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
                     self.state = "closed"
                     self.failures = 0
-                    
-                return result
+                    self.logger.info(f"Circuit breaker chiuso: {self.name}")
+            elif self.state == "closed":
+                self.failures = 0
                 
-            except Exception as e:
-                self.failures += 1
-                self.last_failure = datetime.utcnow()
-                
-                if (
-                    self.failures >= self.failure_threshold or
-                    self.state == "half-open"
-                ):
-                    self.state = "open"
-                    
-                raise
+    def _on_failure(self, error: Exception) -> None:
+        """Aggiorna lo stato dopo una chiamata fallita."""
+        if self.exceptions and not isinstance(error, self.exceptions):
+            # Errore non conteggiato: libera solo lo slot di prova
+            if self.state == "half-open":
+                with self._lock:
+                    self._half_open_calls = max(0, self._half_open_calls - 1)
+            return
+        self._record_failure()
+        
+    def _record_failure(self) -> None:
+        """Conta un fallimento e apre il circuito se necessario."""
+        with self._lock:
+            self.failures += 1
+            self.last_failure = datetime.utcnow()
+            
+            if (
+                self.failures >= self.failure_threshold or
+                self.state == "half-open"
+            ):
+                if self.state != "open":
+                    self.logger.warning(
+                        f"Circuit breaker aperto: {self.name} "
+                        f"({self.failures} fallimenti)"
+                    )
+                self.state = "open"
                 
     def _should_reset(self) -> bool:
         """Verifica se resettare il circuito."""
@@ -327,6 +590,84 @@ class CircuitBreaker:
         ).total_seconds()
         
         return elapsed >= self.reset_timeout
+        
+    def reset(self) -> None:
+        """Riporta il circuito allo stato chiuso."""
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._half_open_calls = 0
+            self._half_open_successes = 0
+
+class CircuitBreakerRegistry:
+    """Circuit breaker separati per (exchange, endpoint)."""
+    
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 60.0,
+        half_open_max_calls: int = 1,
+        exceptions: Optional[Set[Type[Exception]]] = None
+    ):
+        """
+        Inizializza il registro.
+        
+        Args:
+            failure_threshold: Soglia fallimenti per circuito
+            reset_timeout: Timeout reset in secondi
+            half_open_max_calls: Richieste di prova in half-open
+            exceptions: Eccezioni conteggiate come fallimento
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.exceptions = exceptions
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        
+    def get(self, exchange: str, endpoint: str) -> CircuitBreaker:
+        """
+        Recupera (o crea) il circuito di un endpoint.
+        
+        Args:
+            exchange: ID exchange
+            endpoint: Nome endpoint
+            
+        Returns:
+            Circuit breaker dell'endpoint
+        """
+        key = (exchange, endpoint)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = CircuitBreaker(
+                        self.failure_threshold,
+                        self.reset_timeout,
+                        self.half_open_max_calls,
+                        self.exceptions,
+                        name=f"{exchange}:{endpoint}"
+                    )
+                    self._breakers[key] = breaker
+        return breaker
+        
+    def states(self) -> Dict[Tuple[str, str], str]:
+        """
+        Recupera lo stato di tutti i circuiti.
+        
+        Returns:
+            Stato per (exchange, endpoint)
+        """
+        return {
+            key: breaker.state
+            for key, breaker in self._breakers.items()
+        }
+        
+    def reset(self) -> None:
+        """Resetta tutti i circuiti."""
+        for breaker in self._breakers.values():
+            breaker.reset()
 
 class RetryWithCircuitBreaker:
     """Combina Retry e Circuit Breaker."""
@@ -335,7 +676,8 @@ class RetryWithCircuitBreaker:
         self,
         retry_config: Optional[RetryConfig] = None,
         failure_threshold: int = 5,
-        reset_timeout: float = 60.0
+        reset_timeout: float = 60.0,
+        half_open_max_calls: int = 1
     ):
         """
         Inizializza il gestore.
@@ -344,11 +686,13 @@ class RetryWithCircuitBreaker:
             retry_config: Configurazione retry
             failure_threshold: Soglia fallimenti
             reset_timeout: Timeout reset
+            half_open_max_calls: Richieste di prova in half-open
         """
         self.retry_handler = RetryHandler(retry_config)
         self.circuit_breaker = CircuitBreaker(
             failure_threshold,
-            reset_timeout
+            reset_timeout,
+            half_open_max_calls
         )
         
     async def execute(
@@ -0,0 +1,512 @@
+"""
+Streaming Exchange Connector
+-------------------------
+Connettore WebSocket per l'acquisizione live delle candele.
+Sottoscrive gli stream kline/trade su connessioni multiplexate,
+gestisce riconnessione automatica e backfill dei gap via REST.
+"""
+
+import json
+import time
+import asyncio
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable
+from collections import deque
+
+import aiohttp
+
+from .base_connector import (
+    BaseConnector,
+    ExchangeError
+)
+
+# Callback per le candele chiuse: (simbolo, timeframe, candela)
+CandleSink = Callable[[str, str, List[float]], Awaitable[None]]
+
+# Callback per i trade: (simbolo, prezzo, quantità, timestamp)
+TradeSink = Callable[[str, float, float, int], Awaitable[None]]
+
+class StreamingConnector(BaseConnector):
+    """Connettore WebSocket per kline e trade in tempo reale."""
+    
+    # Endpoint stream combinati di Binance
+    STREAM_URL = 'wss://stream.binance.com:9443/stream'
+    
+    # Exchange con endpoint e formato messaggi implementati
+    SUPPORTED_EXCHANGES = ('binance',)
+    
+    def __init__(
+        self,
+        exchange_id: str,
+        config: Dict[str, Any],
+        rest_connector: Optional[BaseConnector] = None,
+        candle_sink: Optional[CandleSink] = None,
+        trade_sink: Optional[TradeSink] = None
+    ):
+        """
+        Inizializza il connettore streaming.
+        
+        Chiavi di configurazione: 'stream_url', 'symbols', 'timeframes',
+        'trade_streams', 'max_streams_per_connection', 'heartbeat',
+        'buffer_size', 'backfill_limit'.
+        
+        Args:
+            exchange_id: ID dell'exchange
+            config: Configurazione connettore
+            rest_connector: Connettore REST per backfill e metadati
+            candle_sink: Callback per le candele chiuse
+            trade_sink: Callback per i trade
+        """
+        super().__init__(exchange_id, config)
+        
+        self.rest_connector = rest_connector
+        self.candle_sink = candle_sink
+        self.trade_sink = trade_sink
+        
+        self.stream_url = config.get('stream_url', self.STREAM_URL)
+        self.max_streams = config.get('max_streams_per_connection', 200)
+        self.heartbeat = config.get('heartbeat', 20.0)
+        self.buffer_size = config.get('buffer_size', 1000)
+        self.backfill_limit = config.get('backfill_limit', 1000)
+        self.trade_streams = config.get('trade_streams', False)
+        
+        self._subscriptions: List[Tuple[str, str]] = []
+        self._stream_symbols: Dict[str, str] = {}
+        self._buffers: Dict[Tuple[str, str], deque] = {}
+        self._open_candles: Dict[Tuple[str, str], List[float]] = {}
+        self._last_closed: Dict[Tuple[str, str], int] = {}
+        self._last_trades: Dict[str, Tuple[float, int]] = {}
+        self._key_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+        
+        self.stream_stats = {
+            'messages': 0,
+            'closed_candles': 0,
+            'trades': 0,
+            'reconnects': 0,
+            'backfilled_candles': 0,
+            'duplicates': 0
+        }
+        
+        for symbol in config.get('symbols', []):
+            for timeframe in config.get('timeframes', ['1m']):
+                self.subscribe(symbol, timeframe)
+                
+    def subscribe(self, symbol: str, timeframe: str) -> None:
+        """
+        Aggiunge una sottoscrizione kline.
+        
+        Va chiamato prima di start().
+        
+        Args:
+            symbol: Simbolo trading
+            timeframe: Timeframe
+        """
+        key = (symbol, timeframe)
+        if key in self._buffers:
+            return
+            
+        self._subscriptions.append(key)
+        self._stream_symbols[self._stream_symbol(symbol)] = symbol
+        self._buffers[key] = deque(maxlen=self.buffer_size)
+        self._key_locks[key] = asyncio.Lock()
+        
+    def _stream_symbol(self, symbol: str) -> str:
+        """Converte un simbolo nel nome usato dagli stream."""
+        return symbol.replace('/', '').lower()
+        
+    def _stream_names(self) -> List[str]:
+        """Elenca tutti gli stream da sottoscrivere."""
+        streams = [
+            f"{self._stream_symbol(symbol)}@kline_{timeframe}"
+            for symbol, timeframe in self._subscriptions
+        ]
+        if self.trade_streams:
+            symbols = {symbol for symbol, _ in self._subscriptions}
+            streams.extend(
+                f"{self._stream_symbol(symbol)}@trade"
+                for symbol in sorted(symbols)
+            )
+        return streams
+        
+    async def start(self) -> None:
+        """Apre le connessioni WebSocket multiplexate."""
+        if self._running:
+            return
+            
+        self._running = True
+        self._session = aiohttp.ClientSession()
+        
+        streams = self._stream_names()
+        for i in range(0, len(streams), self.max_streams):
+            chunk = streams[i:i + self.max_streams]
+            self._tasks.append(
+                asyncio.create_task(self._run_connection(chunk))
+            )
+            
+        self.logger.info(
+            f"Streaming avviato: {len(streams)} stream su "
+            f"{len(self._tasks)} connessioni"
+        )
+        
+    async def stop(self) -> None:
+        """Chiude le connessioni WebSocket."""
+        self._running = False
+        
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        
+    async def _run_connection(self, streams: List[str]) -> None:
+        """
+        Mantiene una connessione con riconnessione automatica.
+        
+        Args:
+            streams: Stream gestiti dalla connessione
+        """
+        url = f"{self.stream_url}?streams={'/'.join(streams)}"
+        keys = [
+            key for key in self._subscriptions
+            if f"{self._stream_symbol(key[0])}@kline_{key[1]}" in streams
+        ]
+        attempt = 0
+        
+        while self._running:
+            try:
+                async with self._session.ws_connect(
+                    url,
+                    heartbeat=self.heartbeat
+                ) as ws:
+                    if attempt > 0:
+                        self.stream_stats['reconnects'] += 1
+                    attempt = 0
+                    
+                    # Recupera le candele perse durante la disconnessione
+                    await asyncio.gather(*[
+                        self._backfill(symbol, timeframe)
+                        for symbol, timeframe in keys
+                    ])
+                    
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            await self._handle_message(json.loads(msg.data))
+                        elif msg.type in (
+                            aiohttp.WSMsgType.CLOSED,
+                            aiohttp.WSMsgType.ERROR
+                        ):
+                            break
+                            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Errore connessione stream: {str(e)}")
+                
+            if not self._running:
+                break
+                
+            attempt += 1
+            delay = self.retry_handler.get_delay(attempt)
+            self.logger.info(f"Riconnessione stream tra {delay:.1f}s")
+            await asyncio.sleep(delay)
+            
+    async def _handle_message(self, message: Dict[str, Any]) -> None:
+        """
+        Gestisce un messaggio dello stream combinato.
+        
+        Args:
+            message: Messaggio {'stream': ..., 'data': ...}
+        """
+        self.stream_stats['messages'] += 1
+        data = message.get('data', message)
+        event = data.get('e')
+        
+        if event == 'kline':
+            kline = data['k']
+            symbol = self._stream_symbols.get(kline['s'].lower())
+            if symbol is None:
+                return
+            candle = [
+                int(kline['t']),
+                float(kline['o']),
+                float(kline['h']),
+                float(kline['l']),
+                float(kline['c']),
+                float(kline['v'])
+            ]
+            key = (symbol, kline['i'])
+            if kline['x']:
+                await self._on_closed_candle(key, candle)
+            else:
+                self._open_candles[key] = candle
+                
+        elif event == 'trade':
+            symbol = self._stream_symbols.get(data['s'].lower())
+            if symbol is None:
+                return
+            price = float(data['p'])
+            timestamp = int(data['T'])
+            self._last_trades[symbol] = (price, timestamp)
+            self.stream_stats['trades'] += 1
+            if self.trade_sink:
+                await self.trade_sink(symbol, price, float(data['q']), timestamp)
+                
+    async def _on_closed_candle(
+        self,
+        key: Tuple[str, str],
+        candle: List[float]
+    ) -> None:
+        """
+        Registra una candela chiusa e colma eventuali gap.
+        
+        Args:
+            key: (simbolo, timeframe)
+            candle: Candela OHLCV chiusa
+        """
+        symbol, timeframe = key
+        last = self._last_closed.get(key)
+        
+        if last is not None and candle[0] > last + self.parse_timeframe(timeframe):
+            await self._backfill(symbol, timeframe, until=candle[0])
+            
+        await self._push(key, candle)
+        self._open_candles.pop(key, None)
+        
+    async def _push(
+        self,
+        key: Tuple[str, str],
+        candle: List[float]
+    ) -> None:
+        """Inoltra una candela chiusa a buffer e sink, senza duplicati."""
+        last = self._last_closed.get(key)
+        if last is not None and candle[0] <= last:
+            self.stream_stats['duplicates'] += 1
+            return
+            
+        self._last_closed[key] = int(candle[0])
+        self._buffers[key].append(candle)
+        self.stream_stats['closed_candles'] += 1
+        
+        if self.candle_sink:
+            try:
+                await self.candle_sink(key[0], key[1], candle)
+            except Exception as e:
+                self.logger.error(
+                    f"Errore sink candela {key[0]} {key[1]}: {str(e)}"
+                )
+                
+    async def _backfill(
+        self,
+        symbol: str,
+        timeframe: str,
+        until: Optional[int] = None
+    ) -> None:
+        """
+        Recupera via REST le candele chiuse mancanti.
+        
+        Args:
+            symbol: Simbolo trading
+            timeframe: Timeframe
+            until: Timestamp (escluso) fino a cui recuperare
+        """
+        key = (symbol, timeframe)
+        last = self._last_closed.get(key)
+        if self.rest_connector is None or last is None:
+            return
+            
+        period = self.parse_timeframe(timeframe)
+        now = int(time.time() * 1000)
+        
+        async with self._key_locks[key]:
+            since = self._last_closed[key] + period
+            while since < (until or now):
+                try:
+                    candles = await self.rest_connector.fetch_ohlcv(
+                        symbol, timeframe, since, self.backfill_limit
+                    )
+                except Exception as e:
+                    self.logger.error(
+                        f"Errore backfill {symbol} {timeframe}: {str(e)}"
+                    )
+                    return
+                    
+                # Solo candele chiuse e precedenti a until
+                candles = [
+                    c for c in candles
+                    if c[0] + period <= now and (until is None or c[0] < until)
+                ]
+                if not candles:
+                    break
+                    
+                for candle in candles:
+                    await self._push(key, candle)
+                self.stream_stats['backfilled_candles'] += len(candles)
+                since = int(candles[-1][0]) + period
+                
+    def get_open_candle(
+        self,
+        symbol: str,
+        timeframe: str
+    ) -> Optional[List[float]]:
+        """
+        Recupera la candela in formazione (aggiornamento intrabar).
+        
+        Args:
+            symbol: Simbolo trading
+            timeframe: Timeframe
+            
+        Returns:
+            Candela corrente o None
+        """
+        return self._open_candles.get((symbol, timeframe))
+        
+    async def fetch_markets(self) -> List[Dict[str, Any]]:
+        """
+        Recupera informazioni sui mercati disponibili.
+        
+        Returns:
+            Lista dei mercati
+        """
+        return await self._rest().fetch_markets()
+        
+    async def fetch_ohlcv(
+        self,
+        symbol: str,
+        timeframe: str,
+        since: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[List[float]]:
+        """
+        Recupera dati OHLCV, dal buffer dello stream se possibile.
+        
+        Args:
+            symbol: Simbolo trading
+            timeframe: Timeframe
+            since: Timestamp iniziale
+            limit: Limite candle
+            
+        Returns:
+            Lista di candle OHLCV
+        """
+        buffer = self._buffers.get((symbol, timeframe))
+        if buffer and (since is None or buffer[0][0] <= since):
+            candles = [c for c in buffer if since is None or c[0] >= since]
+            if limit:
+                candles = candles[:limit] if since is not None else candles[-limit:]
+            return candles
+            
+        return await self._rest().fetch_ohlcv(symbol, timeframe, since, limit)
+        
+    async def fetch_ticker(
+        self,
+        symbol: str
+    ) -> Dict[str, Any]:
+        """
+        Recupera ticker corrente, dall'ultimo trade se disponibile.
+        
+        Args:
+            symbol: Simbolo trading
+            
+        Returns:
+            Dati ticker
+        """
+        if symbol in self._last_trades:
+            price, timestamp = self._last_trades[symbol]
+            return {
+                'symbol': symbol,
+                'timestamp': timestamp,
+                'last': price,
+                'close': price
+            }
+        return await self._rest().fetch_ticker(symbol)
+        
+    async def _do_request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        Inoltra la richiesta al connettore REST.
+        
+        Args:
+            method: Metodo HTTP
+            endpoint: Endpoint API
+            params: Parametri richiesta
+            
+        Returns:
+            Risposta della richiesta
+        """
+        return await self._rest()._do_request(method, endpoint, params)
+        
+    def _rest(self) -> BaseConnector:
+        """Recupera il connettore REST associato."""
+        if self.rest_connector is None:
+            raise ExchangeError(
+                f"Nessun connettore REST configurato per {self.exchange_id}"
+            )
+        return self.rest_connector
+        
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Recupera statistiche di streaming.
+        
+        Returns:
+            Dizionario statistiche
+        """
+        stats = super().get_stats()
+        stats['stream'] = dict(self.stream_stats)
+        return stats
+        
+    async def close(self) -> None:
+        """Chiude stream e connettore REST."""
+        await self.stop()
+        if self.rest_connector:
+            await self.rest_connector.close()
+
+class StreamingConnectorFactory:
+    """Factory per creare connettori streaming."""
+    
+    @staticmethod
+    async def create_connector(
+        exchange_id: str,
+        config: Dict[str, Any],
+        candle_sink: Optional[CandleSink] = None,
+        trade_sink: Optional[TradeSink] = None
+    ) -> StreamingConnector:
+        """
+        Crea un connettore streaming con il relativo connettore REST.
+        
+        Args:
+            exchange_id: ID dell'exchange
+            config: Configurazione connettore
+            candle_sink: Callback per le candele chiuse
+            trade_sink: Callback per i trade
+            
+        Returns:
+            Istanza di StreamingConnector
+            
+        Raises:
+            ExchangeError: Se l'exchange non supporta lo streaming
+        """
+        from . import create_connector
+        
+        if exchange_id not in StreamingConnector.SUPPORTED_EXCHANGES:
+            raise ExchangeError(
+                f"Streaming non supportato per {exchange_id}"
+            )
+            
+        rest_connector = await create_connector(exchange_id, config)
+        return StreamingConnector(
+            exchange_id,
+            config,
+            rest_connector=rest_connector,
+            candle_sink=candle_sink,
+            trade_sink=trade_sink
+        )
@@ -0,0 +1,19 @@
+-- Script di migrazione per le candele invalide dei risultati di validazione
+
+CREATE TABLE IF NOT EXISTS invalid_candles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    validation_id INTEGER NOT NULL,
+    exchange_id INTEGER NOT NULL,
+    symbol_id INTEGER NOT NULL,
+    timeframe TEXT NOT NULL,
+    timestamp DATETIME NOT NULL,
+    rule TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    FOREIGN KEY (validation_id) REFERENCES data_validations(id) ON DELETE CASCADE,
+    FOREIGN KEY (exchange_id) REFERENCES exchanges(id),
+    FOREIGN KEY (symbol_id) REFERENCES symbols(id)
+);
+
+-- Indici per le query sulle candele invalide in un intervallo
+CREATE INDEX IF NOT EXISTS idx_invalid_lookup ON invalid_candles (exchange_id, symbol_id, timeframe, timestamp, rule);
+CREATE INDEX IF NOT EXISTS idx_invalid_validation ON invalid_candles (validation_id);
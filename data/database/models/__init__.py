@@ -17,6 +17,7 @@ from .market_data import (
     Symbol,
     MarketData,
     DataValidation,
+    InvalidCandle,
     Base
 )
 
@@ -31,6 +32,7 @@ from .patterns import (
 from .metrics import (
     PerformanceMetrics,
     RiskMetrics,
+    AssetCorrelation,
     MarketRegime
 )
 
@@ -40,6 +42,7 @@ __all__ = [
     'Symbol',
     'MarketData',
     'DataValidation',
+    'InvalidCandle',
     
     # Patterns
     'PatternDefinition',
@@ -51,6 +54,7 @@ __all__ = [
     # Metrics
     'PerformanceMetrics',
     'RiskMetrics',
+    'AssetCorrelation',
     'MarketRegime',
     
     # Factory functions
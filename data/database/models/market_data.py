@@ -190,10 +190,21 @@ class DataValidation(Base):
     validation_details = Column(String)
     is_valid = Column(Boolean, default=True)
     
+    # Versione delle regole e impronta delle candele validate
+    rule_set_version = Column(String(32))
+    data_hash = Column(String(32))
+    
     # Metadati
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Relazioni
+    invalid_rows = relationship(
+        "InvalidCandle",
+        back_populates="validation",
+        cascade="all, delete-orphan"
+    )
+    
     # Indici
     __table_args__ = (
         Index(
@@ -202,3 +213,35 @@ class DataValidation(Base):
             'start_time', 'end_time'
         ),
     )
+
+class InvalidCandle(Base):
+    """Candela che viola una regola di validazione."""
+    
+    __tablename__ = 'invalid_candles'
+    
+    id = Column(Integer, primary_key=True)
+    validation_id = Column(
+        Integer,
+        ForeignKey('data_validations.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    exchange_id = Column(Integer, ForeignKey('exchanges.id'), nullable=False)
+    symbol_id = Column(Integer, ForeignKey('symbols.id'), nullable=False)
+    timeframe = Column(String(10), nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    rule = Column(String(50), nullable=False)
+    severity = Column(String(10), nullable=False)
+    
+    # Relazioni
+    validation = relationship("DataValidation", back_populates="invalid_rows")
+    
+    # Indici
+    __table_args__ = (
+        # Candele invalide in un intervallo
+        Index(
+            'idx_invalid_lookup',
+            'exchange_id', 'symbol_id', 'timeframe',
+            'timestamp', 'rule'
+        ),
+        Index('idx_invalid_validation', 'validation_id'),
+    )
@@ -30,6 +30,10 @@ class PerformanceMetrics(Base):
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime, nullable=False)
     
+    # Finestra di calcolo (es. all, 30d) e impronta dei dati usati
+    window = Column(String(10))
+    data_hash = Column(String(32))
+    
     # Metriche di rendimento
     total_return = Column(Float)
     annualized_return = Column(Float)
@@ -63,6 +67,12 @@ class PerformanceMetrics(Base):
             'exchange_id', 'symbol_id', 'timeframe',
             'start_time', 'end_time'
         ),
+        # Una riga per finestra, aggiornata dal job delle metriche
+        Index(
+            'idx_performance_window',
+            'exchange_id', 'symbol_id', 'timeframe', 'window',
+            unique=True
+        ),
     )
     
     def calculate_metrics(self, prices: List[float], volumes: List[float]) -> None:
@@ -136,6 +146,10 @@ class RiskMetrics(Base):
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime, nullable=False)
     
+    # Finestra di calcolo (es. all, 30d) e impronta dei dati usati
+    window = Column(String(10))
+    data_hash = Column(String(32))
+    
     # Value at Risk
     var_95 = Column(Float)
     var_99 = Column(Float)
@@ -168,6 +182,12 @@ class RiskMetrics(Base):
             'exchange_id', 'symbol_id', 'timeframe',
             'start_time', 'end_time'
         ),
+        # Una riga per finestra, aggiornata dal job delle metriche
+        Index(
+            'idx_risk_window',
+            'exchange_id', 'symbol_id', 'timeframe', 'window',
+            unique=True
+        ),
     )
     
     def calculate_var(
@@ -212,10 +232,22 @@ class RiskMetrics(Base):
         var = self.calculate_var(returns, confidence_level)
         return abs(np.mean(returns[returns <= -var]))
     
+    def calculate_from_sketch(self, sketch: Any) -> None:
+        """
+        Calcola VaR e CVaR da uno sketch dei quantili dei rendimenti.
+        
+        Args:
+            sketch: Sketch con metodi var() e cvar() (es. TDigest)
+        """
+        self.var_95 = sketch.var(0.95)
+        self.var_99 = sketch.var(0.99)
+        self.cvar_95 = sketch.cvar(0.95)
+        self.cvar_99 = sketch.cvar(0.99)
+        
     def calculate_metrics(
         self,
         returns: List[float],
-        market_returns: List[float],
+        market_returns: Optional[List[float]],
         volumes: List[float]
     ) -> None:
         """
@@ -223,7 +255,7 @@ class RiskMetrics(Base):
         
         Args:
             returns: Lista dei rendimenti
-            market_returns: Lista dei rendimenti di mercato
+            market_returns: Rendimenti del benchmark allineati (None se assente)
             volumes: Lista dei volumi
         """
         import numpy as np
@@ -246,8 +278,15 @@ class RiskMetrics(Base):
         if len(tail_returns) > 0:
             self.tail_risk = abs(np.mean(tail_returns) / np.std(tail_returns))
         
-        # Correlazioni
-        self.market_correlation = np.corrcoef(returns, market_returns)[0, 1]
+        # Correlazione con il benchmark sulle osservazioni comuni
+        # (market_returns allineati ai rendimenti, NaN se mancanti)
+        if market_returns is not None:
+            market_returns = np.asarray(market_returns, dtype=float)
+            common = np.isfinite(market_returns)
+            if common.sum() > 2:
+                self.market_correlation = np.corrcoef(
+                    np.asarray(returns)[common], market_returns[common]
+                )[0, 1]
         
         # Metriche di liquidità
         avg_volume = np.mean(volumes)
@@ -257,6 +296,43 @@ class RiskMetrics(Base):
                 len(volumes) * avg_volume
             )
 
+class AssetCorrelation(Base):
+    """Correlazione e beta tra due simboli su una finestra mobile."""
+    
+    __tablename__ = 'asset_correlations'
+    
+    id = Column(Integer, primary_key=True)
+    exchange_id = Column(Integer, ForeignKey('exchanges.id'), nullable=False)
+    timeframe = Column(String(10), nullable=False)
+    window = Column(String(10), nullable=False)
+    
+    # Coppia ordinata (symbol_id < other_id)
+    symbol_id = Column(Integer, ForeignKey('symbols.id'), nullable=False)
+    other_id = Column(Integer, ForeignKey('symbols.id'), nullable=False)
+    
+    # Fine della finestra e osservazioni comuni
+    end_time = Column(DateTime, nullable=False)
+    observations = Column(Integer)
+    
+    # Metriche (beta di symbol_id rispetto a other_id e viceversa)
+    correlation = Column(Float)
+    beta = Column(Float)
+    beta_reverse = Column(Float)
+    
+    # Timestamp
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Indici
+    __table_args__ = (
+        Index(
+            'idx_correlation_pair',
+            'exchange_id', 'timeframe', 'window',
+            'symbol_id', 'other_id',
+            unique=True
+        ),
+    )
+
 class MarketRegime(Base):
     """Classificazione dei regimi di mercato."""
     
@@ -0,0 +1,7 @@
+"""
+Configurazione dei test.
+"""
+
+# cli va importato prima di data.collection: il package importa il
+# downloader, che a sua volta dipende da cli.config
+import cli  # noqa: F401
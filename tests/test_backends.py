@@ -0,0 +1,126 @@
+"""
+Test di parità dei backend indicatori (talib, numba, numpy).
+"""
+
+import numpy as np
+import pytest
+
+from data.collection.backends import get_backend, available_backends
+
+BACKENDS = available_backends()
+
+# Errore relativo ammesso tra backend
+TOLERANCE = 1e-8
+
+CASES = {
+    'sma': lambda k, s: [k.sma(s['close'], 20)],
+    'ema': lambda k, s: [k.ema(s['close'], 20)],
+    'rsi': lambda k, s: [k.rsi(s['close'], 14)],
+    'macd': lambda k, s: list(k.macd(s['close'], 12, 26, 9)),
+    'bbands': lambda k, s: list(k.bbands(s['close'], 20, 2, 2)),
+    'obv': lambda k, s: [k.obv(s['close'], s['volume'])],
+    'atr': lambda k, s: [k.atr(s['high'], s['low'], s['close'], 14)],
+    'candle_shape': lambda k, s: list(
+        k.candle_shape(s['open'], s['high'], s['low'], s['close']).values()
+    ),
+    'rolling_std': lambda k, s: [k.rolling_std(s['close'], 20)],
+    'pct_change': lambda k, s: [k.pct_change(s['close'], 5)]
+}
+
+def make_series(size: int = 2000, gaps: tuple = (), seed: int = 7) -> dict:
+    """
+    Candele sintetiche con NaN iniziali ed eventuali NaN interni.
+    
+    Args:
+        size: Numero di candele
+        gaps: Intervalli (inizio, fine) di NaN interni
+        seed: Seed del generatore
+        
+    Returns:
+        Colonne OHLCV
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size)))
+    open_ = close * (1 + rng.normal(0, 0.002, size))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, size))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, size))
+    volume = rng.uniform(1, 100, size)
+    for column in (open_, high, low, close):
+        column[:10] = np.nan
+        for start, stop in gaps:
+            column[start:stop] = np.nan
+    return {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+
+def assert_same(left: list, right: list, stop: int = None) -> None:
+    """Verifica stessi NaN e valori entro la tolleranza (fino a stop)."""
+    assert len(left) == len(right)
+    for a, b in zip(left, right):
+        a, b = a[:stop], b[:stop]
+        np.testing.assert_array_equal(np.isnan(a), np.isnan(b))
+        valid = ~np.isnan(a)
+        np.testing.assert_allclose(a[valid], b[valid], rtol=TOLERANCE, atol=TOLERANCE)
+
+@pytest.fixture(scope='module')
+def backends():
+    return {name: get_backend(name) for name in BACKENDS}
+
+def require(*names: str) -> None:
+    """Salta il test se un backend non è disponibile."""
+    missing = [name for name in names if name not in BACKENDS]
+    if missing:
+        pytest.skip(f"Backend non disponibili: {', '.join(missing)}")
+
+@pytest.mark.parametrize('indicator', list(CASES))
+@pytest.mark.parametrize('candidate', ['numba', 'numpy'])
+def test_talib_parity(backends, indicator, candidate):
+    require('talib', candidate)
+    series = make_series()
+    case = CASES[indicator]
+    assert_same(case(backends[candidate], series), case(backends['talib'], series))
+
+@pytest.mark.parametrize('indicator', list(CASES))
+def test_numba_numpy_parity(backends, indicator):
+    require('numba', 'numpy')
+    series = make_series()
+    case = CASES[indicator]
+    assert_same(case(backends['numba'], series), case(backends['numpy'], series))
+
+@pytest.mark.parametrize('indicator', list(CASES))
+def test_numba_numpy_parity_with_interior_nans(backends, indicator):
+    require('numba', 'numpy')
+    series = make_series(gaps=((500, 503), (1200, 1201)))
+    case = CASES[indicator]
+    assert_same(case(backends['numba'], series), case(backends['numpy'], series))
+
+@pytest.mark.parametrize('indicator', list(CASES))
+@pytest.mark.parametrize('candidate', ['numba', 'numpy'])
+def test_talib_parity_before_interior_nans(backends, indicator, candidate):
+    # Dopo un NaN interno talib propaga medie non valide (NaN o RSI 0)
+    require('talib', candidate)
+    series = make_series(gaps=((500, 503),))
+    case = CASES[indicator]
+    assert_same(
+        case(backends[candidate], series),
+        case(backends['talib'], series),
+        stop=500
+    )
+
+@pytest.mark.parametrize('candidate', ['numba', 'numpy'])
+def test_interior_nans(backends, candidate):
+    require(candidate)
+    series = make_series(gaps=((500, 503),))
+    backend = backends[candidate]
+    
+    # Indicatori a finestra: NaN solo sulle finestre con il NaN
+    sma = backend.sma(series['close'], 20)
+    assert np.isnan(sma[500:522]).all()
+    assert not np.isnan(sma[522:]).any()
+    
+    # Indicatori ricorsivi: NaN fino alla fine
+    assert np.isnan(backend.ema(series['close'], 20)[500:]).all()
+    assert np.isnan(backend.rsi(series['close'], 14)[500:]).all()
+    
+    # OBV: prezzo mancante come prezzo invariato
+    obv = backend.obv(series['close'], series['volume'])
+    assert not np.isnan(obv[10:]).any()
+    np.testing.assert_array_equal(obv[500:504], obv[499])